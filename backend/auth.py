@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import asyncio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import User
+from services.principal_cache import principal_cache, snapshot_user, attach_cached_user
 import os
 
 # Security configuration
@@ -14,7 +19,17 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; existing hashes with a different cost still verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker threads for hashing (bcrypt releases the GIL) and the max number of
+# hashes running or waiting before new requests are rejected with 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Hashes submitted and not yet finished; only touched from the event loop
+_password_jobs_pending = 0
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,10 +40,46 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
+async def _run_password_job(func, *args):
+    """Run a bcrypt call on the worker pool, rejecting work beyond the queue limit."""
+    global _password_jobs_pending
+    if _password_jobs_pending >= PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _password_jobs_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_jobs_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool without blocking the event loop."""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool without blocking the event loop."""
+    return await _run_password_job(get_password_hash, password)
+
+def password_pool_stats() -> dict:
+    """Current load of the hashing pool."""
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "pending": _password_jobs_pending,
+        "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+    }
+
 def get_user_by_student_id(db: Session, student_id: str) -> Optional[User]:
     """Get user by student_id."""
     return db.query(User).filter(User.student_id == student_id).first()
 
+async def get_user_by_student_id_async(db: AsyncSession, student_id: str) -> Optional[User]:
+    """Get user by student_id on an AsyncSession."""
+    return await db.scalar(select(User).where(User.student_id == student_id))
+
 def authenticate_user(db: Session, student_id: str, password: str) -> Optional[User]:
     """Authenticate user with student_id and password."""
     user = get_user_by_student_id(db, student_id)
@@ -38,6 +89,15 @@ def authenticate_user(db: Session, student_id: str, password: str) -> Optional[U
         return None
     return user
 
+async def authenticate_user_async(db: AsyncSession, student_id: str, password: str) -> Optional[User]:
+    """Authenticate user with student_id and password, verifying on the hashing pool."""
+    user = await get_user_by_student_id_async(db, student_id)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token."""
     to_encode = data.copy()
@@ -49,8 +109,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get current user from JWT token."""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """
+    Get current user from JWT token.
+
+    The user is looked up on the AsyncSession (shared with handlers that
+    depend on get_async_db), so authentication never blocks the event loop.
+    Handlers working on a sync Session can read its columns but must load
+    their own copy before modifying it.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -64,9 +131,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_student_id(db, student_id=student_id)
+    cached = principal_cache.get(student_id)
+    if cached is not None:
+        return await attach_cached_user(db, cached)
+
+    # Read the version before querying so a change committed meanwhile
+    # leaves the entry unusable
+    version = principal_cache.version(student_id)
+    user = await get_user_by_student_id_async(db, student_id)
     if user is None:
         raise credentials_exception
+    principal_cache.put(student_id, version, snapshot_user(user))
     return user
 
 async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
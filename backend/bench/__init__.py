@@ -0,0 +1,3 @@
+"""
+Offline benchmarking and load-testing helpers for the backend.
+"""
@@ -0,0 +1,70 @@
+"""
+Stored benchmark baselines (bench/baselines.json) and regression checks.
+
+Each suite (micro, load) keeps a flat {name: seconds} mapping, stored with
+BASELINE_DIGITS significant digits so sub-microsecond cases keep their
+precision. A result is a regression when it is slower than its baseline
+by more than the tolerance (a fraction: 0.5 allows 50 % slower) and by
+more than an absolute floor (min_delta seconds), so timer jitter on the
+fastest cases is not reported. Baselines are machine specific; re-record
+them with --save-baseline on the machine that runs the comparison.
+"""
+
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Dict, List
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+# 基线保存的有效数字位数
+BASELINE_DIGITS = 4
+
+
+def load_baselines(suite: str, path: str = BASELINES_PATH) -> Dict[str, float]:
+    """读取某个套件的基线，文件或套件不存在时返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get(suite, {}).get("results", {})
+
+
+def save_baselines(suite: str, results: Dict[str, float], path: str = BASELINES_PATH) -> None:
+    """覆盖保存某个套件的基线，保留其他套件"""
+    data = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    data[suite] = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU, Python {platform.python_version()}",
+        "results": {name: float(f"{value:.{BASELINE_DIGITS}g}") for name, value in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _format_seconds(value: float) -> str:
+    """1 毫秒以下按微秒显示"""
+    if value < 0.001:
+        return f"{value * 1e6:10.3f} µs"
+    return f"{value * 1000:10.3f} ms"
+
+
+def compare(results: Dict[str, float], baselines: Dict[str, float], tolerance: float,
+            min_delta: float = 0.0) -> List[str]:
+    """打印与基线的对比，返回慢于基线超过 tolerance 且绝对差值超过 min_delta 秒的指标名称"""
+    regressions = []
+    for name, value in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            print(f"  {name:<36} {_format_seconds(value)}   (no baseline)")
+            continue
+        change = value / baseline - 1
+        flag = ""
+        if change > tolerance and value - baseline > min_delta:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<36} {_format_seconds(value)}   baseline {_format_seconds(baseline)}   {change:+7.1%}{flag}")
+    return regressions
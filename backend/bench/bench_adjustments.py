@@ -0,0 +1,163 @@
+"""
+Holiday adjustment benchmark: per-day query loop vs. one range UPDATE.
+
+Seeds a schedule with a dense semester of events and applies a week-long
+holiday (National Day, 2025-10-01 .. 2025-10-07) with
+
+  * legacy: one adjustment per day, func.date() query, row-by-row update
+  * range:  one adjustment record, one UPDATE on a start_time range
+
+and then reverts it with
+
+  * undo:   one UPDATE on suppressed_by_id, one DELETE on adjustment_id
+  * replay: restore all events and reapply every adjustment of the schedule
+
+Run from the backend directory:
+
+    python -m bench.bench_adjustments [--events 20000] [--repeat 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_adjustments_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import delete, func, update  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Event, Schedule, ScheduleAdjustment, User  # noqa: E402
+from routers.schedules import _handle_holiday_adjustment  # noqa: E402
+from schemas import HolidayAdjustmentRequest  # noqa: E402
+from services.adjustments import replay_adjustments, undo_adjustment  # noqa: E402
+from services.event_ingest import ingest_events  # noqa: E402
+
+SCHEDULE_START = date(2025, 9, 8)
+HOLIDAY_START = date(2025, 10, 1)
+HOLIDAY_END = date(2025, 10, 7)
+
+
+def seed(count: int) -> int:
+    """创建一个包含 count 个事件的课表（均匀分布在 20 周内），返回课表ID"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(student_id="bench", hashed_password="x", full_name="bench", class_name="c", grade="2025")
+        db.add(user)
+        db.flush()
+        schedule = Schedule(name="bench", owner_id=user.id, start_date=SCHEDULE_START, class_times={})
+        db.add(schedule)
+        db.flush()
+        base = datetime.combine(SCHEDULE_START, datetime.min.time()) + timedelta(hours=8)
+        ingest_events(db, schedule.id, (
+            {
+                "title": f"课程{index % 40}",
+                "start_time": base + timedelta(days=index % 140, minutes=index // 140 % 12 * 50),
+                "end_time": base + timedelta(days=index % 140, minutes=index // 140 % 12 * 50 + 45),
+                "weeks_input": str(index % 140 // 7 + 1),
+            }
+            for index in range(count)
+        ))
+        db.commit()
+        return schedule.id
+    finally:
+        db.close()
+
+
+def legacy_holiday(schedule_id: int) -> int:
+    """原实现：逐天查询（func.date 无法使用索引）并逐行更新"""
+    db = SessionLocal()
+    try:
+        affected = 0
+        current = HOLIDAY_START
+        while current <= HOLIDAY_END:
+            adjustment = ScheduleAdjustment(
+                schedule_id=schedule_id, adjustment_type="HOLIDAY", original_date=current, target_date=None
+            )
+            db.add(adjustment)
+            db.flush()
+            for event in db.query(Event).filter(
+                Event.schedule_id == schedule_id,
+                Event.is_active == True,
+                Event.is_override == False,
+                func.date(Event.start_time) == current
+            ).all():
+                event.is_active = False
+                affected += 1
+            current += timedelta(days=1)
+        db.commit()
+        return affected
+    finally:
+        db.close()
+
+
+def range_holiday(schedule_id: int) -> int:
+    db = SessionLocal()
+    try:
+        schedule = db.get(Schedule, schedule_id)
+        request = HolidayAdjustmentRequest(holiday_date=HOLIDAY_START, end_date=HOLIDAY_END)
+        return _handle_holiday_adjustment(db, schedule, request).affected_events
+    finally:
+        db.close()
+
+
+def timed_revert(schedule_id: int, revert) -> tuple:
+    """应用区间假期后计时撤销，返回 (耗时秒, 恢复的事件数)"""
+    range_holiday(schedule_id)
+    db = SessionLocal()
+    try:
+        adjustment = db.query(ScheduleAdjustment).filter(ScheduleAdjustment.schedule_id == schedule_id).one()
+        started = time.perf_counter()
+        revert(db, adjustment)
+        db.commit()
+        elapsed = time.perf_counter() - started
+        restored = db.query(Event).filter(Event.schedule_id == schedule_id, Event.is_active == False).count()
+        return elapsed, restored
+    finally:
+        db.close()
+
+
+def _reset(schedule_id: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(update(Event.__table__).where(Event.__table__.c.schedule_id == schedule_id).values(is_active=True))
+        conn.execute(delete(ScheduleAdjustment.__table__))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    schedule_id = seed(args.events)
+    print(f"{args.events} events, database: {os.environ['DATABASE_URL']}")
+    results = {}
+    for name, fn in (("legacy", legacy_holiday), ("range", range_holiday)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            _reset(schedule_id)
+            started = time.perf_counter()
+            affected = fn(schedule_id)
+            best = min(best, time.perf_counter() - started)
+        results[name] = best
+        print(f"{name:<8} {best * 1000:10.1f} ms  ({affected} events hidden)")
+    print(f"speedup: {results['legacy'] / results['range']:.1f}x")
+
+    reverts = (
+        ("undo", undo_adjustment),
+        ("replay", lambda db, adjustment: replay_adjustments(db, adjustment.schedule_id, exclude=[adjustment.id])),
+    )
+    for name, revert in reverts:
+        best = float("inf")
+        for _ in range(args.repeat):
+            _reset(schedule_id)
+            elapsed, hidden = timed_revert(schedule_id, revert)
+            best = min(best, elapsed)
+        print(f"{name:<8} {best * 1000:10.1f} ms  ({hidden} events still hidden)")
+
+
+if __name__ == "__main__":
+    main()
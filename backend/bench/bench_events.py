@@ -0,0 +1,145 @@
+"""
+Event list serialization benchmark: ORM objects + EventResponse vs. the
+column-tuple / orjson fast path (services/event_rows.py).
+
+Seeds one user with a schedule of N events and builds the JSON body of
+GET /api/schedule/ both ways:
+
+  * orm:  select(Event) with schedule and owner joined in, validated through
+          List[EventResponse] (from_attributes) and rendered with json.dumps,
+          which is what FastAPI does for a response_model
+  * fast: select the needed columns as tuples, one dict per event, orjson
+
+Latency is the best of --repeat runs; allocations are the tracemalloc peak
+of a separate run.
+
+Run from the backend directory:
+
+    python -m bench.bench_events [--events 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+_db_dir = tempfile.mkdtemp(prefix="bench_events_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from bench.bench_ingest import SCHEDULE_START  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Event, Schedule, User  # noqa: E402
+from schemas import EventResponse  # noqa: E402
+from services.event_ingest import ingest_events  # noqa: E402
+from services.event_rows import event_list_response, select_event_rows  # noqa: E402
+from utils import get_default_class_times  # noqa: E402
+
+EVENT_LIST = TypeAdapter(List[EventResponse])
+
+
+def seed(count: int) -> int:
+    """创建一个用户和包含 count 个事件的课表，返回用户ID"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(student_id="bench", hashed_password="x", full_name="bench", class_name="计工本2301", grade="2023")
+        db.add(user)
+        db.flush()
+        schedule = Schedule(name="bench", owner_id=user.id, start_date=SCHEDULE_START, class_times=get_default_class_times())
+        db.add(schedule)
+        db.flush()
+        base = datetime.combine(SCHEDULE_START, datetime.min.time()) + timedelta(hours=8)
+        ingest_events(db, schedule.id, (
+            {
+                "title": f"课程{index % 40}",
+                "location": f"教{index % 9}-{index % 300}",
+                "instructor": f"教师{index % 60}",
+                "start_time": base + timedelta(days=index % 140, minutes=index // 140 % 12 * 50),
+                "end_time": base + timedelta(days=index % 140, minutes=index // 140 % 12 * 50 + 45),
+                "weeks_input": str(index % 140 // 7 + 1),
+                "day_of_week": index % 7 + 1,
+                "period": "1-2节",
+            }
+            for index in range(count)
+        ))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def orm_body(user_id: int) -> bytes:
+    db = SessionLocal()
+    try:
+        events = db.scalars(
+            select(Event)
+            .options(joinedload(Event.schedule).joinedload(Schedule.owner))
+            .join(Schedule)
+            .where(Schedule.owner_id == user_id, Event.is_active == True)
+            .order_by(Event.start_time, Event.id)
+        ).all()
+        for event in events:
+            event.owner = event.schedule.owner
+        content = EVENT_LIST.dump_python(EVENT_LIST.validate_python(events, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    finally:
+        db.close()
+
+
+def fast_body(user_id: int) -> bytes:
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select_event_rows()
+            .where(Schedule.owner_id == user_id, Event.is_active == True)
+            .order_by(Event.start_time, Event.id)
+        ).all()
+        return event_list_response(rows).body
+    finally:
+        db.close()
+
+
+def measure(fn, user_id: int, repeat: int) -> tuple:
+    """返回 (最短耗时秒, tracemalloc 峰值字节, 响应字节数)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(user_id)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn(user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    user_id = seed(args.events)
+    assert json.loads(orm_body(user_id)) == json.loads(fast_body(user_id)), "bodies differ"
+
+    print(f"{args.events} events, database: {os.environ['DATABASE_URL']}")
+    print(f"{'':<6} {'best':>10}    {'peak':>10}     {'size':>10}")
+    results = {}
+    for name, fn in (("orm", orm_body), ("fast", fast_body)):
+        best, peak, size = measure(fn, user_id, args.repeat)
+        results[name] = best
+        print(f"{name:<6} {best * 1000:10.1f} ms {peak / 1024 / 1024:10.1f} MiB {size / 1024:10.1f} KiB")
+    print(f"speedup: {results['orm'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
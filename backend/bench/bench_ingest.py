@@ -0,0 +1,174 @@
+"""
+Import ingestion benchmark: row-by-row ORM adds vs. the bulk ingest service.
+
+Scenarios:
+  * ZFW timetable expanded to ~400 occurrences
+  * ICS file with 10,000 VEVENTs (parse + ingest measured separately)
+
+Run from the backend directory:
+
+    python -m bench.bench_ingest [--repeat 3]
+
+A throwaway SQLite database is used; DATABASE_PROFILE is honoured so the
+production pragmas can be compared with the default profile.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_ingest_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import delete  # noqa: E402
+
+from bench.fake_jwxt import sample_kb_list  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from importer import ZFWImporter  # noqa: E402
+from models import Event, Schedule, User  # noqa: E402
+from services.event_ingest import ingest_events  # noqa: E402
+
+SCHEDULE_START = date(2025, 9, 8)
+
+
+def _setup() -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(student_id="bench", hashed_password="x", full_name="bench", class_name="c", grade="2025")
+        db.add(user)
+        db.flush()
+        schedule = Schedule(name="bench", owner_id=user.id, start_date=SCHEDULE_START, class_times={})
+        db.add(schedule)
+        db.commit()
+        return schedule.id
+    finally:
+        db.close()
+
+
+def zfw_events(target: int = 400, seed: int = 0) -> list:
+    """生成约 target 个上课事件（与教务系统导入的结构一致），seed 不同则课程安排不同"""
+    courses = 1
+    while True:
+        with contextlib.redirect_stdout(io.StringIO()):
+            events = ZFWImporter._parse_schedule_json({"kbList": sample_kb_list(courses, seed)}, SCHEDULE_START)
+        if len(events) >= target:
+            return events[:target]
+        courses += 1
+
+
+def ics_text(count: int = 10000) -> str:
+    """生成包含 count 个单次 VEVENT 的 ICS 文本"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//EN"]
+    base = datetime.combine(SCHEDULE_START, datetime.min.time()) + timedelta(hours=8)
+    for index in range(count):
+        start = base + timedelta(days=index % 140, minutes=(index // 140) % 10 * 60)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:bench-{index}@chronosync",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{start + timedelta(minutes=45):%Y%m%dT%H%M%S}",
+            f"SUMMARY:课程{index % 40}",
+            f"LOCATION:A{index % 300}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def ics_events(text: str) -> list:
+    """与 ICS 导入接口相同的解析逻辑（不含数据库写入）"""
+    import ics
+    from ics_export import expand_weekly_recurrence
+
+    calendar = ics.Calendar(text)
+    events = []
+    for ics_event in calendar.events:
+        for occurrence in expand_weekly_recurrence(ics_event):
+            start = occurrence.begin.datetime.replace(tzinfo=None)
+            week = (start.date() - SCHEDULE_START).days // 7 + 1
+            events.append({
+                "title": occurrence.name, "location": occurrence.location or "",
+                "description": occurrence.description or "",
+                "start_time": start, "end_time": occurrence.end.datetime.replace(tzinfo=None),
+                "day_of_week": start.isoweekday(), "weeks_input": str(week), "weeks_display": f"第{week}周",
+            })
+    return events
+
+
+def legacy_ingest(schedule_id: int, events: list) -> None:
+    """原实现：逐行 db.delete / db.add"""
+    db = SessionLocal()
+    try:
+        for existing in db.query(Event).filter(Event.schedule_id == schedule_id).all():
+            db.delete(existing)
+        for data in events:
+            db.add(Event(schedule_id=schedule_id, **data))
+        db.commit()
+    finally:
+        db.close()
+
+
+def bulk_ingest(schedule_id: int, events: list) -> None:
+    db = SessionLocal()
+    try:
+        ingest_events(db, schedule_id, events, replace_criteria=[])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _clear(schedule_id: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(Event.__table__).where(Event.__table__.c.schedule_id == schedule_id))
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    """返回 repeat 次中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(repeat: int = 3) -> dict:
+    schedule_id = _setup()
+    results = {}
+
+    timetable = zfw_events(400)
+    for name, fn in (("legacy", legacy_ingest), ("bulk", bulk_ingest)):
+        _clear(schedule_id)
+        # 每轮都替换已有的同一批事件，与重复导入的场景一致
+        results[f"zfw_400_{name}_s"] = timed(fn, schedule_id, timetable, repeat=repeat)
+
+    text = ics_text(10000)
+    results["ics_10k_parse_s"] = timed(ics_events, text, repeat=1)
+    parsed = ics_events(text)
+    for name, fn in (("legacy", legacy_ingest), ("bulk", bulk_ingest)):
+        _clear(schedule_id)
+        results[f"ics_10k_{name}_s"] = timed(fn, schedule_id, parsed, repeat=repeat)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(f"database: {os.environ['DATABASE_URL']} (profile={os.getenv('DATABASE_PROFILE', 'default')})")
+    for key, seconds in results.items():
+        print(f"{key:<24} {seconds * 1000:10.1f} ms")
+    for scenario in ("zfw_400", "ics_10k"):
+        legacy, bulk = results[f"{scenario}_legacy_s"], results[f"{scenario}_bulk_s"]
+        print(f"{scenario} speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Concurrent login load test.
+
+Fires a burst of /api/auth/token requests at a running server while
+probing /health, so both login throughput and event-loop stalls show up:
+with bcrypt on the event loop the probe latency grows with the burst,
+with the hashing pool it stays flat.
+
+    uvicorn main:app --port 8000            # in another shell
+    python -m bench.bench_login --url http://127.0.0.1:8000 --concurrency 50 --requests 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(name: str, latencies: List[float]) -> str:
+    if not latencies:
+        return f"{name:<8} no samples"
+    return (
+        f"{name:<8} n={len(latencies):<5} "
+        f"p50={_percentile(latencies, 50) * 1000:8.1f} ms  "
+        f"p95={_percentile(latencies, 95) * 1000:8.1f} ms  "
+        f"max={max(latencies) * 1000:8.1f} ms  "
+        f"mean={statistics.mean(latencies) * 1000:8.1f} ms"
+    )
+
+
+async def run(url: str, student_id: str, password: str, concurrency: int, total: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies: List[float] = []
+        statuses: dict = {}
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                resp = await client.post("/api/auth/token", json={"student_id": student_id, "password": password})
+                login_latencies.append(time.perf_counter() - started)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        async def probe(samples: List[float]):
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        probe_latencies: List[float] = []
+        probe_task = asyncio.create_task(probe(probe_latencies))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "elapsed": elapsed,
+        "logins": login_latencies,
+        "probe": probe_latencies,
+        "statuses": statuses,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent login load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--student-id", default="202311001145")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.student_id, args.password, args.concurrency, args.requests))
+    print(f"{args.requests} logins, concurrency {args.concurrency}: "
+          f"{result['elapsed']:.2f} s, {args.requests / result['elapsed']:.1f} logins/s, status {result['statuses']}")
+    print(_summary("login", result["logins"]))
+    print(_summary("/health", result["probe"]))
+
+
+if __name__ == "__main__":
+    main()
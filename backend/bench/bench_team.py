@@ -0,0 +1,110 @@
+"""
+Team view benchmark: full nested team schedule vs. the windowed timetable,
+and the common free-slot finder.
+
+Seeds a team whose members each have a ZFW-style semester timetable and
+measures response time and payload size of
+
+  * GET /api/teams/{id}/schedules    (all events, nested schedule/owner)
+  * GET /api/teams/{id}/timetable    (one week, owners table + compact events)
+  * GET /api/teams/{id}/free-slots   (one week and the whole 20-week semester;
+                                       the first request builds the occupancy bitmaps)
+
+Run from the backend directory:
+
+    python -m bench.bench_team [--members 50] [--repeat 5] [--skip-full]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_team_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from auth import create_access_token  # noqa: E402
+from bench.bench_ingest import SCHEDULE_START, zfw_events  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Schedule, Team, User  # noqa: E402
+from services.event_ingest import ingest_events  # noqa: E402
+
+
+def seed(members: int, occurrences: int = 400) -> int:
+    """创建一个 members 人的团队，每人一个课表，返回团队ID"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = []
+        for index in range(members):
+            user = User(
+                student_id=f"bench{index:03d}", hashed_password="x",
+                full_name=f"成员{index}", class_name="计工本2301", grade="2023"
+            )
+            db.add(user)
+            users.append(user)
+        db.flush()
+        for index, user in enumerate(users):
+            # 每 5 人一个班，同班课表相同
+            timetable = zfw_events(occurrences, seed=index // 5)
+            schedule = Schedule(name="本学期", owner_id=user.id, start_date=SCHEDULE_START, class_times={})
+            db.add(schedule)
+            db.flush()
+            ingest_events(db, schedule.id, timetable)
+        team = Team(name="bench", team_code=Team.generate_team_code(), creator_id=users[0].id, members=users)
+        db.add(team)
+        db.commit()
+        return team.id
+    finally:
+        db.close()
+
+
+def measure(client: TestClient, url: str, headers: dict, repeat: int) -> tuple:
+    """返回 (首次耗时秒, 最短耗时秒, 响应字节数)；首次请求会生成占用位图"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+        size = len(response.content)
+    return timings[0], min(timings), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-full", action="store_true", help="skip the unwindowed /schedules endpoint")
+    args = parser.parse_args()
+
+    team_id = seed(args.members)
+    # 不进入 lifespan，避免创建示例用户
+    from main import app
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench000"})}
+
+    week_from = SCHEDULE_START + timedelta(weeks=3)
+    week_to = week_from + timedelta(days=6)
+    semester_to = SCHEDULE_START + timedelta(weeks=20, days=-1)
+    scenarios = {
+        "schedules (all)": f"/api/teams/{team_id}/schedules",
+        "timetable (week)": f"/api/teams/{team_id}/timetable?from={week_from}&to={week_to}",
+        "free-slots (week)": f"/api/teams/{team_id}/free-slots?from={week_from}&to={week_to}",
+        "free-slots (term)": f"/api/teams/{team_id}/free-slots?from={SCHEDULE_START}&to={semester_to}",
+    }
+    if args.skip_full:
+        del scenarios["schedules (all)"]
+    print(f"team of {args.members} members, database: {os.environ['DATABASE_URL']}")
+    print(f"{'':<18} {'first':>10}    {'best':>10}    {'size':>10}")
+    for name, url in scenarios.items():
+        first, best, size = measure(client, url, headers, args.repeat)
+        print(f"{name:<18} {first * 1000:10.1f} ms {best * 1000:10.1f} ms {size / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Synthetic campus data for benchmarks and load tests.
+
+Creates N students spread over classes and grades, one semester schedule
+per student and a set of teams. Students of the same class share a
+timetable, which is generated as a JWXT kbList (bench.fake_jwxt) and
+expanded by the real ZFW import parser, so event counts, week patterns
+and periods look like an actual SDNU import. Every user gets the same
+password (BENCH_PASSWORD) and one admin account is added.
+
+The output is deterministic for a given --seed. Run from the backend
+directory against an empty database:
+
+    DATABASE_URL=sqlite:///./bench.db python -m bench.datagen --users 2000 --classes 40 --teams 100
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from auth import get_password_hash
+from bench.fake_jwxt import sample_kb_list
+from database import Base, SessionLocal, engine
+from importer import ZFWImporter
+from models import Schedule, Team, User, user_teams_table
+from services.event_ingest import ingest_events
+from utils import get_default_class_times
+
+BENCH_PASSWORD = os.getenv("BENCH_PASSWORD", "bench123")
+BENCH_ADMIN_ID = "benchadmin"
+SEMESTER_START = date(2025, 9, 8)
+
+_MAJORS = [("计工本", "11"), ("软工本", "12"), ("数媒本", "13"), ("通信本", "14"),
+           ("电信本", "15"), ("数学本", "21"), ("物理本", "22"), ("汉语言本", "31")]
+_GRADES = ["2022", "2023", "2024", "2025"]
+_SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+_GIVEN = "浩然子涵欣怡宇轩梓萱俊杰雨桐博文诗琪晨阳思远嘉怡"
+
+
+def class_timetable(class_index: int, courses: int = 12) -> List[Dict[str, Any]]:
+    """某个班级的学期课表（由 ZFW 导入解析器展开的事件字典）"""
+    kb_list = sample_kb_list(courses, seed=class_index)
+    return ZFWImporter._parse_schedule_json({"kbList": kb_list}, SEMESTER_START)
+
+
+def _class_names(count: int) -> List[tuple]:
+    """生成 count 个 (班级名, 年级, 专业代码)，如 ("计工本2301", "2023", "11")"""
+    classes = []
+    for index in range(count):
+        major, code = _MAJORS[index % len(_MAJORS)]
+        grade = _GRADES[index // len(_MAJORS) % len(_GRADES)]
+        number = index // (len(_MAJORS) * len(_GRADES)) + 1
+        classes.append((f"{major}{grade[2:]}{number:02d}", grade, code))
+    return classes
+
+
+def student_ids(users: int, classes: int) -> List[str]:
+    """generate_campus 生成的学号（不访问数据库，供压测脚本登录使用）"""
+    class_list = _class_names(classes)
+    return [
+        f"{class_list[index % classes][1]}{class_list[index % classes][2]}{index:06d}"
+        for index in range(users)
+    ]
+
+
+def generate_campus(
+    db: Session,
+    users: int = 200,
+    classes: int = 10,
+    teams: int = 20,
+    team_size: int = 12,
+    courses: int = 12,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    写入模拟的学生、课表和团队数据并提交。
+
+    Args:
+        db: 数据库会话
+        users: 学生数量
+        classes: 班级数量，学生按顺序平均分到各班
+        teams: 团队数量
+        team_size: 每个团队的最大人数（实际人数在 2 到 team_size 之间随机）
+        courses: 每个班级课表中的课程数量
+        seed: 随机种子
+
+    Returns:
+        Dict[str, Any]: 学号列表、班级列表、团队ID列表、事件总数和管理员学号
+    """
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    class_list = _class_names(classes)
+    timetables = [class_timetable(index, courses) for index in range(classes)]
+
+    admin = User(student_id=BENCH_ADMIN_ID, hashed_password=hashed_password, full_name="压测管理员",
+                 class_name="教务处", grade="2000", role="admin")
+    db.add(admin)
+
+    students = []
+    for index, student_id in enumerate(student_ids(users, classes)):
+        class_name, grade, _ = class_list[index % classes]
+        students.append(User(
+            student_id=student_id,
+            hashed_password=hashed_password,
+            full_name=rng.choice(_SURNAMES) + "".join(rng.sample(_GIVEN, 2)),
+            class_name=class_name,
+            grade=grade,
+        ))
+    db.add_all(students)
+    db.flush()
+
+    schedules = [
+        Schedule(name="2025-2026学年第一学期", owner_id=student.id, start_date=SEMESTER_START,
+                 total_weeks=20, class_times=get_default_class_times())
+        for student in students
+    ]
+    db.add_all(schedules)
+    db.flush()
+
+    event_count = 0
+    for index, schedule in enumerate(schedules):
+        event_count += ingest_events(db, schedule.id, timetables[index % classes])["inserted"]
+
+    team_ids = []
+    for index in range(teams):
+        members = rng.sample(students, min(len(students), rng.randint(2, team_size)))
+        team = Team(name=f"小组{index + 1:03d}", team_code=Team.generate_team_code(), creator_id=members[0].id)
+        db.add(team)
+        db.flush()
+        db.execute(insert(user_teams_table), [{"user_id": member.id, "team_id": team.id} for member in members])
+        team_ids.append(team.id)
+
+    db.commit()
+    return {
+        "student_ids": [student.student_id for student in students],
+        "class_names": [name for name, _, _ in class_list],
+        "team_ids": team_ids,
+        "events": event_count,
+        "admin": BENCH_ADMIN_ID,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--team-size", type=int, default=12)
+    parser.add_argument("--courses", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        campus = generate_campus(
+            db, users=args.users, classes=args.classes, teams=args.teams,
+            team_size=args.team_size, courses=args.courses, seed=args.seed
+        )
+    finally:
+        db.close()
+    print(
+        f"{len(campus['student_ids'])} students in {len(campus['class_names'])} classes, "
+        f"{len(campus['team_ids'])} teams, {campus['events']} events "
+        f"in {time.perf_counter() - started:.1f} s"
+    )
+    print(f"database: {os.getenv('DATABASE_URL', 'sqlite:///./schedule_app.db')}, password: {BENCH_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Local fake of the SDNU JWXT (正方教务系统) endpoints used by the importer.
+
+Lets the ZFW import flow (captcha -> RSA login -> timetable) run and be
+benchmarked without network access. Point the backend at it with:
+
+    python -m bench.fake_jwxt --port 8765
+    JWXT_BASE_URL=http://127.0.0.1:8765/jwglxt uvicorn main:app
+
+Any student id is accepted; the password must decrypt to FAKE_JWXT_PASSWORD
+and the captcha must equal FAKE_JWXT_CAPTCHA. FAKE_JWXT_LATENCY adds a
+per-request delay (seconds) to simulate the real server's round trips.
+The tests and bench.load start it in-process with serve_in_thread().
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import random
+import secrets
+from typing import Dict, List
+
+from Crypto.Cipher import PKCS1_v1_5
+from Crypto.PublicKey import RSA
+from fastapi import FastAPI, Form, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+
+FAKE_CAPTCHA = os.getenv("FAKE_JWXT_CAPTCHA", "1234")
+FAKE_PASSWORD = os.getenv("FAKE_JWXT_PASSWORD", "password")
+FAKE_LATENCY = float(os.getenv("FAKE_JWXT_LATENCY", "0"))
+FAKE_COURSES = int(os.getenv("FAKE_JWXT_COURSES", "12"))
+
+# 1x1 PNG
+_CAPTCHA_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC"
+)
+
+_COURSE_NAMES = ["高等数学", "线性代数", "大学英语", "数据结构", "操作系统", "计算机网络",
+                 "数据库原理", "离散数学", "大学物理", "体育", "形势与政策", "软件工程"]
+_WEEK_PATTERNS = ["1-16周", "1-8周", "9-16周", "1-15周(单)", "2-16周(双)", "1-4周,6-17周"]
+
+
+def sample_kb_list(courses: int = 12, seed: int = 0) -> List[Dict]:
+    """生成与教务系统 kbList 结构一致的课程数据"""
+    rng = random.Random(seed)
+    kb_list = []
+    for index in range(courses):
+        start = rng.choice([1, 3, 5, 7, 9])
+        kb_list.append({
+            "kcmc": f"{_COURSE_NAMES[index % len(_COURSE_NAMES)]}{index // len(_COURSE_NAMES) or ''}",
+            "xm": f"教师{index:02d}",
+            "cdmc": f"{rng.choice('ABCDE')}{rng.randint(101, 520)}",
+            "xqj": str(rng.randint(1, 5)),
+            "jcor": f"{start}-{start + 1}",
+            "jc": f"{start}-{start + 1}节",
+            "zcd": rng.choice(_WEEK_PATTERNS),
+        })
+    return kb_list
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Fake JWXT")
+    rsa_key = RSA.generate(1024)
+    cipher = PKCS1_v1_5.new(rsa_key)
+    # session id -> {"csrftoken": str, "logged_in": bool, "student_id": str}
+    sessions: Dict[str, dict] = {}
+    kb_list = sample_kb_list(FAKE_COURSES)
+
+    def session_for(request: Request, response: Response) -> dict:
+        session_id = request.cookies.get("JSESSIONID")
+        if not session_id or session_id not in sessions:
+            session_id = secrets.token_hex(16)
+            sessions[session_id] = {"csrftoken": secrets.token_hex(8), "logged_in": False}
+            response.set_cookie("JSESSIONID", session_id, path="/jwglxt")
+        return sessions[session_id]
+
+    @app.middleware("http")
+    async def latency(request: Request, call_next):
+        if FAKE_LATENCY:
+            await asyncio.sleep(FAKE_LATENCY)
+        return await call_next(request)
+
+    @app.get("/jwglxt/xtgl/login_slogin.html", response_class=HTMLResponse)
+    async def login_page(request: Request, response: Response):
+        session = session_for(request, response)
+        return f'<html><body><input type="hidden" id="csrftoken" value="{session["csrftoken"]}"/></body></html>'
+
+    @app.get("/jwglxt/xtgl/login_getPublicKey.html")
+    async def public_key():
+        def b64(value: int) -> str:
+            return base64.b64encode(value.to_bytes((value.bit_length() + 7) // 8, "big")).decode()
+        return {"modulus": b64(rsa_key.n), "exponent": b64(rsa_key.e)}
+
+    @app.get("/jwglxt/kaptcha")
+    async def captcha(request: Request):
+        response = Response(content=_CAPTCHA_PNG, media_type="image/png")
+        session_for(request, response)
+        return response
+
+    @app.post("/jwglxt/xtgl/login_slogin.html")
+    async def login(
+        request: Request,
+        csrftoken: str = Form(...),
+        yhm: str = Form(...),
+        mm: str = Form(...),
+        yzm: str = Form(...)
+    ):
+        session = sessions.get(request.cookies.get("JSESSIONID", ""))
+        if not session or csrftoken != session["csrftoken"]:
+            return HTMLResponse("<html>会话已失效</html>")
+        if yzm != FAKE_CAPTCHA:
+            return HTMLResponse("<html>验证码输入错误</html>")
+        password = cipher.decrypt(base64.b64decode(mm), None)
+        if password is None or password.decode("utf-8") != FAKE_PASSWORD:
+            return HTMLResponse("<html>用户名或密码不正确</html>")
+        session.update(logged_in=True, student_id=yhm)
+        return RedirectResponse("/jwglxt/xtgl/index_initMenu.html", status_code=302)
+
+    @app.get("/jwglxt/xtgl/index_initMenu.html", response_class=HTMLResponse)
+    @app.get("/jwglxt/xtgl/login_loginIndex.html", response_class=HTMLResponse)
+    async def index():
+        return "<html>教学管理信息服务平台</html>"
+
+    @app.post("/jwglxt/kbcx/xskbcx_cxXsgrkb.html")
+    async def timetable(request: Request):
+        session = sessions.get(request.cookies.get("JSESSIONID", ""))
+        if not session or not session["logged_in"]:
+            return JSONResponse({"error": "not logged in"}, status_code=401)
+        return {
+            "xsxx": {"XH": session["student_id"], "XM": "测试学生", "BJMC": "计工本2303"},
+            "kbList": kb_list,
+        }
+
+    return app
+
+
+app = create_app()
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 8765):
+    """在后台线程中启动伪教务系统，返回已就绪的 uvicorn.Server（设置 should_exit = True 停止）"""
+    import threading
+    import time
+
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="fake-jwxt", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"fake JWXT failed to start on {host}:{port}")
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake JWXT server for offline import tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
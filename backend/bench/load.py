@@ -0,0 +1,261 @@
+"""
+Macro load test of the main routes with a weighted request mix.
+
+Each virtual user logs in through /api/auth/token, then sends requests
+picked at random (by weight) from the scenarios below until --requests
+have been sent in total, --concurrency users at a time:
+
+  my-week          GET  /api/schedule/?from=&to=            (one week)
+  my-schedules     GET  /api/schedules/
+  schedule-events  GET  /api/schedules/{id}/events
+  ics-export       GET  /api/schedule/export/ics
+  team-timetable   GET  /api/teams/{id}/timetable?from=&to=
+  team-free-slots  GET  /api/teams/{id}/free-slots?from=&to=
+  team-filtered    GET  /api/schedule/filtered?team_ids=
+  create-event     POST /api/schedule/                      (skipped with --read-only)
+
+While the mix runs, --importers further students re-import their
+timetable in a loop, so bulk writes contend with the reads:
+
+  bulk-import      POST /api/import/zfw                     (skipped with --read-only)
+
+Each import logs in to bench.fake_jwxt and replaces the course events of
+the student's schedule (delete + bulk insert through ingest_events).
+
+Without --url the app runs in-process (httpx ASGITransport) on a fresh
+SQLite database filled by bench.datagen, with the fake JWXT started on
+JWXT_BASE_URL (default http://127.0.0.1:8765/jwglxt).
+DATABASE_PROFILE=production compares the WAL profile with the default
+one under concurrent reads. With --url the target server must have been
+seeded by bench.datagen with the same --users and --classes, and must
+point JWXT_BASE_URL at a running bench.fake_jwxt (or pass --importers 0).
+
+p95 latencies are compared with bench/baselines.json (suite "load"); the
+run exits with status 1 on a regression beyond --tolerance.
+
+    python -m bench.load [--requests 2000] [--concurrency 20] [--importers 1] [--read-only]
+    python -m bench.load --url http://127.0.0.1:8000 --users 2000 --classes 40
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# 进程内运行时使用的临时数据库（--url 模式不访问）
+_db_dir = tempfile.mkdtemp(prefix="bench_load_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+# 进程内的应用从本地伪教务系统导入（importer 在导入时读取 JWXT_BASE_URL）
+os.environ.setdefault("JWXT_BASE_URL", "http://127.0.0.1:8765/jwglxt")
+
+import httpx  # noqa: E402
+
+from bench.baseline import compare, load_baselines, save_baselines  # noqa: E402
+from bench.bench_login import _percentile  # noqa: E402
+from bench.datagen import BENCH_PASSWORD, SEMESTER_START, student_ids  # noqa: E402
+from bench.fake_jwxt import FAKE_CAPTCHA, FAKE_PASSWORD  # noqa: E402
+
+WEEK_FROM = SEMESTER_START + timedelta(weeks=3)
+WEEK_TO = WEEK_FROM + timedelta(days=6)
+
+# (名称, 权重)
+SCENARIOS = [
+    ("my-week", 6),
+    ("my-schedules", 2),
+    ("schedule-events", 2),
+    ("ics-export", 1),
+    ("team-timetable", 3),
+    ("team-free-slots", 2),
+    ("team-filtered", 1),
+    ("create-event", 1),
+]
+# 与读写混合并发运行的批量导入，不计入 --requests
+IMPORT_SCENARIO = "bulk-import"
+
+
+class VirtualUser:
+    """One logged-in student with the ids its requests need."""
+
+    def __init__(self, student_id: str):
+        self.student_id = student_id
+        self.headers: Dict[str, str] = {}
+        self.schedule_id: Optional[int] = None
+        self.team_id: Optional[int] = None
+
+    async def login(self, client: httpx.AsyncClient) -> None:
+        response = await client.post("/api/auth/token", json={"student_id": self.student_id, "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        schedules = (await client.get("/api/schedules/", headers=self.headers)).json()
+        self.schedule_id = schedules[0]["id"] if schedules else None
+        teams = (await client.get("/api/me/teams", headers=self.headers)).json()
+        self.team_id = teams[0]["id"] if teams else None
+
+    def request(self, scenario: str, rng: random.Random) -> Optional[tuple]:
+        """返回 (method, url, json)；该用户缺少所需数据时返回 None"""
+        week = f"from={WEEK_FROM}&to={WEEK_TO}"
+        if scenario == "my-week":
+            return "GET", f"/api/schedule/?{week}", None
+        if scenario == "my-schedules":
+            return "GET", "/api/schedules/", None
+        if scenario == "schedule-events" and self.schedule_id:
+            return "GET", f"/api/schedules/{self.schedule_id}/events", None
+        if scenario == "ics-export":
+            return "GET", "/api/schedule/export/ics", None
+        if scenario == "team-timetable" and self.team_id:
+            return "GET", f"/api/teams/{self.team_id}/timetable?{week}", None
+        if scenario == "team-free-slots" and self.team_id:
+            return "GET", f"/api/teams/{self.team_id}/free-slots?{week}", None
+        if scenario == "team-filtered" and self.team_id:
+            return "GET", f"/api/schedule/filtered?team_ids={self.team_id}&start_date={WEEK_FROM}&end_date={WEEK_TO}", None
+        if scenario == "create-event":
+            day = WEEK_FROM + timedelta(days=rng.randint(0, 4))
+            return "POST", "/api/schedule/", {
+                "title": "压测自习", "start_time": f"{day}T19:00:00", "end_time": f"{day}T20:30:00",
+                "day_of_week": day.isoweekday(), "weeks_input": str(rng.randint(1, 16)),
+            }
+        return None
+
+    async def reimport(self, client: httpx.AsyncClient) -> httpx.Response:
+        """从伪教务系统重新导入到自己的课表，返回导入请求的响应"""
+        session = (await client.get("/api/import/zfw/session")).json()
+        return await client.post("/api/import/zfw", headers=self.headers, json={
+            "session_id": session["session_id"], "username": self.student_id, "password": FAKE_PASSWORD,
+            "captcha": FAKE_CAPTCHA, "action": "use_existing", "schedule_id": self.schedule_id,
+        })
+
+
+async def run(client: httpx.AsyncClient, users: List[str], total: int, concurrency: int,
+              importers: int, read_only: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    scenarios = [(name, weight) for name, weight in SCENARIOS if not (read_only and name == "create-event")]
+    names = [name for name, _ in scenarios]
+    weights = [weight for _, weight in scenarios]
+
+    importers = 0 if read_only else importers
+    picked = rng.sample(users, min(concurrency + importers, len(users)))
+    virtual_users = [VirtualUser(student_id) for student_id in picked[:concurrency]]
+    import_users = [VirtualUser(student_id) for student_id in picked[concurrency:]]
+    for user in virtual_users + import_users:
+        await user.login(client)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    remaining = total
+
+    async def worker(user: VirtualUser, worker_rng: random.Random) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            scenario = worker_rng.choices(names, weights)[0]
+            spec = user.request(scenario, worker_rng)
+            if spec is None:
+                continue
+            remaining -= 1
+            method, url, body = spec
+            started = time.perf_counter()
+            response = await client.request(method, url, headers=user.headers, json=body)
+            latencies[scenario].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[scenario] += 1
+
+    mix_done = asyncio.Event()
+
+    async def importer(user: VirtualUser) -> None:
+        while not mix_done.is_set():
+            started = time.perf_counter()
+            response = await user.reimport(client)
+            latencies[IMPORT_SCENARIO].append(time.perf_counter() - started)
+            if response.status_code >= 400 or not response.json().get("success"):
+                errors[IMPORT_SCENARIO] += 1
+
+    import_tasks = [asyncio.create_task(importer(user)) for user in import_users if user.schedule_id]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user, random.Random(seed + index)) for index, user in enumerate(virtual_users)))
+    elapsed = time.perf_counter() - started
+    # 读写混合结束后等待进行中的导入完成
+    mix_done.set()
+    await asyncio.gather(*import_tasks)
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors}
+
+
+async def main_async(args) -> dict:
+    users = student_ids(args.users, args.classes)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+            return await run(client, users, args.requests, args.concurrency, args.importers, args.read_only, args.seed)
+
+    fake_server = None
+    if args.importers and not args.read_only:
+        from bench.fake_jwxt import serve_in_thread
+
+        jwxt = urlsplit(os.environ["JWXT_BASE_URL"])
+        fake_server = serve_in_thread(host=jwxt.hostname, port=jwxt.port or 80)
+
+    from bench.datagen import generate_campus
+    from database import Base, SessionLocal, engine
+    from main import app
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        generate_campus(db, users=args.users, classes=args.classes, teams=args.teams, seed=args.seed)
+    finally:
+        db.close()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            return await run(client, users, args.requests, args.concurrency, args.importers, args.read_only, args.seed)
+    finally:
+        if fake_server is not None:
+            fake_server.should_exit = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="running server to test; default runs the app in-process")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--importers", type=int, default=1, help="students re-importing from the fake JWXT during the mix")
+    parser.add_argument("--read-only", action="store_true", help="leave out the create-event and bulk-import scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 slowdown as a fraction of the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store these p95 latencies as the new baseline")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+
+    sent = sum(len(values) for name, values in result["latencies"].items() if name != IMPORT_SCENARIO)
+    print(f"{sent} requests, concurrency {args.concurrency}: {result['elapsed']:.2f} s, "
+          f"{sent / result['elapsed']:.1f} req/s (database profile {os.getenv('DATABASE_PROFILE', 'default')})")
+    print(f"  {'scenario':<16} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'errors':>7}")
+    p95 = {}
+    for name in [name for name, _ in SCENARIOS] + [IMPORT_SCENARIO]:
+        values = result["latencies"].get(name)
+        if not values:
+            continue
+        p95[f"{name}_p95"] = _percentile(values, 95)
+        print(f"  {name:<16} {len(values):>6} "
+              f"{_percentile(values, 50) * 1000:7.1f} ms {p95[f'{name}_p95'] * 1000:7.1f} ms "
+              f"{_percentile(values, 99) * 1000:7.1f} ms {result['errors'].get(name, 0):>7}")
+
+    regressions = compare(p95, load_baselines("load"), args.tolerance)
+    if args.save_baseline:
+        save_baselines("load", p95)
+        print("baseline saved")
+    elif regressions or any(result["errors"].values()):
+        print(f"regressions: {', '.join(regressions) or 'none'}; errors: {dict(result['errors'])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks for the hot helpers, compared against stored baselines.
+
+Cases (time per call, best of --repeat timeit runs):
+
+  * parse_weeks (cold / cached), parse_week_mask (cached)
+  * ZFW kbList parsing for one class timetable
+  * ICS export of one student's semester (stream_calendar)
+  * filtered event query for one class over one week (crud.get_filtered_events)
+  * event list serialization of one semester (services/event_rows.py)
+
+Data comes from bench.datagen in a throwaway SQLite database. The run
+fails (exit status 1) when a case is slower than bench/baselines.json by
+more than --tolerance. Run from the backend directory:
+
+    python -m bench.micro [--repeat 5] [--tolerance 0.5] [--min-delta 1e-6] [--save-baseline]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+_db_dir = tempfile.mkdtemp(prefix="bench_micro_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from bench.baseline import compare, load_baselines, save_baselines  # noqa: E402
+from bench.datagen import SEMESTER_START, generate_campus  # noqa: E402
+from bench.fake_jwxt import sample_kb_list  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from importer import ZFWImporter  # noqa: E402
+from models import Event, Schedule, User  # noqa: E402
+from ics_export import stream_calendar  # noqa: E402
+from services.event_rows import event_list_response, select_event_rows  # noqa: E402
+import crud  # noqa: E402
+import utils  # noqa: E402
+
+WEEK_STRINGS = ["1-16周", "1-8周,10-17周", "第4-18周", "1,3,5,7,9,11,13,15", "2-16周(双)", "1－12周"]
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """准备数据并返回 {名称: 无参函数}"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    campus = generate_campus(db, users=40, classes=4, teams=4)
+    student = db.query(User).filter(User.student_id == campus["student_ids"][0]).one()
+    schedule_id = db.query(Schedule.id).filter(Schedule.owner_id == student.id).scalar()
+    class_name = student.class_name
+    week_start = datetime.combine(SEMESTER_START + timedelta(weeks=3), datetime.min.time())
+    kb_list = {"kbList": sample_kb_list(12, seed=0)}
+    semester_rows = select_event_rows().where(Schedule.owner_id == student.id, Event.is_active == True)
+
+    def parse_weeks_cold():
+        for week_string in WEEK_STRINGS:
+            utils._parse_weeks_cached.__wrapped__(week_string)
+
+    def parse_weeks_cached():
+        for week_string in WEEK_STRINGS:
+            utils.parse_weeks(week_string)
+
+    def parse_week_mask_cached():
+        for week_string in WEEK_STRINGS:
+            utils.parse_week_mask(week_string)
+
+    return {
+        "parse_weeks_cold_x6": parse_weeks_cold,
+        "parse_weeks_cached_x6": parse_weeks_cached,
+        "parse_week_mask_cached_x6": parse_week_mask_cached,
+        "zfw_parse_class_timetable": lambda: ZFWImporter._parse_schedule_json(kb_list, SEMESTER_START),
+        "ics_export_semester": lambda: "".join(stream_calendar([schedule_id], "bench")),
+        "filtered_class_week": lambda: crud.get_filtered_events(
+            db, week_start, week_start + timedelta(days=6, hours=23, minutes=59), class_names=[class_name]
+        ),
+        "serialize_semester_events": lambda: event_list_response(db.execute(semester_rows).all()).body,
+    }
+
+
+def run(repeat: int = 5) -> Dict[str, float]:
+    """返回 {名称: 每次调用的最短耗时秒}"""
+    results = {}
+    for name, fn in build_cases().items():
+        number, _ = timeit.Timer(fn).autorange()
+        best = min(timeit.repeat(fn, number=number, repeat=repeat))
+        results[name] = best / number
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--min-delta", type=float, default=1e-6,
+                        help="slowdowns below this many seconds are never regressions (timer jitter)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(f"micro benchmarks, database: {os.environ['DATABASE_URL']}")
+    regressions = compare(results, load_baselines("micro"), args.tolerance, args.min_delta)
+    if args.save_baseline:
+        save_baselines("micro", results)
+        print("baseline saved")
+    elif regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
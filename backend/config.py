@@ -3,11 +3,14 @@ Configuration management module for the application.
 Loads and manages settings from config.toml file.
 """
 
+import logging
 import toml
 import os
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 class Config:
     """Configuration manager class."""
     
@@ -22,12 +25,12 @@ class Config:
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     self._config = toml.load(f)
-                print(f"Configuration loaded from {self.config_path}")
+                logger.info("Configuration loaded from %s", self.config_path)
             except Exception as e:
-                print(f"Error loading config: {e}")
+                logger.error("Error loading config: %s", e)
                 self._config = self._get_default_config()
         else:
-            print(f"Config file {self.config_path} not found, using defaults")
+            logger.warning("Config file %s not found, using defaults", self.config_path)
             self._config = self._get_default_config()
             self.save_config()
     
@@ -36,9 +39,9 @@ class Config:
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 toml.dump(self._config, f)
-            print(f"Configuration saved to {self.config_path}")
+            logger.info("Configuration saved to %s", self.config_path)
         except Exception as e:
-            print(f"Error saving config: {e}")
+            logger.error("Error saving config: %s", e)
             raise
     
     def get(self, key: str, default: Any = None) -> Any:
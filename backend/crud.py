@@ -1,10 +1,15 @@
+import logging
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from datetime import datetime
-from models import User, Event, Schedule, Team
+from sqlalchemy import and_, or_, select
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from models import User, Event, Schedule, Team, user_teams_table, bump_schedule_versions
 from schemas import UserCreate, UserUpdate, EventCreate, EventUpdate, TeamCreate, TeamUpdate
 from auth import get_password_hash
+from services.event_rows import EVENT_ROW_COLUMNS, OWNER_ROW_COLUMNS
+from services.event_ingest import build_event_row, insert_events_returning_ids
+
+logger = logging.getLogger(__name__)
 
 # User CRUD operations
 def get_user(db: Session, user_id: int) -> Optional[User]:
@@ -19,14 +24,14 @@ def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     """Get all users."""
     return db.query(User).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user_data) -> User:
-    """Create a new user from UserCreate schema or dict."""
+def create_user(db: Session, user_data, hashed_password: Optional[str] = None) -> User:
+    """Create a new user from UserCreate schema or dict. Pass hashed_password if already hashed off the event loop."""
     if isinstance(user_data, dict):
         # Create from dict (for registration)
         db_user = User(**user_data)
     else:
         # Create from UserCreate schema
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = hashed_password or get_password_hash(user_data.password)
         db_user = User(
             student_id=user_data.student_id,
             hashed_password=hashed_password,
@@ -41,15 +46,16 @@ def create_user(db: Session, user_data) -> User:
     db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
-    """Update user."""
+def update_user(db: Session, user_id: int, user_update: UserUpdate, hashed_password: Optional[str] = None) -> Optional[User]:
+    """Update user. Pass hashed_password if the new password was already hashed off the event loop."""
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
         return None
     
     update_data = user_update.dict(exclude_unset=True)
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        password = update_data.pop("password")
+        update_data["hashed_password"] = hashed_password or get_password_hash(password)
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
@@ -75,17 +81,52 @@ def get_event(db: Session, event_id: int) -> Optional[Event]:
         joinedload(Event.schedule).joinedload(Schedule.owner)
     ).filter(Event.id == event_id).first()
 
-def get_user_events(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Event]:
-    """Get all events for a specific user through their schedules."""
+def event_window_conditions(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> list:
+    """
+    Build filter conditions for a date window and a keyset cursor.
+
+    Events are matched by start_time in [date_from, date_to] (inclusive
+    days) so the (schedule_id, is_active, start_time) index is used.
+    ``after`` is the (start_time, id) of the last row of the previous page;
+    results must be ordered by (start_time, id).
+    """
+    conditions = []
+    if date_from:
+        conditions.append(Event.start_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        conditions.append(Event.start_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if after:
+        after_start, after_id = after
+        conditions.append(or_(
+            Event.start_time > after_start,
+            and_(Event.start_time == after_start, Event.id > after_id)
+        ))
+    return conditions
+
+def get_user_events(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Event]:
+    """Get events for a specific user through their schedules, optionally within a date window / after a cursor."""
     events = db.query(Event).options(
         joinedload(Event.schedule).joinedload(Schedule.owner)
     ).join(Schedule).filter(
         and_(
             Schedule.owner_id == user_id,
             # 与团队视图保持一致的过滤条件
-            or_(Event.is_active == True, Event.is_active.is_(None))
+            or_(Event.is_active == True, Event.is_active.is_(None)),
+            *event_window_conditions(date_from, date_to, after)
         )
-    ).offset(skip).limit(limit).all()
+    ).order_by(Event.start_time, Event.id).offset(skip).limit(limit).all()
     
     # 为每个事件设置 owner 字段
     for event in events:
@@ -116,7 +157,7 @@ def create_event(db: Session, event: EventCreate, schedule_id: int) -> Event:
 
 def create_recurring_event(db: Session, event: EventCreate, schedule_id: int) -> List[Event]:
     """Create recurring events based on weeks_input range."""
-    from utils import parse_weeks
+    from weekset import WeekSet
     from datetime import timedelta, datetime
     
     # 获取课表信息
@@ -125,12 +166,12 @@ def create_recurring_event(db: Session, event: EventCreate, schedule_id: int) ->
         raise ValueError("Schedule not found")
     
     # 解析周数
-    weeks = parse_weeks(event.weeks_input or event.weeks_display or "")
+    weeks = WeekSet.parse(event.weeks_input or event.weeks_display or "")
     if not weeks:
         # 如果没有周数信息，创建单个事件
         return [create_event(db, event, schedule_id)]
     
-    created_events = []
+    rows = []
     
     for week_number in weeks:
         # 计算这一周对应的具体日期
@@ -165,31 +206,27 @@ def create_recurring_event(db: Session, event: EventCreate, schedule_id: int) ->
             new_start_time = event.start_time
             new_end_time = event.end_time
         
-        # 创建这一周的事件
-        week_event = Event(
-            schedule_id=schedule_id,
-            title=event.title,
-            description=event.description,
-            location=event.location,
-            start_time=new_start_time,
-            end_time=new_end_time,
-            instructor=event.instructor,
-            weeks_display=f"第{week_number}周",
-            weeks_input=str(week_number),
-            day_of_week=event.day_of_week,
-            period=event.period
-        )
-        
-        db.add(week_event)
-        created_events.append(week_event)
-    
+        # 这一周的事件
+        rows.append(build_event_row(schedule_id, {
+            "title": event.title,
+            "description": event.description,
+            "location": event.location,
+            "start_time": new_start_time,
+            "end_time": new_end_time,
+            "instructor": event.instructor,
+            "weeks_display": f"第{week_number}周",
+            "weeks_input": str(week_number),
+            "day_of_week": event.day_of_week,
+            "period": event.period,
+        }))
+    
+    # 一条 INSERT ... RETURNING 写入所有周的事件（逐个 add 时每周一条 INSERT）
+    event_ids = insert_events_returning_ids(db, rows)
+    bump_schedule_versions(db, [schedule_id])
     db.commit()
     
-    # 刷新所有创建的事件
-    for event_obj in created_events:
-        db.refresh(event_obj)
-    
-    return created_events
+    # 一次查询重新加载所有创建的事件
+    return db.query(Event).filter(Event.id.in_(event_ids)).order_by(Event.id).all()
 
 def update_event(db: Session, event_id: int, event_update: EventUpdate) -> Optional[Event]:
     """Update event."""
@@ -226,13 +263,11 @@ def get_filtered_events(
     grades: Optional[List[str]] = None,
     full_name_contains: Optional[str] = None,
     event_title_contains: Optional[str] = None
-) -> List[Event]:
-    """Get filtered events with complex query conditions."""
+) -> list:
+    """Get filtered event rows (with schedule and owner columns, see services/event_rows.py)."""
     
-    # Use proper relationships: Event -> Schedule -> User
-    query = db.query(Event).options(
-        joinedload(Event.schedule).joinedload(Schedule.owner)
-    )
+    # Event -> Schedule -> User，只选择响应需要的列
+    query = db.query(*EVENT_ROW_COLUMNS, *OWNER_ROW_COLUMNS).select_from(Event)
     
     # Filter by date range
     query = query.filter(
@@ -243,7 +278,7 @@ def get_filtered_events(
     )
     
     # Join with Schedule and User tables for user-based filters
-    query = query.join(Schedule).join(User)
+    query = query.join(Schedule, Event.schedule_id == Schedule.id).join(User, Schedule.owner_id == User.id)
     
     # Filter by specific user IDs
     if user_ids:
@@ -251,20 +286,9 @@ def get_filtered_events(
     
     # Filter by team IDs - get users from selected teams
     if team_ids:
-        # Get all user IDs from the selected teams
-        team_users = db.query(User).join(User.teams).filter(Team.id.in_(team_ids)).all()
-        team_user_ids = [user.id for user in team_users]
-        if team_user_ids:
-            if user_ids:
-                # If both user_ids and team_ids are provided, use intersection
-                combined_ids = list(set(user_ids) & set(team_user_ids))
-                query = query.filter(User.id.in_(combined_ids))
-            else:
-                # If only team_ids provided, use team member IDs
-                query = query.filter(User.id.in_(team_user_ids))
-        else:
-            # No users found in selected teams, return empty result
-            return []
+        # Members of the selected teams as a subquery (intersects with user_ids when both are given)
+        team_user_ids = select(user_teams_table.c.user_id).where(user_teams_table.c.team_id.in_(team_ids))
+        query = query.filter(User.id.in_(team_user_ids))
     
     # Filter by class names
     if class_names:
@@ -284,18 +308,18 @@ def get_filtered_events(
     if event_title_contains:
         query = query.filter(Event.title.ilike(f"%{event_title_contains}%"))
     
-    # 获取事件并手动设置owner字段
-    events = query.all()
-    
-    # 为每个事件设置 owner 字段
-    for event in events:
-        if event.schedule and event.schedule.owner:
-            event.owner = event.schedule.owner
-    
-    return events
+    return query.all()
 
 
 # Team CRUD operations
+def get_team_memberships(db: Session, team_ids: List[int], user_id: int) -> List[Tuple[int, str, bool]]:
+    """Return (team_id, name, is_member) for each existing team in team_ids, in one query."""
+    rows = db.query(Team.id, Team.name, user_teams_table.c.user_id).outerjoin(
+        user_teams_table,
+        and_(user_teams_table.c.team_id == Team.id, user_teams_table.c.user_id == user_id)
+    ).filter(Team.id.in_(team_ids)).all()
+    return [(team_id, name, member_id is not None) for team_id, name, member_id in rows]
+
 def get_team(db: Session, team_id: int) -> Optional[Team]:
     """Get team by ID with creator and members."""
     return db.query(Team).options(
@@ -411,7 +435,7 @@ def transfer_team(db: Session, team_id: int, new_creator_id: int) -> bool:
         return True
     except Exception as e:
         db.rollback()
-        print(f"Error transferring team: {e}")
+        logger.exception("Error transferring team: %s", e)
         return False
 
 def join_team_by_code(db: Session, team_code: str, user_id: int) -> Optional[Team]:
@@ -0,0 +1,319 @@
+"""
+Async equivalents of the read paths in crud.py.
+
+These run on an AsyncSession so request handlers do not block the event
+loop while waiting on the database. Relationships used by the response
+models are loaded eagerly because lazy loading is not available on an
+AsyncSession. The synchronous crud module remains the API for writes and
+for scripts.
+"""
+
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from models import User, Event, Schedule, ScheduleAdjustment, Team, CourseTemplate, user_teams_table
+from recurrence import expand_templates
+from crud import event_window_conditions
+from services.event_rows import select_event_rows
+
+
+# User operations
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Get user by ID."""
+    return await db.scalar(select(User).where(User.id == user_id))
+
+async def get_user_by_student_id(db: AsyncSession, student_id: str) -> Optional[User]:
+    """Get user by student_id."""
+    return await db.scalar(select(User).where(User.student_id == student_id))
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+    """Get all users."""
+    result = await db.scalars(select(User).offset(skip).limit(limit))
+    return list(result)
+
+
+# Schedule operations
+async def get_user_schedules(db: AsyncSession, user_id: int) -> List[Schedule]:
+    """Get all schedules owned by a user."""
+    result = await db.scalars(select(Schedule).where(Schedule.owner_id == user_id))
+    return list(result)
+
+async def get_user_schedule(db: AsyncSession, schedule_id: int, user_id: int) -> Optional[Schedule]:
+    """Get a schedule if it is owned by the given user."""
+    return await db.scalar(
+        select(Schedule).where(Schedule.id == schedule_id, Schedule.owner_id == user_id)
+    )
+
+async def get_schedule_adjustments(db: AsyncSession, schedule_id: int) -> List[ScheduleAdjustment]:
+    """Get all adjustments of a schedule, newest first."""
+    result = await db.scalars(
+        select(ScheduleAdjustment)
+        .where(ScheduleAdjustment.schedule_id == schedule_id)
+        .order_by(ScheduleAdjustment.created_at.desc())
+    )
+    return list(result)
+
+async def count_user_schedules_and_events(db: AsyncSession, user_id: int) -> tuple:
+    """Count the schedules and events owned by a user."""
+    schedule_count = await db.scalar(
+        select(func.count(Schedule.id)).where(Schedule.owner_id == user_id)
+    )
+    event_count = await db.scalar(
+        select(func.count(Event.id)).join(Schedule).where(Schedule.owner_id == user_id)
+    )
+    return schedule_count, event_count
+
+
+# Event operations
+async def get_schedule_events(
+    db: AsyncSession,
+    schedule_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> list:
+    """
+    Get active events of a schedule ordered by (start_time, id) as event rows
+    (see services/event_rows.py), with the schedule columns but no owner.
+
+    Optionally restricted to a date window and to rows after a keyset cursor.
+    """
+    query = select_event_rows(with_owner=False).where(
+        Event.schedule_id == schedule_id,
+        Event.is_active == True,
+        *event_window_conditions(date_from, date_to, after)
+    )
+
+    result = await db.execute(
+        query.order_by(Event.start_time.asc(), Event.id.asc()).offset(skip).limit(limit)
+    )
+    return result.all()
+
+async def get_user_events(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> list:
+    """Get event rows for a specific user through their schedules, optionally within a date window / after a cursor."""
+    result = await db.execute(
+        select_event_rows()
+        .where(
+            and_(
+                Schedule.owner_id == user_id,
+                # 与团队视图保持一致的过滤条件
+                or_(Event.is_active == True, Event.is_active.is_(None)),
+                *event_window_conditions(date_from, date_to, after)
+            )
+        )
+        .order_by(Event.start_time, Event.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+
+# Course template operations
+async def get_schedule_templates(db: AsyncSession, schedule_id: int) -> List[CourseTemplate]:
+    """Get all course templates of a schedule."""
+    result = await db.scalars(
+        select(CourseTemplate)
+        .where(CourseTemplate.schedule_id == schedule_id)
+        .order_by(CourseTemplate.day_of_week, CourseTemplate.start_period, CourseTemplate.id)
+    )
+    return list(result)
+
+async def get_schedule_occurrences(db: AsyncSession, schedule: Schedule, window_start: date, window_end: date) -> List[dict]:
+    """Expand the course templates of a schedule for a date window, applying adjustments."""
+    templates = await get_schedule_templates(db, schedule.id)
+    if not templates:
+        return []
+
+    adjustments = await get_schedule_adjustments(db, schedule.id)
+    return expand_templates(templates, schedule, window_start, window_end, adjustments)
+
+
+# Team operations
+async def get_team(db: AsyncSession, team_id: int) -> Optional[Team]:
+    """Get team by ID with creator and members."""
+    result = await db.scalars(
+        select(Team)
+        .options(joinedload(Team.creator), joinedload(Team.members))
+        .where(Team.id == team_id)
+    )
+    return result.unique().first()
+
+async def get_user_teams(db: AsyncSession, user_id: int) -> List[Team]:
+    """Get all teams that a user belongs to (as member or creator)."""
+    result = await db.scalars(
+        select(Team)
+        .options(joinedload(Team.creator), joinedload(Team.members))
+        .where(
+            or_(
+                Team.creator_id == user_id,  # Teams created by user
+                Team.members.any(User.id == user_id)  # Teams where user is a member
+            )
+        )
+    )
+    return list(result.unique())
+
+async def get_all_teams(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Team]:
+    """Get all teams with creator and members information."""
+    result = await db.scalars(
+        select(Team)
+        .options(joinedload(Team.creator), joinedload(Team.members))
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(result.unique())
+
+async def is_team_creator(db: AsyncSession, team_id: int, user_id: int) -> bool:
+    """Check if a user is the creator of a team."""
+    creator_id = await db.scalar(select(Team.creator_id).where(Team.id == team_id))
+    return creator_id is not None and creator_id == user_id
+
+async def is_team_member(db: AsyncSession, team_id: int, user_id: int) -> bool:
+    """Check if a user is a member of a team."""
+    member_id = await db.scalar(
+        select(User.id).where(User.id == user_id, User.teams.any(Team.id == team_id))
+    )
+    return member_id is not None
+
+async def get_team_schedules_events(db: AsyncSession, team_id: int) -> list:
+    """Get event rows (with schedule and owner columns) from active schedules of team members."""
+    member_ids = select(user_teams_table.c.user_id).where(user_teams_table.c.team_id == team_id)
+    result = await db.execute(
+        select_event_rows()
+        .where(
+            and_(
+                Schedule.owner_id.in_(member_ids),
+                or_(Event.is_active == True, Event.is_active.is_(None))  # Include events where is_active is True or NULL
+            )
+        )
+    )
+    return result.all()
+
+async def get_team_timetable(
+    db: AsyncSession,
+    team_id: int,
+    date_from: date,
+    date_to: date
+) -> Tuple[list, list]:
+    """
+    Get a team's members and their events within [date_from, date_to].
+
+    Only the columns needed by the timetable are selected, so no ORM
+    objects are built; each event row carries the owner id and the
+    owners are returned once as a separate list.
+    """
+    member_ids = select(user_teams_table.c.user_id).where(user_teams_table.c.team_id == team_id)
+
+    owners = (await db.execute(
+        select(User.id, User.student_id, User.full_name, User.class_name, User.avatar_url)
+        .where(User.id.in_(member_ids))
+        .order_by(User.id)
+    )).mappings().all()
+    if not owners:
+        return [], []
+
+    events = (await db.execute(
+        select(
+            Event.id, Schedule.owner_id, Event.schedule_id, Event.title, Event.location,
+            Event.start_time, Event.end_time, Event.day_of_week, Event.period,
+            Event.color, Event.is_override
+        )
+        .join(Schedule, Event.schedule_id == Schedule.id)
+        .where(
+            Schedule.owner_id.in_(member_ids),
+            or_(Event.is_active == True, Event.is_active.is_(None)),
+            *event_window_conditions(date_from, date_to)
+        )
+        .order_by(Event.start_time.asc(), Event.id.asc())
+    )).mappings().all()
+    return owners, events
+
+async def get_busy_spans_by_owner(
+    db: AsyncSession,
+    owner_ids: List[int],
+    date_from: date,
+    date_to: date
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """
+    Get the distinct (start, end) spans during which each user is busy.
+
+    Events are deduplicated in SQL since only their union matters; course
+    templates of the users' schedules are expanded for the window with
+    their adjustments applied.
+    """
+    spans = defaultdict(list)
+    if not owner_ids:
+        return spans
+
+    # 前一天开始的事件可能跨过午夜
+    result = await db.execute(
+        select(Schedule.owner_id, Event.start_time, Event.end_time)
+        .distinct()
+        .join(Schedule, Event.schedule_id == Schedule.id)
+        .where(
+            Schedule.owner_id.in_(owner_ids),
+            or_(Event.is_active == True, Event.is_active.is_(None)),
+            *event_window_conditions(date_from - timedelta(days=1), date_to)
+        )
+    )
+    for owner_id, start_time, end_time in result:
+        spans[owner_id].append((start_time, end_time))
+
+    templates = list(await db.scalars(
+        select(CourseTemplate)
+        .options(joinedload(CourseTemplate.schedule))
+        .join(Schedule, CourseTemplate.schedule_id == Schedule.id)
+        .where(Schedule.owner_id.in_(owner_ids))
+    ))
+    if templates:
+        schedule_ids = {template.schedule_id for template in templates}
+        adjustments = defaultdict(list)
+        for adjustment in await db.scalars(
+            select(ScheduleAdjustment).where(ScheduleAdjustment.schedule_id.in_(schedule_ids))
+        ):
+            adjustments[adjustment.schedule_id].append(adjustment)
+        by_schedule = defaultdict(list)
+        for template in templates:
+            by_schedule[template.schedule_id].append(template)
+        for schedule_templates in by_schedule.values():
+            schedule = schedule_templates[0].schedule
+            for occurrence in expand_templates(schedule_templates, schedule, date_from, date_to, adjustments[schedule.id]):
+                spans[schedule.owner_id].append((occurrence["start_time"], occurrence["end_time"]))
+    return spans
+
+async def get_owner_version_stamps(db: AsyncSession, owner_ids: List[int]) -> Dict[int, int]:
+    """Get the sum of schedule versions per owner; it changes whenever any of their schedules changes."""
+    result = await db.execute(
+        select(Schedule.owner_id, func.sum(Schedule.version))
+        .where(Schedule.owner_id.in_(owner_ids))
+        .group_by(Schedule.owner_id)
+    )
+    return {owner_id: int(total or 0) for owner_id, total in result}
+
+async def get_team_class_times(db: AsyncSession, team_id: int) -> Optional[dict]:
+    """Get the class times of the team creator's latest schedule, used as the team's period grid."""
+    return await db.scalar(
+        select(Schedule.class_times)
+        .join(Team, Team.creator_id == Schedule.owner_id)
+        .where(Team.id == team_id)
+        .order_by(Schedule.start_date.desc(), Schedule.id.desc())
+        .limit(1)
+    )
+
+async def count_team_members(db: AsyncSession, team_id: int) -> int:
+    """Count the members of a team."""
+    return await db.scalar(
+        select(func.count()).select_from(user_teams_table).where(user_teams_table.c.team_id == team_id)
+    ) or 0
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -7,13 +8,81 @@ import os
 # For SQLite absolute paths, use the 4-slash form: sqlite:////absolute/path/to.db
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./schedule_app.db")
 
+def _to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver equivalent."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+# Async URL used by the AsyncSession dependency; derived from DATABASE_URL unless overridden
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(SQLALCHEMY_DATABASE_URL))
+
+# Engine profile: "default" keeps SQLite defaults, "production" enables WAL and tuned pragmas
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default").lower()
+
+# Seconds a connection waits on a locked database before raising "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+# Pragmas applied to every new SQLite connection in the production profile
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",          # readers no longer block on a writer
+    "synchronous": "NORMAL",        # safe with WAL, avoids an fsync per commit
+    "mmap_size": 268435456,         # 256 MB memory-mapped I/O
+    "cache_size": -65536,           # 64 MB page cache (negative = KiB)
+    "temp_store": "MEMORY",
+}
+
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+connect_args = {}
+async_connect_args = {}
+if is_sqlite:
+    connect_args = {
+        "check_same_thread": False,  # Only needed for SQLite
+        "timeout": SQLITE_BUSY_TIMEOUT,
+    }
+    async_connect_args = {"timeout": SQLITE_BUSY_TIMEOUT}
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=connect_args
 )
 
+# Async engine for request handlers; the sync engine above stays available for scripts
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args
+)
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the production pragmas to a freshly opened SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}")
+        for name, value in SQLITE_PRODUCTION_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+if is_sqlite and DATABASE_PROFILE == "production":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # Dependency to get database session
@@ -23,3 +92,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session (does not block the event loop)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
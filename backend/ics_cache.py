@@ -0,0 +1,172 @@
+"""
+Rendered ICS cache keyed by schedule version.
+
+Calendar apps poll the export URLs repeatedly. Every schedule carries a
+version number that is bumped whenever its events, adjustments, templates
+or settings change, so the ETag of an export can be computed from the
+versions alone: an unchanged calendar is answered with 304 without
+touching the events, and a changed-ETag request is served from the
+rendered text kept in an in-memory LRU (plus an optional directory shared
+between workers and restarts).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from ics_export import content_disposition
+
+# 内存中最多缓存的日历数量
+ICS_CACHE_SIZE = int(os.getenv("ICS_CACHE_SIZE", "256"))
+# 单个日历超过该大小时不缓存（字节）
+ICS_CACHE_MAX_BYTES = int(os.getenv("ICS_CACHE_MAX_BYTES", str(2 * 1024 * 1024)))
+# 可选的磁盘缓存目录，多个 worker 之间共享
+ICS_CACHE_DIR = os.getenv("ICS_CACHE_DIR", "")
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+class ICSRenderCache:
+    """Per-scope cache of the latest rendered calendar and its ETag."""
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, scope: str, etag: str) -> Path:
+        return self.cache_dir / f"{scope}-{etag.strip(chr(34))}.ics"
+
+    def get(self, scope: str, etag: str) -> Optional[bytes]:
+        """返回与 ETag 匹配的缓存内容，版本已变化时返回 None"""
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry and entry[0] == etag:
+                self._entries.move_to_end(scope)
+                self.hits += 1
+                return entry[1]
+
+        if self.cache_dir:
+            try:
+                body = self._disk_path(scope, etag).read_bytes()
+            except OSError:
+                body = None
+            if body is not None:
+                self._remember(scope, etag, body)
+                with self._lock:
+                    self.hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, scope: str, etag: str, body: bytes) -> None:
+        self._remember(scope, etag, body)
+        if not self.cache_dir:
+            return
+        try:
+            # 先写临时文件再原子替换，避免其他 worker 读到半个文件
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, self._disk_path(scope, etag))
+            # 删除同一日历的旧版本
+            current = self._disk_path(scope, etag)
+            for stale in self.cache_dir.glob(f"{scope}-*.ics"):
+                if stale != current:
+                    stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("ICS cache write failed: %s", e)
+
+    def _remember(self, scope: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[scope] = (etag, body)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+ics_cache = ICSRenderCache(ICS_CACHE_SIZE, ICS_CACHE_DIR or None)
+
+
+def make_etag(scope: str, parts: Iterable) -> str:
+    """由缓存范围和各课表的 (id, version) 等信息计算强 ETag"""
+    source = scope + "|" + "|".join(str(part) for part in parts)
+    return '"' + hashlib.sha1(source.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # 兼容弱校验形式 W/"..."
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def _tee(scope: str, etag: str, chunks: Iterator[str]) -> Iterator[bytes]:
+    """转发流式输出的同时收集内容，完整生成后写入缓存"""
+    collected = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        if collected is not None:
+            size += len(data)
+            if size > ICS_CACHE_MAX_BYTES:
+                collected = None
+            else:
+                collected.append(data)
+        yield data
+    if collected is not None:
+        ics_cache.put(scope, etag, b"".join(collected))
+
+
+def cached_calendar_response(
+    scope: str,
+    version_parts: Sequence,
+    if_none_match: Optional[str],
+    filename: str,
+    render: Callable[[], Iterator[str]]
+) -> Response:
+    """
+    返回日历响应：ETag 未变化时返回 304，缓存命中时直接返回缓存内容，
+    否则流式生成并写入缓存。
+    """
+    etag = make_etag(scope, version_parts)
+    headers = {
+        "ETag": etag,
+        # 客户端每次都需要验证，但可以复用本地副本
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = content_disposition(filename)
+    body = ics_cache.get(scope, etag)
+    if body is not None:
+        return Response(content=body, media_type=ICS_MEDIA_TYPE, headers=headers)
+
+    return StreamingResponse(_tee(scope, etag, render()), media_type=ICS_MEDIA_TYPE, headers=headers)
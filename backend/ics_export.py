@@ -0,0 +1,407 @@
+"""
+Streaming iCalendar export.
+
+The calendar text is generated directly instead of building an
+ics.Calendar in memory: event rows are read one schedule at a time and
+VEVENT blocks are yielded as soon as a course is complete, so memory is
+bounded by the largest schedule and the first bytes go out immediately.
+The rows of a schedule are fetched in full before anything is yielded: a
+cursor left open while the response waits on the client would hold a
+SQLite read lock, and without WAL that blocks every writer. Weekly
+courses are written as one VEVENT with RRULE:FREQ=WEEKLY;COUNT=n plus
+EXDATE for skipped weeks instead of one VEVENT per week.
+"""
+
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import CourseTemplate, Event, Schedule, ScheduleAdjustment
+from recurrence import build_adjustment_map, resolve_template_times, week_date
+from utils import parse_period_to_class_numbers
+from weekset import MAX_WEEK, WeekSet
+
+CRLF = "\r\n"
+PRODID = "-//SDNU ChronoSync//Schedule Export//ZH"
+# 每次向客户端写出的字节量，避免每个 VEVENT 都切换一次线程
+CHUNK_SIZE = 32 * 1024
+# 提前提醒时间
+ALARM_TRIGGER = "-PT10M"
+# 导入时一条 RRULE 最多展开的次数，与周位图能表示的最大周数一致
+MAX_RECURRENCE_OCCURRENCES = MAX_WEEK
+
+_EVENT_COLUMNS = (
+    Event.id, Event.schedule_id, Event.title, Event.location, Event.instructor,
+    Event.period, Event.start_time, Event.end_time,
+)
+
+
+def escape_text(value: Optional[str]) -> str:
+    """按 RFC 5545 转义 TEXT 值"""
+    if not value:
+        return ""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """按 RFC 5545 将超过 75 字节的内容行折行（不拆分 UTF-8 多字节字符）"""
+    if len(line.encode("utf-8")) <= 75:
+        return line
+    parts = []
+    current = ""
+    current_size = 0
+    limit = 75
+    for char in line:
+        size = len(char.encode("utf-8"))
+        if current_size + size > limit:
+            parts.append(current)
+            current = char
+            current_size = size
+            # 续行以一个空格开头，占用 1 字节
+            limit = 74
+        else:
+            current += char
+            current_size += size
+    parts.append(current)
+    return (CRLF + " ").join(parts)
+
+
+def format_datetime(value: datetime) -> str:
+    """浮动时间（不带时区），日历客户端按本地时区显示"""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def content_disposition(filename: str) -> str:
+    """生成支持中文文件名的 Content-Disposition 头"""
+    fallback = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "schedule.ics"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def render_vevent(
+    uid: str,
+    start: datetime,
+    end: datetime,
+    summary: str,
+    location: str,
+    description: str,
+    dtstamp: str,
+    count: int = 1,
+    exdates: Sequence[datetime] = ()
+) -> str:
+    """生成一个 VEVENT 块；count > 1 时按周重复"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{format_datetime(start)}",
+        f"DTEND:{format_datetime(end)}",
+    ]
+    if count > 1:
+        lines.append(f"RRULE:FREQ=WEEKLY;COUNT={count}")
+        if exdates:
+            lines.append("EXDATE:" + ",".join(format_datetime(d) for d in exdates))
+    lines.extend([
+        f"SUMMARY:{escape_text(summary)}",
+        f"LOCATION:{escape_text(location)}",
+        f"DESCRIPTION:{escape_text(description)}",
+        "BEGIN:VALARM",
+        "ACTION:DISPLAY",
+        f"DESCRIPTION:{escape_text(summary)}",
+        f"TRIGGER:{ALARM_TRIGGER}",
+        "END:VALARM",
+        "END:VEVENT",
+    ])
+    return "".join(fold_line(line) + CRLF for line in lines)
+
+
+def _describe(location: Optional[str], instructor: Optional[str], weeks: str, period: Optional[str]) -> Tuple[str, str]:
+    """返回 (地点, 描述)，格式与原导出保持一致"""
+    location = (location or "").strip() or "未排地点"
+    parts = [f"地点: {location}"]
+    if instructor and instructor.strip():
+        parts.append(f"教师: {instructor.strip()}")
+    if weeks:
+        parts.append(f"周数: {weeks}")
+    if period and period.strip():
+        parts.append(f"节次: {period.strip()}")
+    return location, " | ".join(parts)
+
+
+def _week_of(schedule_start: Optional[date], day: date) -> Optional[int]:
+    if schedule_start is None:
+        return None
+    week = (day - schedule_start).days // 7 + 1
+    return week if week >= 1 else None
+
+
+def _class_clock(class_times: Optional[dict], period: Optional[str]) -> Optional[Tuple[time, time]]:
+    """按课表的节次时间计算上下课时间，未配置时返回 None"""
+    period_numbers = parse_period_to_class_numbers(period or "")
+    if not period_numbers or not class_times:
+        return None
+    first = class_times.get(str(period_numbers[0]))
+    last = class_times.get(str(period_numbers[-1]))
+    if not first or not last:
+        return None
+    try:
+        start = datetime.strptime(first.get("start", "08:00"), "%H:%M").time()
+        end = datetime.strptime(last.get("end", "09:00"), "%H:%M").time()
+    except ValueError:
+        return None
+    return start, end
+
+
+def split_weekly_series(rows: Sequence[tuple]) -> Tuple[List[tuple], List[tuple]]:
+    """
+    从按开始时间排序的事件行中找出以第一行为基准、间隔整周的序列。
+
+    Returns:
+        (序列内的行, 不在序列中的行，如调课后的日期或重复行)
+    """
+    if not rows:
+        return [], []
+    first = rows[0].start_time
+    series, singles = [rows[0]], []
+    for row in rows[1:]:
+        delta = row.start_time - first
+        if delta.days % 7 == 0 and delta.seconds == 0 and row.start_time != series[-1].start_time:
+            series.append(row)
+        else:
+            singles.append(row)
+    return series, singles
+
+
+def series_rule(series: Sequence[datetime]) -> Tuple[int, List[datetime]]:
+    """计算序列对应的 RRULE COUNT 和 EXDATE 列表"""
+    first = series[0]
+    count = (series[-1] - first).days // 7 + 1
+    present = {(start - first).days // 7 for start in series}
+    exdates = [first + timedelta(weeks=index) for index in range(count) if index not in present]
+    return count, exdates
+
+
+def _render_course_rows(
+    schedule: Schedule,
+    rows: List[tuple],
+    dtstamp: str
+) -> Iterator[str]:
+    """将同一门课（标题、节次、地点、教师相同）的事件行合并输出"""
+    first_row = rows[0]
+    clock = _class_clock(schedule.class_times, first_row.period)
+
+    # 同一门课可能一周多次（不同星期/时间），按 (星期, 上下课时间) 分组
+    variants: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        key = (row.start_time.weekday(), row.start_time.time(), row.end_time - row.start_time)
+        variants.setdefault(key, []).append(row)
+
+    for variant_rows in variants.values():
+        series, singles = split_weekly_series(variant_rows)
+        duration = variant_rows[0].end_time - variant_rows[0].start_time
+
+        def bounds(start: datetime) -> Tuple[datetime, datetime]:
+            if clock:
+                return datetime.combine(start.date(), clock[0]), datetime.combine(start.date(), clock[1])
+            return start, start + duration
+
+        weeks = WeekSet.from_weeks(
+            w for w in (_week_of(schedule.start_date, row.start_time.date()) for row in series) if w
+        ).to_display()
+        location, description = _describe(first_row.location, first_row.instructor, weeks, first_row.period)
+
+        if series:
+            count, exdates = series_rule([row.start_time for row in series])
+            start, end = bounds(series[0].start_time)
+            uid = f"course-{schedule.id}-{series[0].id}@chronosync"
+            yield render_vevent(
+                uid, start, end, first_row.title, location, description, dtstamp,
+                count=count, exdates=[bounds(d)[0] for d in exdates]
+            )
+
+        for row in singles:
+            week = _week_of(schedule.start_date, row.start_time.date())
+            _, single_description = _describe(row.location, row.instructor, f"第{week}周" if week else "", row.period)
+            start, end = bounds(row.start_time)
+            yield render_vevent(
+                f"event-{schedule.id}-{row.id}@chronosync", start, end,
+                row.title, location, single_description, dtstamp
+            )
+
+
+def _render_templates(
+    schedule: Schedule,
+    templates: Iterable[CourseTemplate],
+    adjustments: Iterable[ScheduleAdjustment],
+    dtstamp: str
+) -> Iterator[str]:
+    """输出课程模板：按周数位图生成 RRULE，放假/调课写为 EXDATE，调课后的日期单独输出"""
+    adjustment_map = build_adjustment_map(adjustments)
+    for template in templates:
+        week_mask = WeekSet(template.week_mask or 0)
+        weeks = list(week_mask)
+        if not weeks:
+            continue
+        start_clock, end_clock = resolve_template_times(template, schedule.class_times)
+        period = None
+        if template.start_period is not None:
+            period = f"{template.start_period}-{template.end_period or template.start_period}节"
+        location, description = _describe(
+            template.location, template.instructor,
+            template.weeks_display or week_mask.to_display(), period
+        )
+
+        first_day = week_date(schedule.start_date, weeks[0], template.day_of_week)
+        count = weeks[-1] - weeks[0] + 1
+        exdates = []
+        moved = []
+        for index in range(count):
+            week = weeks[0] + index
+            original = first_day + timedelta(weeks=index)
+            if week not in week_mask:
+                exdates.append(original)
+                continue
+            target, adjustment_id = adjustment_map.get(original, (original, None))
+            if target != original:
+                exdates.append(original)
+                if target is not None:
+                    moved.append((target, adjustment_id))
+
+        yield render_vevent(
+            f"template-{schedule.id}-{template.id}@chronosync",
+            datetime.combine(first_day, start_clock), datetime.combine(first_day, end_clock),
+            template.title, location, description, dtstamp,
+            count=count, exdates=[datetime.combine(d, start_clock) for d in exdates]
+        )
+        for target, adjustment_id in moved:
+            yield render_vevent(
+                f"template-{schedule.id}-{template.id}-adj{adjustment_id}-{target:%Y%m%d}@chronosync",
+                datetime.combine(target, start_clock), datetime.combine(target, end_clock),
+                template.title, location, description, dtstamp
+            )
+
+
+def _render_schedule(db: Session, schedule: Schedule, dtstamp: str) -> Iterator[str]:
+    templates = list(db.scalars(
+        select(CourseTemplate).where(CourseTemplate.schedule_id == schedule.id).order_by(CourseTemplate.id)
+    ))
+    if templates:
+        adjustments = list(db.scalars(
+            select(ScheduleAdjustment).where(ScheduleAdjustment.schedule_id == schedule.id)
+        ))
+        yield from _render_templates(schedule, templates, adjustments, dtstamp)
+
+    # 按课程排序，同一门课的事件行相邻，逐门课流式输出；先取完所有行再输出，避免持有读锁
+    rows = db.execute(
+        select(*_EVENT_COLUMNS)
+        .where(
+            Event.schedule_id == schedule.id,
+            or_(Event.is_active == True, Event.is_active.is_(None))
+        )
+        .order_by(Event.title, Event.period, Event.location, Event.instructor, Event.start_time, Event.id)
+    ).all()
+    for _, course_rows in groupby(rows, key=lambda r: (r.title, r.period, r.location, r.instructor)):
+        yield from _render_course_rows(schedule, list(course_rows), dtstamp)
+
+
+def stream_calendar(schedule_ids: Sequence[int], calendar_name: str) -> Iterator[str]:
+    """
+    流式生成包含指定课表的 ICS 文本。
+
+    使用独立的数据库会话，生成器在响应发送期间运行，不依赖请求的会话。
+    """
+    db = SessionLocal()
+    try:
+        dtstamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        buffer = [
+            "BEGIN:VCALENDAR" + CRLF,
+            "VERSION:2.0" + CRLF,
+            f"PRODID:{PRODID}" + CRLF,
+            "CALSCALE:GREGORIAN" + CRLF,
+            fold_line(f"X-WR-CALNAME:{escape_text(calendar_name)}") + CRLF,
+        ]
+        size = 0
+        for schedule_id in schedule_ids:
+            schedule = db.get(Schedule, schedule_id)
+            if schedule is None:
+                continue
+            for block in _render_schedule(db, schedule, dtstamp):
+                buffer.append(block)
+                size += len(block)
+                if size >= CHUNK_SIZE:
+                    yield "".join(buffer)
+                    buffer = []
+                    size = 0
+        buffer.append("END:VCALENDAR" + CRLF)
+        yield "".join(buffer)
+    finally:
+        db.close()
+
+
+def expand_weekly_recurrence(ics_event, max_occurrences: int = MAX_RECURRENCE_OCCURRENCES) -> list:
+    """
+    将带 RRULE:FREQ=WEEKLY 的 ics.Event 展开为多个单次事件（ics 库本身不处理 RRULE）。
+    仅支持本模块导出的 COUNT/UNTIL/INTERVAL 与 EXDATE，其他事件原样返回。
+
+    Raises:
+        ValueError: INTERVAL 无效，或重复次数（含 EXDATE 排除的）超过 max_occurrences
+    """
+    extra = {line.name: line.value for line in getattr(ics_event, "extra", [])}
+    rule = extra.get("RRULE")
+    if not rule or not ics_event.begin or not ics_event.end:
+        return [ics_event]
+    params = dict(part.split("=", 1) for part in rule.split(";") if "=" in part)
+    if params.get("FREQ") != "WEEKLY":
+        return [ics_event]
+
+    begin = ics_event.begin.datetime
+    end = ics_event.end.datetime
+    interval = int(params.get("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError(f"事件 '{ics_event.name}' 的 RRULE INTERVAL 无效: {interval}")
+    count = int(params["COUNT"]) if "COUNT" in params else None
+    until = None
+    if "UNTIL" in params:
+        until = datetime.strptime(params["UNTIL"][:15], "%Y%m%dT%H%M%S")
+    if count is None and until is None:
+        return [ics_event]
+
+    excluded = set()
+    for value in extra.get("EXDATE", "").split(","):
+        value = value.strip().rstrip("Z")
+        if value:
+            try:
+                excluded.add(datetime.strptime(value[:15], "%Y%m%dT%H%M%S"))
+            except ValueError:
+                continue
+
+    occurrences = []
+    index = 0
+    while True:
+        if count is not None and index >= count:
+            break
+        start = begin + timedelta(weeks=index * interval)
+        if until is not None and start.replace(tzinfo=None) > until:
+            break
+        if index >= max_occurrences:
+            # COUNT/UNTIL 来自上传的文件，不能让它决定展开多少行
+            raise ValueError(f"事件 '{ics_event.name}' 重复超过 {max_occurrences} 次")
+        index += 1
+        if start.replace(tzinfo=None) in excluded:
+            continue
+        occurrence = ics_event.clone()
+        occurrence.end = None
+        occurrence.begin = start
+        occurrence.end = end + (start - begin)
+        occurrences.append(occurrence)
+    return occurrences
@@ -2,7 +2,8 @@
 山东师范大学正方教务系统课表导入器 - 基于新的登录流程
 """
 
-import requests
+import httpx
+import asyncio
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta, date
 import re
@@ -17,28 +18,123 @@ import binascii
 from PIL import Image
 from schemas import EventCreate
 import json
+import logging
+from logging_config import TRACE
+from services.import_session_store import import_session_store
+
+# 教务系统地址（可指向本地模拟服务器进行离线测试）
+JWXT_BASE_URL = os.getenv("JWXT_BASE_URL", "http://jwxt.sdnu.edu.cn/jwglxt").rstrip("/")
+# 单次请求超时（秒）
+JWXT_TIMEOUT = float(os.getenv("JWXT_TIMEOUT", "10"))
+# GET 请求在超时/5xx 时的重试次数（登录 POST 不重试，验证码只能使用一次）
+JWXT_RETRIES = int(os.getenv("JWXT_RETRIES", "2"))
+logger = logging.getLogger(__name__)
+
+JWXT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.0.0'
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """
+    所有登录会话共享的连接池。
+
+    每个导入会话都有自己的 AsyncClient（独立的 cookies），但底层连接复用同一个池；
+    关闭单个客户端不会关闭连接池，连接池在应用退出时由 close_http_pool() 关闭。
+    """
+
+    def __init__(self):
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+
+    def _get(self) -> httpx.AsyncHTTPTransport:
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(
+                retries=JWXT_RETRIES,  # 连接失败时重试
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30),
+            )
+        return self._transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._get().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # 单个客户端关闭时不关闭共享连接池
+        pass
+
+    async def shutdown(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+
+_shared_transport = _SharedTransport()
+
+
+async def close_http_pool() -> None:
+    """关闭共享连接池（应用退出时调用）"""
+    await _shared_transport.shutdown()
+
+
+def create_http_client(cookies: Optional[httpx.Cookies] = None) -> httpx.AsyncClient:
+    """创建使用共享连接池的客户端，cookies 用于恢复已有的登录会话"""
+    return httpx.AsyncClient(
+        transport=_shared_transport,
+        cookies=cookies,
+        headers={'User-Agent': JWXT_USER_AGENT},
+        timeout=httpx.Timeout(JWXT_TIMEOUT, connect=5.0),
+        follow_redirects=True,
+    )
+
+
+def dump_cookies(cookies: httpx.Cookies) -> List[Dict[str, str]]:
+    """将 cookies 转为可 JSON 序列化的列表，便于会话存储在数据库中共享"""
+    return [
+        {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+        for cookie in cookies.jar
+    ]
+
+
+def load_cookies(items: Optional[List[Dict[str, str]]]) -> httpx.Cookies:
+    cookies = httpx.Cookies()
+    for item in items or []:
+        cookies.set(item["name"], item["value"], domain=item.get("domain", ""), path=item.get("path", "/"))
+    return cookies
+
+
+async def _get_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """GET 请求，超时或服务器 5xx 时按指数退避重试"""
+    for attempt in range(JWXT_RETRIES + 1):
+        try:
+            resp = await client.get(url, **kwargs)
+            if resp.status_code < 500 or attempt == JWXT_RETRIES:
+                return resp
+        except (httpx.TimeoutException, httpx.NetworkError):
+            if attempt == JWXT_RETRIES:
+                raise
+        await asyncio.sleep(0.2 * (2 ** attempt))
+    return resp
 
-# 会话缓存
-_session_cache = {}
 
 class JwxtLogin:
     """山东师范大学教务系统登录器 - 基于新的登录流程"""
     
-    def __init__(self, student_id, password):
+    def __init__(self, student_id, password, cookies: Optional[httpx.Cookies] = None):
         self.student_id = student_id
         self.password = password
-        self.session = requests.Session()
-        self.base_url = "http://jwxt.sdnu.edu.cn/jwglxt"
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.0.0'
-        })
+        self.base_url = JWXT_BASE_URL
+        self.client = create_http_client(cookies)
+
+    @property
+    def cookies(self) -> httpx.Cookies:
+        return self.client.cookies
+
+    async def aclose(self):
+        await self.client.aclose()
 
-    def _get_csrf_token(self):
+    async def _get_csrf_token(self):
         """获取CSRF token"""
-        print("[1] 正在访问登录页面以获取csrftoken...")
+        logger.debug("[1] 正在访问登录页面以获取csrftoken...")
         try:
             login_page_url = f"{self.base_url}/xtgl/login_slogin.html"
-            resp = self.session.get(login_page_url)
+            resp = await _get_with_retry(self.client, login_page_url)
             resp.raise_for_status()
             soup = BeautifulSoup(resp.text, 'html.parser')
             token_element = soup.find('input', {'id': 'csrftoken'})
@@ -48,12 +144,12 @@ class JwxtLogin:
         except Exception: 
             return None
 
-    def _get_encrypted_password(self):
+    async def _get_encrypted_password(self):
         """获取RSA加密的密码"""
-        print("[2] 正在获取RSA公钥...")
+        logger.debug("[2] 正在获取RSA公钥...")
         try:
             key_url = f"{self.base_url}/xtgl/login_getPublicKey.html"
-            resp = self.session.get(key_url)
+            resp = await _get_with_retry(self.client, key_url)
             resp.raise_for_status()
             key_data = resp.json()
             modulus_bytes = base64.b64decode(key_data['modulus'])
@@ -61,44 +157,50 @@ class JwxtLogin:
             modulus = int.from_bytes(modulus_bytes, 'big')
             exponent = int.from_bytes(exponent_bytes, 'big')
             
-            print("[3] 正在使用公钥加密密码...")
+            logger.debug("[3] 正在使用公钥加密密码...")
             rsa_key = RSA.construct((modulus, exponent))
             cipher = PKCS1_v1_5.new(rsa_key)
             encrypted_bytes = cipher.encrypt(self.password.encode('utf-8'))
             encrypted_password = base64.b64encode(encrypted_bytes).decode('utf-8')
-            print("    -> 密码加密完成。")
+            logger.debug("    -> 密码加密完成。")
             return encrypted_password
         except Exception as e:
-            print(f"    -> [错误] 加密密码时出错: {e}")
+            logger.warning("加密密码时出错: %s", e)
             return None
 
-    def _get_captcha_code(self):
+    async def _get_captcha_code(self):
         """获取验证码并返回base64编码"""
-        print("[4] 正在获取验证码...")
+        logger.debug("[4] 正在获取验证码...")
         try:
             timestamp = int(time.time() * 1000)
             captcha_url = f"{self.base_url}/kaptcha?time={timestamp}"
-            resp = self.session.get(captcha_url)
+            resp = await _get_with_retry(self.client, captcha_url)
             resp.raise_for_status()
             
+            # 检查响应类型
+            content_type = resp.headers.get('content-type', '')
+            if content_type and not content_type.startswith('image/'):
+                logger.warning("验证码响应类型异常: %s", content_type)
+                return None
+            
             # 返回验证码的base64编码供前端显示
             captcha_base64 = base64.b64encode(resp.content).decode('utf-8')
             return captcha_base64
         except Exception as e:
-            print(f"    -> [错误] 获取验证码失败: {e}")
+            logger.warning("获取验证码失败: %s", e)
             return None
 
-    def login_with_captcha(self, captcha_code):
+    async def login_with_captcha(self, captcha_code):
         """使用验证码登录"""
-        print("[5] 正在提交登录请求...")
+        logger.debug("[5] 正在提交登录请求...")
         
         # 获取必要的登录信息
-        csrftoken = self._get_csrf_token()
+        csrftoken = await self._get_csrf_token()
         if not csrftoken: 
-            print("[错误] 步骤1失败: 无法获取csrftoken。")
+            logger.warning("登录步骤1失败: 无法获取csrftoken")
             return False
 
-        encrypted_password = self._get_encrypted_password()
+        encrypted_password = await self._get_encrypted_password()
         if not encrypted_password: 
             return False
         
@@ -113,45 +215,45 @@ class JwxtLogin:
         }
         
         try:
-            resp_login = self.session.post(login_post_url, data=payload)
+            resp_login = await self.client.post(login_post_url, data=payload)
             resp_login.raise_for_status()
             
             # 检查登录是否成功（通过重定向判断）
             if resp_login.history:
-                print("[6] ✅ POST请求成功，服务器已重定向！正在进入主系统...")
+                logger.debug("[6] POST请求成功，服务器已重定向，正在进入主系统...")
                 
                 # 模拟点击"已阅读"后的跳转，进入主界面
                 index_url = f"{self.base_url}/xtgl/login_loginIndex.html"
-                self.session.get(index_url)
-                print("[7] ✅ 成功进入主系统！登录流程全部完成。")
+                await _get_with_retry(self.client, index_url)
+                logger.debug("[7] 成功进入主系统，登录流程全部完成")
                 return True
             else:
                 # 检查具体的错误信息
                 if "用户名或密码不正确" in resp_login.text:
-                     print("[6] ❌ 登录失败: 用户名或密码不正确！")
+                     logger.info("登录失败: 用户名或密码不正确")
                 elif "验证码输入错误" in resp_login.text:
-                     print("[6] ❌ 登录失败: 验证码输入错误！")
+                     logger.info("登录失败: 验证码输入错误")
                 else:
-                    print("[6] ❌ 登录失败: 验证码很可能输入错误。")
+                    logger.info("登录失败: 验证码很可能输入错误")
                 return False
 
-        except requests.exceptions.RequestException as e:
-            print(f"    -> [错误] 提交登录请求时失败: {e}")
+        except httpx.HTTPError as e:
+            logger.warning("提交登录请求时失败: %s", e)
             return False
 
-    def get_schedule(self, year, term):
+    async def get_schedule(self, year, term):
         """获取课表数据"""
-        print("\n[*] 正在尝试获取课表...")
+        logger.debug("正在尝试获取课表...")
         schedule_url = f"{self.base_url}/kbcx/xskbcx_cxXsgrkb.html?gnmkdm=N253508"
         term_code = '3' if term == 1 else '12'
         schedule_payload = {'xnm': str(year), 'xqm': term_code}
         try:
-            resp = self.session.post(schedule_url, data=schedule_payload)
+            resp = await self.client.post(schedule_url, data=schedule_payload)
             resp.raise_for_status()
-            print("[+] 成功获取课表数据！")
+            logger.debug("成功获取课表数据")
             return resp.json()
         except Exception as e:
-            print(f"[-] 获取课表失败: {e}")
+            logger.warning("获取课表失败: %s", e)
             return None
 
 
@@ -159,30 +261,29 @@ class ZFWImporter:
     """正方教务系统导入器 - 基于新的登录流程"""
     
     # 教务系统相关URL
-    login_url = "http://jwxt.sdnu.edu.cn/jwglxt/xtgl/login_slogin.html"
+    login_url = f"{JWXT_BASE_URL}/xtgl/login_slogin.html"
     schedule_urls = [
-        "http://jwxt.sdnu.edu.cn/jwglxt/kbcx/xskbcx_cxXsgrkb.html?gnmkdm=N253508"
+        f"{JWXT_BASE_URL}/kbcx/xskbcx_cxXsgrkb.html?gnmkdm=N253508"
     ]
     
     @classmethod
-    def create_session(cls) -> Dict[str, str]:
+    async def create_session(cls) -> Dict[str, str]:
         """第一步：创建登录会话，获取验证码"""
         session_id = str(uuid.uuid4())
         
+        # 创建临时的登录器来获取验证码
+        temp_login = JwxtLogin("temp", "temp")
         try:
-            # 创建临时的登录器来获取验证码
-            temp_login = JwxtLogin("temp", "temp")
-            
             # 获取验证码图片
-            captcha_base64 = temp_login._get_captcha_code()
+            captcha_base64 = await temp_login._get_captcha_code()
             if not captcha_base64:
                 raise Exception("获取验证码失败")
             
-            # 缓存session信息
-            _session_cache[session_id] = {
-                "login_session": temp_login.session,
+            # 缓存session信息（只保存 cookies，连接由共享连接池管理）
+            await import_session_store.put(session_id, {
+                "cookies": dump_cookies(temp_login.cookies),
                 "created_time": datetime.now().timestamp(),
-            }
+            })
             
             return {
                 "session_id": session_id,
@@ -192,13 +293,40 @@ class ZFWImporter:
             }
             
         except Exception as e:
-            print(f"创建会话失败: {e}")
+            logger.warning("创建会话失败: %s", e)
             raise Exception(f"创建登录会话失败: {str(e)}")
+        finally:
+            await temp_login.aclose()
+    
+    @classmethod
+    async def refresh_captcha(cls, session_id: str) -> Optional[Dict[str, str]]:
+        """使用已有会话的 cookies 重新获取验证码，会话不存在时返回 None"""
+        session_data = await import_session_store.get(session_id)
+        if not session_data:
+            return None
+        if session_data.get("session") == "fallback":
+            raise ValueError("无法刷新验证码，请重新获取会话")
+        
+        login = JwxtLogin("temp", "temp", cookies=load_cookies(session_data.get("cookies")))
+        try:
+            captcha_base64 = await login._get_captcha_code()
+            if not captcha_base64:
+                raise Exception("验证码获取失败")
+            session_data = {**session_data, "cookies": dump_cookies(login.cookies)}
+            await import_session_store.put(session_id, session_data)
+        finally:
+            await login.aclose()
+        
+        return {
+            "session_id": session_id,
+            "csrftoken": session_data.get("csrf_token", ""),
+            "captcha_image": captcha_base64
+        }
     
     @classmethod
-    def _create_fallback_session(cls, session_id: str) -> Dict[str, str]:
+    async def _create_fallback_session(cls, session_id: str) -> Dict[str, str]:
         """创建fallback session（当无法访问真实教务系统时）"""
-        print("使用fallback验证码...")
+        logger.info("使用fallback验证码")
         
         try:
             # 生成一个包含文本的验证码图片
@@ -254,17 +382,17 @@ class ZFWImporter:
                 b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00l\x00\x00\x00"\x08\x02\x00\x00\x00\x9b\xc5\x07\x02\x00\x00\x00\x19tEXtSoftware\x00Adobe ImageReadyq\xc9e<\x00\x00\x00\x0cIDATx\x9cc\xf8\x0f\x00\x00\x01\x00\x01\x00\x00\x00\x00\x00IEND\xaeB`\x82'
             ).decode('utf-8')
         except Exception as e:
-            print(f"生成fallback验证码失败: {e}")
+            logger.warning("生成fallback验证码失败: %s", e)
             captcha_text = "1234"
             captcha_base64 = ""
         
         # 缓存fallback session信息
-        _session_cache[session_id] = {
+        await import_session_store.put(session_id, {
             "session": "fallback",
             "captcha_answer": captcha_text,
             "created_time": datetime.now().timestamp(),
             "csrf_token": f"fallback_csrf_{session_id[:8]}"
-        }
+        })
         
         return {
             "session_id": session_id,
@@ -282,7 +410,7 @@ class ZFWImporter:
             return password  # 临时实现
             
         except Exception as e:
-            print(f"密码加密失败: {e}")
+            logger.warning("密码加密失败: %s", e)
             return password
     
     @classmethod 
@@ -293,30 +421,23 @@ class ZFWImporter:
         try:
             # 获取课表列表
             kb_list = schedule_data.get('kbList', [])
-            print(f"解析课表数据，共 {len(kb_list)} 门课程")
+            logger.debug("解析课表数据，共 %d 门课程", len(kb_list))
             
             # 解析每门课程
             for i, course in enumerate(kb_list):
                 try:
-                    print(f"\n>>> 解析第 {i+1} 门课程:")
-                    print(f"    原始课程数据: {course}")
+                    logger.debug("解析第 %d 门课程: %s", i + 1, course, extra=TRACE)
                     
                     # 提取课程基本信息
                     course_name = course.get('kcmc', '未知课程')  # 课程名称
                     teacher_name = course.get('xm', '未知教师')   # 教师姓名
                     classroom = course.get('cdmc', '未知教室')     # 教室名称
                     
-                    print(f"    课程名称: {course_name}")
-                    print(f"    教师: {teacher_name}")
-                    print(f"    教室: {classroom}")
-                    
                     # 时间信息
                     week_day = int(course.get('xqj', 1))  # 星期几 (1-7)
-                    print(f"    星期: {week_day}")
                     
                     # 解析节次信息，格式如 "3-4"
                     jcor_str = course.get('jcor', '1')
-                    print(f"    原始节次(jcor): {jcor_str}")
                     if '-' in jcor_str:
                         periods = jcor_str.split('-')
                         start_period = int(periods[0])
@@ -325,19 +446,19 @@ class ZFWImporter:
                         start_period = int(jcor_str)
                         end_period = start_period
                     
-                    print(f"    解析后节次: {start_period}-{end_period}")
-                    
                     # 周数信息
                     weeks_display = course.get('zcd', '1-16周')  # 周次显示
-                    print(f"    原始周次显示(zcd): {weeks_display}")
                     
                     # 解析具体的周数
                     week_numbers = cls._parse_weeks_from_zcd(weeks_display)
-                    print(f"    解析后周数: {week_numbers}")
                     
                     # 获取上课时间
                     start_time_str, end_time_str = cls._get_period_time(start_period, end_period)
-                    print(f"    计算出的时间: {start_time_str} - {end_time_str}")
+                    logger.debug(
+                        "课程 %s: 教师 %s, 教室 %s, 星期 %d, 节次 %d-%d (%s-%s), 周次 %s -> %s",
+                        course_name, teacher_name, classroom, week_day, start_period, end_period,
+                        start_time_str, end_time_str, weeks_display, week_numbers, extra=TRACE
+                    )
                     
                     # 使用传入的开学日期，如果没有则使用默认值
                     if start_date:
@@ -355,7 +476,6 @@ class ZFWImporter:
                             
                             days_offset = (week_num - 1) * 7 + day_offset_in_week
                             target_date = semester_start + timedelta(days=days_offset)
-                            print(f"        第{week_num}周 星期{week_day}: {semester_start} + {days_offset}天 = {target_date}")
                             
                             # 创建开始和结束时间
                             start_time = datetime.combine(target_date.date(), 
@@ -382,20 +502,20 @@ class ZFWImporter:
                             events.append(event)
                             
                         except Exception as e:
-                            print(f"创建课程事件失败 (第{week_num}周): {e}")
+                            logger.warning("创建课程事件失败 (第%d周): %s", week_num, e)
                             continue
                     
-                    print(f"课程 '{course_name}' 生成了 {len(week_numbers)} 个事件")
+                    logger.debug("课程 '%s' 生成了 %d 个事件", course_name, len(week_numbers), extra=TRACE)
                     
                 except Exception as e:
-                    print(f"解析课程失败: {e}, 课程数据: {course}")
+                    logger.warning("解析课程失败: %s, 课程数据: %s", e, course)
                     continue
             
-            print(f"总共生成 {len(events)} 个课表事件")
+            logger.info("总共生成 %d 个课表事件", len(events))
             return events
             
         except Exception as e:
-            print(f"解析课表JSON数据失败: {e}")
+            logger.exception("解析课表JSON数据失败: %s", e)
             return []
     
     @classmethod
@@ -436,7 +556,7 @@ class ZFWImporter:
             return week_numbers if week_numbers else list(range(1, 17))
             
         except Exception as e:
-            print(f"解析周次失败: {e}")
+            logger.warning("解析周次失败: %s", e)
             return list(range(1, 17))
     
     @classmethod
@@ -459,10 +579,9 @@ class ZFWImporter:
         try:
             start_time = time_table.get(start_period, ("08:20", "09:05"))[0]
             end_time = time_table.get(end_period, ("09:05", "09:05"))[1]
-            print(f"    节次 {start_period}-{end_period} 对应时间: {start_time}-{end_time}")
             return start_time, end_time
         except Exception as e:
-            print(f"获取节次时间失败: {e}")
+            logger.warning("获取节次时间失败: %s", e)
             return "08:20", "09:05"
 
     @classmethod
@@ -496,11 +615,11 @@ class ZFWImporter:
         return colors[color_index]
 
     @classmethod
-    def login_and_import(cls, session_id: str, username: str, password: str, captcha: str, start_date: date = None) -> Dict:
+    async def login_and_import(cls, session_id: str, username: str, password: str, captcha: str, start_date: date = None) -> Dict:
         """第二步：使用验证码和密码登录并导入数据"""
         try:
-            # 从缓存中获取session
-            session_data = _session_cache.get(session_id)
+            # 从缓存中获取session（过期的会话由存储按 TTL 清理）
+            session_data = await import_session_store.get(session_id)
             if not session_data:
                 return {
                     "success": False,
@@ -508,16 +627,6 @@ class ZFWImporter:
                     "imported_count": 0
                 }
             
-            # 检查session是否过期（30分钟）
-            current_time = datetime.now().timestamp()
-            if current_time - session_data.get("created_time", 0) > 1800:  # 30分钟
-                _session_cache.pop(session_id, None)
-                return {
-                    "success": False,
-                    "message": "会话已过期，请重新获取验证码",
-                    "imported_count": 0
-                }
-            
             # 输入验证
             if not username or not password or not captcha:
                 return {
@@ -527,46 +636,43 @@ class ZFWImporter:
                 }
             
             try:
-                print(f"开始登录流程，用户名: {username}")
+                logger.info("开始登录流程，用户名: %s", username)
                 
-                # 创建新的登录器实例
-                jwxt_login = JwxtLogin(username, password)
+                # 创建新的登录器实例，使用缓存的 cookies 保持与验证码相同的会话
+                jwxt_login = JwxtLogin(username, password, cookies=load_cookies(session_data.get("cookies")))
                 
-                # 使用缓存的session（保持cookies）
-                if "login_session" in session_data:
-                    jwxt_login.session = session_data["login_session"]
-                
-                # 尝试登录
-                login_success = jwxt_login.login_with_captcha(captcha)
+                try:
+                    # 尝试登录
+                    login_success = await jwxt_login.login_with_captcha(captcha)
+                    schedule_data = None
+                    if login_success:
+                        # 登录成功，获取课表数据
+                        logger.info("登录成功，开始获取课表数据")
+                        schedule_data = await jwxt_login.get_schedule(year=2025, term=1)
+                finally:
+                    await jwxt_login.aclose()
                 
                 if not login_success:
                     # 清理缓存
-                    _session_cache.pop(session_id, None)
+                    await import_session_store.pop(session_id)
                     return {
                         "success": False,
                         "message": "登录失败，请检查学号、密码或验证码是否正确",
                         "imported_count": 0
                     }
                 
-                # 登录成功，获取课表数据
-                print("登录成功，开始获取课表数据...")
-                schedule_data = jwxt_login.get_schedule(year=2025, term=1)
-                
                 if not schedule_data:
                     # 清理缓存
-                    _session_cache.pop(session_id, None)
+                    await import_session_store.pop(session_id)
                     return {
                         "success": False,
                         "message": "获取课表数据失败，请稍后重试",
                         "imported_count": 0
                     }
                 
-                # 打印原始JSON数据用于调试
-                print("=" * 50)
-                print("获取到的原始课表JSON数据:")
-                import json
-                print(json.dumps(schedule_data, indent=2, ensure_ascii=False))
-                print("=" * 50)
+                # 原始JSON数据只在 DEBUG 级别输出，避免每次导入都序列化整张课表
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("获取到的原始课表JSON数据: %s", json.dumps(schedule_data, ensure_ascii=False))
                 
                 # 解析课表数据
                 events = cls._parse_schedule_json(schedule_data, start_date)
@@ -575,10 +681,10 @@ class ZFWImporter:
                 user_info = None
                 if 'xsxx' in schedule_data and schedule_data['xsxx']:
                     user_info = schedule_data['xsxx']
-                    print(f"提取到用户信息: {user_info}")
+                    logger.debug("提取到用户信息: %s", user_info)
                 
                 # 清理缓存
-                _session_cache.pop(session_id, None)
+                await import_session_store.pop(session_id)
                 
                 return {
                     "success": True,
@@ -589,9 +695,9 @@ class ZFWImporter:
                 }
                 
             except Exception as e:
-                print(f"登录或获取课表异常: {e}")
+                logger.exception("登录或获取课表异常: %s", e)
                 # 清理缓存
-                _session_cache.pop(session_id, None)
+                await import_session_store.pop(session_id)
                 return {
                     "success": False,
                     "message": f"登录过程中发生错误: {str(e)}",
@@ -600,7 +706,7 @@ class ZFWImporter:
             
         except Exception as e:
             # 清理缓存
-            _session_cache.pop(session_id, None)
+            await import_session_store.pop(session_id)
             return {
                 "success": False,
                 "message": f"导入过程中发生错误: {str(e)}",
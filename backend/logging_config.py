@@ -0,0 +1,146 @@
+"""
+Application logging.
+
+Log records are put on an in-memory queue by a QueueHandler and written
+to stdout by a QueueListener thread, so request handlers never block on
+the (supervisord-redirected) log file. Records are rendered as one JSON
+object per line by default; LOG_FORMAT=text gives the classic format for
+local development.
+
+Per-row traces (one line per imported course, week or uploaded chunk) are
+logged at DEBUG with ``extra=TRACE`` and, when DEBUG is enabled, only one
+in LOG_TRACE_SAMPLE records is kept. At the default INFO level they cost
+a single level check.
+
+Environment:
+    LOG_LEVEL           DEBUG / INFO / WARNING / ERROR (default INFO)
+    LOG_FORMAT          json / text (default json)
+    LOG_TRACE_SAMPLE    keep 1 of N sampled trace records (default 100, 1 keeps all)
+    LOG_QUEUE_SIZE      max queued records; excess records are dropped (default 10000)
+"""
+
+import atexit
+import copy
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# 传给 logger.debug(..., extra=TRACE) 的逐行追踪标记
+TRACE = {"sampled": True}
+
+# LogRecord 自带的属性，其余属性视为 extra 字段输出
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sampled"}
+
+_listener: Optional[QueueListener] = None
+# 在入队前渲染异常堆栈
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        # 经过队列的记录只带渲染好的 exc_text（见 _DroppingQueueHandler.prepare）
+        exc_text = record.exc_text
+        if not exc_text and record.exc_info:
+            exc_text = self.formatException(record.exc_info)
+        if exc_text:
+            payload["exc_info"] = exc_text
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TraceSampler(logging.Filter):
+    """Keep one of every ``every`` records logged with extra=TRACE; other records pass."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        return next(self._counter) % self.every == 0
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments into the message like QueueHandler.prepare, but
+        keep the traceback apart in exc_text instead of folding it into the
+        message, so the formatter on the listener thread can emit it as its
+        own field. The traceback objects themselves are not queued.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging() -> None:
+    """配置根日志器（重复调用无效果）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    else:
+        formatter = JsonFormatter()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    queue_handler.addFilter(TraceSampler(int(os.getenv("LOG_TRACE_SAMPLE", "100"))))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # uvicorn 的访问日志和错误日志也走同一个队列
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """写出队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
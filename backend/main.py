@@ -1,21 +1,36 @@
+import logging
+from logging_config import setup_logging, shutdown_logging
+
+# 在加载配置和其他模块之前启用日志队列
+setup_logging()
+
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, get_db
+from database import SessionLocal, engine, async_engine, get_db
 from models import Base, User
 from auth import get_password_hash
-from routers import auth, schedule, team, admin, import_route, profile, schedules, admin_settings
+from migrations import run_migrations
+from importer import close_http_pool
+from services.import_session_store import import_session_store
+from services.uploader_service import init_uploader, close_uploader
+from routers import auth, schedule, team, admin, import_route, profile, schedules, admin_settings, metrics
+from metrics import MetricsMiddleware, instrument_engine
 from config import get_config
 import uvicorn
 import os
 
+logger = logging.getLogger(__name__)
+
 # Initialize database with default admin user
 def init_db():
     """Initialize database with default admin user."""
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    # Apply indexes/columns added to tables that already exist
+    run_migrations(engine)
     
     db = SessionLocal()
     try:
@@ -33,10 +48,10 @@ def init_db():
             )
             db.add(default_admin)
             db.commit()
-            print("Default admin user created:")
-            print("Student ID: admin")
-            print("Password: admin123")
-            print("Please change the password after first login!")
+            logger.warning(
+                "Default admin user created (student ID: admin, password: admin123). "
+                "Please change the password after first login!"
+            )
         
         # Create some sample users for testing
         sample_users = [
@@ -64,10 +79,10 @@ def init_db():
                 db.add(new_user)
         
         db.commit()
-        print("Sample users created successfully!")
+        logger.info("Sample users created successfully!")
         
     except Exception as e:
-        print(f"Error initializing database: {e}")
+        logger.exception("Error initializing database: %s", e)
         db.rollback()
     finally:
         db.close()
@@ -76,9 +91,14 @@ def init_db():
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    import_session_store.start_sweeper()
+    init_uploader()
     yield
     # Shutdown
-    pass
+    await import_session_store.stop_sweeper()
+    await close_http_pool()
+    await close_uploader()
+    shutdown_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -90,6 +110,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Count SQL statements and time per request on both engines
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -97,8 +121,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 跨域时浏览器只向脚本暴露简单响应头，分页游标和 ICS 缓存的 ETag 需显式列出
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Per-route latency and SQL histograms, exported on /metrics (outermost, so CORS preflights are timed too)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(schedule.router)
@@ -108,6 +137,7 @@ app.include_router(admin.router)
 app.include_router(admin_settings.router)
 app.include_router(import_route.router)
 app.include_router(profile.router)
+app.include_router(metrics.router)
 
 # Setup static file serving for local avatars
 config = get_config()
@@ -0,0 +1,329 @@
+"""
+Request and database metrics in the Prometheus text format.
+
+MetricsMiddleware (pure ASGI, so it does not wrap responses the way
+BaseHTTPMiddleware does) times every HTTP request and labels it with the
+route template ("/api/schedules/{schedule_id}/events"), not the raw path.
+The cursor hooks installed by instrument_engine count statements and SQL
+time into a per-request context variable; the variable is copied into
+the threadpool for sync sessions and into SQLAlchemy's greenlet for async
+sessions, so both engines report into the same request. A route whose
+query count jumps after a change shows up in
+http_request_db_queries_bucket immediately.
+
+Query budgets catch N+1 regressions before they ship. Every request has a
+budget (QUERY_BUDGET, or the QueryBudget dependency of its route); with
+QUERY_BUDGET_MODE=warn a request over budget is logged and counted, with
+QUERY_BUDGET_MODE=strict the statement that exceeds it raises
+QueryBudgetExceeded (use this in staging and test runs). query_budget()
+applies the same guard to a block of code outside a request.
+
+Environment:
+    METRICS_TOKEN       when set, GET /metrics requires "Authorization: Bearer <token>"
+    QUERY_BUDGET        default SQL statements allowed per request (default 25)
+    QUERY_BUDGET_MODE   off / warn / strict (default off)
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "25"))
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 请求耗时直方图的桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求的 SQL 语句数直方图的桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# 每个请求的 SQL 总耗时直方图的桶（秒）
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 未匹配任何路由的请求（404、扫描器）统一归到这个标签，避免标签数量失控
+UNMATCHED_ROUTE = "<unmatched>"
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """More SQL statements were executed than the budget allows."""
+
+
+class RequestStats:
+    """SQL statements executed while handling one request (or a query_budget block)."""
+
+    __slots__ = ("queries", "sql_seconds", "budget", "strict")
+
+    def __init__(self, budget: Optional[int] = None, strict: bool = False):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # None 表示不限制
+        self.budget = budget
+        self.strict = strict
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.queries > self.budget
+
+
+# 当前请求的统计；请求之外（启动、后台任务）为 None
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a label tuple per series."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [每个桶的计数..., +Inf 计数, 总和]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+            cumulative += series[len(self.buckets)]
+            yield f'{self.name}_bucket{{{label_text},le="+Inf"}} {cumulative}'
+            yield f"{self.name}_sum{{{label_text}}} {series[-1]}"
+            yield f"{self.name}_count{{{label_text}}} {cumulative}"
+
+
+class RequestMetrics:
+    """Per-route latency, status and SQL histograms shared by all requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Request latency by route.",
+            ("method", "route"), LATENCY_BUCKETS,
+        )
+        self.queries = Histogram(
+            "http_request_db_queries", "SQL statements executed per request.",
+            ("method", "route"), QUERY_COUNT_BUCKETS,
+        )
+        self.sql_time = Histogram(
+            "http_request_db_seconds", "Total SQL time per request.",
+            ("method", "route"), SQL_TIME_BUCKETS,
+        )
+        self.responses: Dict[Tuple[str, str, str], int] = {}
+        self.over_budget: Dict[Tuple[str, str], int] = {}
+        self.background_queries = 0
+        self.background_sql_seconds = 0.0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        labels = (method, route)
+        with self._lock:
+            self.latency.observe(labels, seconds)
+            self.queries.observe(labels, stats.queries)
+            self.sql_time.observe(labels, stats.sql_seconds)
+            key = (method, route, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+            if stats.over_budget:
+                self.over_budget[labels] = self.over_budget.get(labels, 0) + 1
+
+    def observe_background_query(self, seconds: float) -> None:
+        with self._lock:
+            self.background_queries += 1
+            self.background_sql_seconds += seconds
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Responses by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for labels, count in sorted(self.responses.items()):
+                lines.append(f"http_requests_total{{{_labels(('method', 'route', 'status'), labels)}}} {count}")
+            for histogram in (self.latency, self.queries, self.sql_time):
+                lines.extend(histogram.render())
+            lines.append("# HELP http_request_query_budget_exceeded_total Requests over their SQL statement budget.")
+            lines.append("# TYPE http_request_query_budget_exceeded_total counter")
+            for labels, count in sorted(self.over_budget.items()):
+                lines.append(
+                    f"http_request_query_budget_exceeded_total{{{_labels(('method', 'route'), labels)}}} {count}"
+                )
+            lines.extend(gauge_lines("db_background_queries_total", "SQL statements executed outside requests.",
+                                     self.background_queries, "counter"))
+            lines.extend(gauge_lines("db_background_seconds_total", "SQL time spent outside requests.",
+                                     self.background_sql_seconds, "counter"))
+            return lines
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def gauge_lines(name: str, help_text: str, value, metric_type: str = "gauge") -> List[str]:
+    """单个无标签指标的文本行"""
+    if isinstance(value, bool):
+        value = int(value)
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_request_stats.get()
+    if stats is None:
+        request_metrics.observe_background_query(elapsed)
+    else:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if stats.strict and stats.over_budget:
+            raise QueryBudgetExceeded(
+                f"{stats.queries} SQL statements exceed the budget of {stats.budget}: {statement[:200]}"
+            )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """为引擎注册语句计数和计时钩子（异步引擎传入 async_engine.sync_engine）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    # 语句执行失败时不会触发 after_cursor_execute，弹出对应的开始时间
+    event.listen(engine, "handle_error", _discard_query_start)
+
+
+def _discard_query_start(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+class QueryBudget:
+    """
+    路由级 SQL 语句预算，用作依赖：
+
+        @router.get("/", dependencies=[Depends(QueryBudget(3))])
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    async def __call__(self) -> None:
+        stats = current_request_stats.get()
+        # QUERY_BUDGET_MODE=off 时请求没有预算，路由预算也不生效
+        if stats is not None and stats.budget is not None:
+            stats.budget = self.limit
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[RequestStats]:
+    """
+    在请求之外限制一段代码的 SQL 语句数，超出时抛出 QueryBudgetExceeded
+    （引擎需已调用 instrument_engine）：
+
+        with query_budget(2) as stats:
+            crud.get_filtered_events(db, ...)
+    """
+    outer = current_request_stats.get()
+    stats = RequestStats(limit, strict=True)
+    token = current_request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request_stats.reset(token)
+        if outer is not None:
+            outer.queries += stats.queries
+            outer.sql_seconds += stats.sql_seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request by route template."""
+
+    def __init__(self, app):
+        self.app = app
+        # endpoint -> 路由模板，首次请求时从应用的路由表构建
+        self._route_paths: Optional[Dict[object, str]] = None
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            self._route_paths = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in scope["app"].routes
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if QUERY_BUDGET_MODE == "off":
+            stats = RequestStats()
+        else:
+            stats = RequestStats(QUERY_BUDGET, strict=QUERY_BUDGET_MODE == "strict")
+        token = current_request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+        observed = False
+
+        def observe() -> None:
+            nonlocal observed
+            observed = True
+            elapsed = time.perf_counter() - started
+            route = self._route_path(scope)
+            request_metrics.observe(scope["method"], route, status_code, elapsed, stats)
+            if stats.over_budget and QUERY_BUDGET_MODE == "warn":
+                logger.warning(
+                    "%s %s executed %d SQL statements (budget %d)",
+                    scope["method"], route, stats.queries, stats.budget,
+                    extra={"route": route, "queries": stats.queries, "budget": stats.budget},
+                )
+            # 之后运行的 BackgroundTasks 不受请求预算限制
+            stats.budget = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # 响应发送完即记录，之后运行的 BackgroundTasks 不计入请求耗时
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not observed:
+                observe()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            if not observed:
+                observe()
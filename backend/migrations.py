@@ -0,0 +1,122 @@
+"""
+Lightweight schema migrations for existing databases.
+
+Base.metadata.create_all() only creates missing tables, so columns and
+indexes added to tables that already exist are applied here. Each step is
+idempotent and recorded in the schema_migrations table.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from models import Event, Schedule, ScheduleAdjustment
+from utils import parse_week_mask
+
+logger = logging.getLogger(__name__)
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    """为已有的表补建模型中声明的索引（列由后续迁移添加的索引留给该迁移创建）"""
+    inspector = inspect(engine)
+    for table in (Schedule.__table__, Event.__table__, ScheduleAdjustment.__table__):
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if all(column.name in existing for column in index.columns):
+                index.create(bind=engine, checkfirst=True)
+
+
+def _add_column_if_missing(engine: Engine, table: str, column: str, ddl: str) -> None:
+    """为已有的表添加新列（列已存在时跳过）"""
+    existing = {col["name"] for col in inspect(engine).get_columns(table)}
+    if column not in existing:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _backfill_event_week_mask(engine: Engine) -> None:
+    """添加 events.week_mask 列，并按不同的周数字符串批量回填"""
+    _add_column_if_missing(engine, "events", "week_mask", "INTEGER")
+
+    week_source = "COALESCE(NULLIF(weeks_input, ''), weeks_display, '')"
+    with engine.begin() as conn:
+        week_strings = [row[0] for row in conn.execute(text(
+            f"SELECT DISTINCT {week_source} FROM events WHERE week_mask IS NULL"
+        ))]
+        params = [{"mask": parse_week_mask(value), "source": value} for value in week_strings]
+        if params:
+            conn.execute(
+                text(f"UPDATE events SET week_mask = :mask WHERE week_mask IS NULL AND {week_source} = :source"),
+                params
+            )
+
+
+def _add_schedule_version(engine: Engine) -> None:
+    """添加 schedules.version 列，用于 ICS 缓存失效"""
+    _add_column_if_missing(engine, "schedules", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _widen_event_schedule_index(engine: Engine) -> None:
+    """用包含 end_time 的覆盖索引替换 (schedule_id, is_active, start_time) 索引"""
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_events_schedule_active_start"))
+    _create_missing_indexes(engine)
+
+
+def _add_adjustment_end_date(engine: Engine) -> None:
+    """添加 schedule_adjustments.end_date 列，放假区间用一条记录表示"""
+    _add_column_if_missing(engine, "schedule_adjustments", "end_date", "DATE")
+
+
+def _add_event_suppressed_by(engine: Engine) -> None:
+    """
+    添加 events.suppressed_by_id 列，记录隐藏事件的调整操作；已有的隐藏事件
+    按日期归属到第一条覆盖该日期的调整记录（HOLIDAY 不包括覆盖事件）
+    """
+    _add_column_if_missing(engine, "events", "suppressed_by_id", "INTEGER REFERENCES schedule_adjustments(id)")
+    _create_missing_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE events SET suppressed_by_id = ("
+            " SELECT a.id FROM schedule_adjustments a"
+            " WHERE a.schedule_id = events.schedule_id"
+            " AND date(events.start_time) BETWEEN a.original_date AND COALESCE(a.end_date, a.original_date)"
+            " AND (a.adjustment_type = 'SWAP' OR events.is_override = 0)"
+            " ORDER BY a.id LIMIT 1"
+            ") WHERE is_active = 0 AND suppressed_by_id IS NULL"
+        ))
+
+
+# 按顺序执行的迁移列表: (名称, 迁移函数)
+MIGRATIONS: List[Tuple[str, Callable[[Engine], None]]] = [
+    ("0001_event_hot_path_indexes", _create_missing_indexes),
+    ("0002_event_week_mask", _backfill_event_week_mask),
+    ("0003_schedule_version", _add_schedule_version),
+    ("0004_event_schedule_covering_index", _widen_event_schedule_index),
+    ("0005_adjustment_end_date", _add_adjustment_end_date),
+    ("0006_event_suppressed_by", _add_event_suppressed_by),
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    """Apply all pending migrations in order."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR PRIMARY KEY, applied_at DATETIME NOT NULL)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        migrate(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {"name": name, "applied_at": datetime.utcnow()}
+            )
+        logger.info("Migration applied: %s", name)
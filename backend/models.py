@@ -1,8 +1,10 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Date, JSON, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Date, Time, JSON, LargeBinary, Table, Index, event, update, delete, select, inspect
+from sqlalchemy.orm import relationship, Session
 from database import Base
-from datetime import datetime
+from weekset import WeekSet, WeekSetType
+from datetime import date, datetime, timedelta
 import secrets
+from typing import Optional, Tuple
 
 # Association table for many-to-many relationship between users and teams
 user_teams_table = Table('user_teams', Base.metadata,
@@ -35,7 +37,7 @@ class Schedule(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)  # 例如："大二上学期"
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # 新增的高级属性
     status = Column(String, default="进行")  # "进行", "结束", "隐藏"
@@ -45,6 +47,9 @@ class Schedule(Base):
     # 将1-11节课的默认时间存储为JSON格式
     class_times = Column(JSON, nullable=False)
     
+    # 课表内容版本号，事件/调休/模板/课表属性变化时递增，用于 ICS 缓存和 ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -52,9 +57,17 @@ class Schedule(Base):
     owner = relationship("User", back_populates="schedules")
     events = relationship("Event", back_populates="schedule", cascade="all, delete-orphan")
     adjustments = relationship("ScheduleAdjustment", back_populates="schedule", cascade="all, delete-orphan")
+    course_templates = relationship("CourseTemplate", back_populates="schedule", cascade="all, delete-orphan")
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # 课表视图/调休：按课表 + 激活状态 + 时间范围查询；包含 end_time，
+        # 团队空闲时间查询只读索引即可完成
+        Index("ix_events_schedule_active_start_end", "schedule_id", "is_active", "start_time", "end_time"),
+        # 团队视图/筛选：按时间窗口查询
+        Index("ix_events_start_end", "start_time", "end_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     schedule_id = Column(Integer, ForeignKey("schedules.id"), nullable=False)  # 新增
@@ -72,24 +85,59 @@ class Event(Base):
     day_of_week = Column(Integer, nullable=True)    # 星期几 (1-7)
     period = Column(String, nullable=True)          # 节次 (例: "3-4节")
     weeks_input = Column(String, nullable=True)     # 新增: 用于存储原始输入的周数，如 "1,4-6"
+    week_mask = Column(WeekSetType, nullable=True)  # 周数位图，由 weeks_input / weeks_display 自动计算
     color = Column(String, nullable=True)           # 课程颜色 (例: "#3B82F6")
     
     # Fields for schedule adjustment
     is_override = Column(Boolean, default=False)    # 是否为调休覆盖事件
     is_active = Column(Boolean, default=True)       # 是否激活（用于逻辑删除）
-    adjustment_id = Column(Integer, ForeignKey('schedule_adjustments.id'), nullable=True)  # 关联调整操作
+    adjustment_id = Column(Integer, ForeignKey('schedule_adjustments.id'), nullable=True, index=True)  # 关联调整操作
+    suppressed_by_id = Column(Integer, ForeignKey('schedule_adjustments.id'), nullable=True, index=True)  # 隐藏该事件的调整操作，用于撤销
 
     # Relationship with schedule
     schedule = relationship("Schedule", back_populates="events")
     # Relationship with adjustment
-    adjustment = relationship("ScheduleAdjustment", back_populates="override_events")
+    adjustment = relationship("ScheduleAdjustment", back_populates="override_events", foreign_keys=[adjustment_id])
+
+
+@event.listens_for(Event, "before_insert")
+@event.listens_for(Event, "before_update")
+def _sync_event_week_mask(mapper, connection, target):
+    """保持 week_mask 与周数字符串一致（解析结果有缓存）"""
+    target.week_mask = WeekSet.parse(target.weeks_input or target.weeks_display or "")
+
+
+# 每周重复课程的紧凑存储：一门课一行，具体上课事件按需展开
+class CourseTemplate(Base):
+    __tablename__ = "course_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id"), nullable=False, index=True)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    location = Column(String, nullable=True)
+    instructor = Column(String, nullable=True)
+    color = Column(String, nullable=True)
+
+    day_of_week = Column(Integer, nullable=False)   # 星期几 (1-7)
+    start_period = Column(Integer, nullable=True)   # 开始节次
+    end_period = Column(Integer, nullable=True)     # 结束节次
+    start_time = Column(Time, nullable=True)        # 上课时间，为空时按课表的 class_times 计算
+    end_time = Column(Time, nullable=True)
+    week_mask = Column(WeekSetType, nullable=False, default=WeekSet(0))  # 上课周位图：第 n 周对应 1 << n
+    weeks_display = Column(String, nullable=True)   # 原始周数显示 (例: "1-16周")
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    schedule = relationship("Schedule", back_populates="course_templates")
 
 
 class ScheduleAdjustment(Base):
     __tablename__ = 'schedule_adjustments'
     
     id = Column(Integer, primary_key=True, index=True)
-    schedule_id = Column(Integer, ForeignKey('schedules.id'), nullable=False)
+    schedule_id = Column(Integer, ForeignKey('schedules.id'), nullable=False, index=True)
     
     # 操作类型: 'HOLIDAY' (放假), 'SWAP' (交换)
     adjustment_type = Column(String, nullable=False)
@@ -97,6 +145,9 @@ class ScheduleAdjustment(Base):
     # 原始日期 (被操作的日期)
     original_date = Column(Date, nullable=False)
     
+    # 放假结束日期（含），为空时只放 original_date 一天
+    end_date = Column(Date, nullable=True)
+    
     # 目标日期 (课程被移动到的日期, 'HOLIDAY'类型下此字段为空)
     target_date = Column(Date, nullable=True)
     
@@ -104,7 +155,35 @@ class ScheduleAdjustment(Base):
     
     # Relationships
     schedule = relationship("Schedule", back_populates="adjustments")
-    override_events = relationship("Event", back_populates="adjustment")
+    override_events = relationship("Event", back_populates="adjustment", foreign_keys="Event.adjustment_id")
+
+
+class ImportSession(Base):
+    """教务系统导入会话（验证码 -> 登录），IMPORT_SESSION_BACKEND=database 时使用，多个 worker 共享"""
+    __tablename__ = 'import_sessions'
+    
+    id = Column(String, primary_key=True)  # session_id (uuid4)
+    data = Column(JSON, nullable=False)    # cookies 等会话数据
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, index=True)  # 用于 LRU 淘汰
+    expires_at = Column(DateTime, nullable=False, index=True)    # 用于 TTL 清理
+
+
+class WeeklyOccupancy(Base):
+    """
+    用户某一周的占用位图（按需生成的缓存，可随时删除重建）。
+
+    masks 为 7 个小端 uint32，依次对应周一到周日；按节次网格排序后，
+    第 i 节占用第 2i 位，第 i 节与下一节之间的间隔占用第 2i+1 位。
+    """
+    __tablename__ = 'weekly_occupancy'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    grid_key = Column(String, primary_key=True)      # 节次网格（class_times）的摘要
+    week_start = Column(Date, primary_key=True)      # 该周周一
+    masks = Column(LargeBinary, nullable=False)
+    stamp = Column(Integer, nullable=False)          # 生成时该用户各课表版本号之和
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Team(Base):
@@ -131,3 +210,142 @@ class Team(Base):
             # Check if it already exists (if db_session is provided)
             if db_session is None or not db_session.query(cls).filter(cls.team_code == team_code).first():
                 return team_code
+
+
+# 课表版本号维护：flush 前收集受影响的课表，flush 后统一递增
+_VERSIONED_CHILDREN = (Event, ScheduleAdjustment, CourseTemplate)
+
+# 占用位图失效范围：None 表示该用户的所有周
+ALL_WEEKS = None
+
+
+def _week_start(value) -> date:
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def _attribute_values(obj, attr: str) -> list:
+    """属性修改前后的所有取值"""
+    history = inspect(obj).attrs[attr].history
+    return [value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None]
+
+
+def _event_weeks(obj: Event) -> set:
+    """事件修改前后覆盖的周（周一日期）"""
+    return {
+        _week_start(value)
+        for attr in ("start_time", "end_time")
+        for value in _attribute_values(obj, attr)
+    }
+
+
+def _merge_weeks(target: dict, key, weeks) -> None:
+    if weeks is ALL_WEEKS or (key in target and target[key] is ALL_WEEKS):
+        target[key] = ALL_WEEKS
+    else:
+        target.setdefault(key, set()).update(weeks)
+
+
+def _schedule_owner_id(session: Session, schedule_id) -> Optional[int]:
+    schedule = session.get(Schedule, schedule_id) if schedule_id is not None else None
+    return schedule.owner_id if schedule is not None else None
+
+
+def _collect_touched(session: Session) -> Tuple[set, dict]:
+    """
+    返回 (受影响的课表ID, {用户ID: 受影响的周})。普通事件的增删改只影响
+    其所在的周；调休、模板和课表本身的变化影响该用户的所有周。
+    """
+    schedule_ids = set()
+    owners = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _VERSIONED_CHILDREN):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            weeks = _event_weeks(obj) if isinstance(obj, Event) else ALL_WEEKS
+            schedule = obj.schedule
+            if schedule is None:
+                schedule = session.get(Schedule, obj.schedule_id) if obj.schedule_id is not None else None
+            if schedule is not None:
+                if schedule.id is not None:
+                    schedule_ids.add(schedule.id)
+                owner_id = schedule.owner_id if schedule.owner_id is not None else getattr(schedule.owner, "id", None)
+                if owner_id is not None:
+                    _merge_weeks(owners, owner_id, weeks)
+            # 事件被移动到其他课表时，原课表也需要更新
+            for previous in inspect(obj).attrs.schedule_id.history.deleted or ():
+                if previous is not None:
+                    schedule_ids.add(previous)
+                    owner_id = _schedule_owner_id(session, previous)
+                    if owner_id is not None:
+                        _merge_weeks(owners, owner_id, weeks)
+        elif isinstance(obj, Schedule):
+            if obj in session.dirty:
+                if not session.is_modified(obj):
+                    continue
+                schedule_ids.add(obj.id)
+            if obj in session.dirty or obj in session.deleted:
+                for owner_id in _attribute_values(obj, "owner_id"):
+                    _merge_weeks(owners, owner_id, ALL_WEEKS)
+    return schedule_ids, owners
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_schedule_changes(session, flush_context, instances):
+    schedule_ids, owners = _collect_touched(session)
+    if schedule_ids:
+        session.info.setdefault("touched_schedule_ids", set()).update(schedule_ids)
+    if owners:
+        pending = session.info.setdefault("touched_occupancy", {})
+        for owner_id, weeks in owners.items():
+            _merge_weeks(pending, owner_id, weeks)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_schedule_versions(session, flush_context):
+    touched = session.info.pop("touched_schedule_ids", None)
+    if touched:
+        _increment_versions(session, touched)
+    owners = session.info.pop("touched_occupancy", None)
+    if owners:
+        for owner_id, weeks in owners.items():
+            _delete_occupancy(session, WeeklyOccupancy.user_id == owner_id, weeks)
+
+
+def _increment_versions(session: Session, schedule_ids) -> None:
+    schedule_ids = sorted(set(schedule_ids))
+    if not schedule_ids:
+        return
+    session.connection().execute(
+        update(Schedule)
+        .where(Schedule.id.in_(schedule_ids))
+        .values(version=Schedule.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    # 已加载的课表对象的版本号过期，下次访问时重新读取
+    for schedule_id in schedule_ids:
+        schedule = session.identity_map.get((Schedule, (schedule_id,), None))
+        if schedule is not None:
+            session.expire(schedule, ["version"])
+
+
+def _delete_occupancy(session: Session, condition, weeks=ALL_WEEKS) -> None:
+    if weeks is not ALL_WEEKS and not weeks:
+        return
+    statement = delete(WeeklyOccupancy).where(condition)
+    if weeks is not ALL_WEEKS:
+        statement = statement.where(WeeklyOccupancy.week_start.in_(sorted(weeks)))
+    session.connection().execute(statement.execution_options(synchronize_session=False))
+
+
+def bump_schedule_versions(session: Session, schedule_ids) -> None:
+    """
+    递增课表版本号，并删除课表所有者的占用位图。flush 时自动处理；使用
+    query.update()/delete() 等批量语句修改事件时不会触发 flush 事件，需要显式调用。
+    """
+    schedule_ids = sorted(set(schedule_ids))
+    if not schedule_ids:
+        return
+    _increment_versions(session, schedule_ids)
+    owners = select(Schedule.owner_id).where(Schedule.id.in_(schedule_ids)).scalar_subquery()
+    _delete_occupancy(session, WeeklyOccupancy.user_id.in_(owners))
@@ -0,0 +1,128 @@
+"""
+Lazy expansion of course templates into concrete occurrences.
+
+A CourseTemplate stores one weekly course with a WeekSet bitmask instead of
+one Event row per week. Occurrences are generated on demand for a date
+window and schedule adjustments (HOLIDAY / SWAP) are applied on the fly.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import CourseTemplate, Schedule, ScheduleAdjustment
+from weekset import WeekSet
+
+
+def build_adjustment_map(adjustments: Iterable[ScheduleAdjustment]) -> Dict[date, Tuple[Optional[date], Optional[int]]]:
+    """
+    将调休记录整理为 {原日期: (目标日期, 调整ID)}，放假的目标日期为 None，
+    放假区间展开为区间内的每一天。后创建的记录覆盖先创建的记录。
+    """
+    date_map = {}
+    for adjustment in sorted(adjustments, key=lambda a: (a.created_at or datetime.min, a.id or 0)):
+        if adjustment.adjustment_type == "HOLIDAY":
+            day = adjustment.original_date
+            while day <= (adjustment.end_date or adjustment.original_date):
+                date_map[day] = (None, adjustment.id)
+                day += timedelta(days=1)
+        elif adjustment.adjustment_type == "SWAP":
+            date_map[adjustment.original_date] = (adjustment.target_date, adjustment.id)
+    return date_map
+
+
+def _parse_clock(value: Optional[str]) -> Optional[time]:
+    if not value:
+        return None
+    try:
+        hour, minute = map(int, value.split(":"))
+        return time(hour, minute)
+    except ValueError:
+        return None
+
+
+def resolve_template_times(template: CourseTemplate, class_times: Optional[dict]) -> Tuple[time, time]:
+    """返回模板的上下课时间，未显式设置时按课表的节次时间计算"""
+    start = template.start_time
+    end = template.end_time
+    class_times = class_times or {}
+    if start is None and template.start_period is not None:
+        start = _parse_clock(class_times.get(str(template.start_period), {}).get("start"))
+    if end is None and template.end_period is not None:
+        end = _parse_clock(class_times.get(str(template.end_period), {}).get("end"))
+    return start or time(8, 0), end or time(9, 0)
+
+
+def week_date(schedule_start: date, week: int, day_of_week: int) -> date:
+    """计算第 week 周星期 day_of_week 的日期（周一=1）"""
+    return schedule_start + timedelta(days=(week - 1) * 7 + (day_of_week - 1))
+
+
+def week_window(schedule_start: date, week: int) -> Tuple[date, date]:
+    """第 week 周的日期范围（首尾均包含）"""
+    return week_date(schedule_start, week, 1), week_date(schedule_start, week, 7)
+
+
+def expand_template(
+    template: CourseTemplate,
+    schedule: Schedule,
+    window_start: date,
+    window_end: date,
+    adjustment_map: Optional[Dict[date, Tuple[Optional[date], Optional[int]]]] = None
+) -> List[dict]:
+    """
+    生成模板在 [window_start, window_end] 内的具体上课事件。
+
+    Returns:
+        List[dict]: 每个元素描述一次上课，字段与 Event 保持一致
+    """
+    adjustment_map = adjustment_map or {}
+    start_clock, end_clock = resolve_template_times(template, schedule.class_times)
+    period = None
+    if template.start_period is not None:
+        end_period = template.end_period or template.start_period
+        period = f"{template.start_period}-{end_period}节"
+
+    occurrences = []
+    for week in WeekSet(template.week_mask or 0):
+        original = week_date(schedule.start_date, week, template.day_of_week)
+        target, adjustment_id = adjustment_map.get(original, (original, None))
+        if target is None:
+            # 放假，当天不上课
+            continue
+        if target < window_start or target > window_end:
+            continue
+
+        occurrences.append({
+            "template_id": template.id,
+            "schedule_id": template.schedule_id,
+            "title": template.title,
+            "description": template.description,
+            "location": template.location,
+            "instructor": template.instructor,
+            "color": template.color,
+            "week": week,
+            "weeks_display": template.weeks_display,
+            "day_of_week": target.isoweekday(),
+            "period": period,
+            "start_time": datetime.combine(target, start_clock),
+            "end_time": datetime.combine(target, end_clock),
+            "is_override": adjustment_id is not None,
+            "adjustment_id": adjustment_id,
+        })
+    return occurrences
+
+
+def expand_templates(
+    templates: Iterable[CourseTemplate],
+    schedule: Schedule,
+    window_start: date,
+    window_end: date,
+    adjustments: Iterable[ScheduleAdjustment] = ()
+) -> List[dict]:
+    """展开一个课表下的所有模板，结果按开始时间排序"""
+    adjustment_map = build_adjustment_map(adjustments)
+    occurrences = []
+    for template in templates:
+        occurrences.extend(expand_template(template, schedule, window_start, window_end, adjustment_map))
+    occurrences.sort(key=lambda o: (o["start_time"], o["template_id"] or 0))
+    return occurrences
@@ -1,13 +1,24 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from database import get_db
-from schemas import UserCreate, UserUpdate, UserResponse, EventCreate, EventUpdate, EventResponse
-from auth import get_current_admin_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import get_db, get_async_db
+from schemas import (
+    UserCreate, UserUpdate, UserResponse, EventCreate, EventUpdate, EventResponse,
+    BatchAdjustmentRequest, BatchAdjustmentJobResponse
+)
+from auth import get_current_admin_user, get_password_hash_async
 from models import User, Schedule
+from services.principal_cache import principal_cache
+from services.adjustments import (
+    AdjustmentJob, adjustment_dates, adjustment_jobs, run_batch_adjustment_job, select_batch_schedules
+)
 import crud
+import crud_async
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/admin", tags=["admin management"])
+router = APIRouter(prefix="/api/admin", tags=["admin management"], dependencies=[Depends(QueryBudget(10))])
 
 # User management endpoints
 @router.get("/users", response_model=List[UserResponse])
@@ -15,12 +26,19 @@ async def get_all_users_admin(
     skip: int = 0,
     limit: int = 100,
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all users with complete information (admin only)."""
-    users = crud.get_users(db, skip=skip, limit=limit)
+    users = await crud_async.get_users(db, skip=skip, limit=limit)
     return users
 
+@router.get("/principal-cache/stats")
+async def get_principal_cache_stats(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """Hit/miss counters of the authenticated user cache (admin only)."""
+    return principal_cache.stats()
+
 @router.post("/users", response_model=UserResponse)
 async def create_user_admin(
     user: UserCreate,
@@ -29,14 +47,15 @@ async def create_user_admin(
 ):
     """Create a new user (admin only)."""
     # Check if user with this student_id already exists
-    existing_user = crud.get_user_by_student_id(db, user.student_id)
+    existing_user = await run_in_threadpool(crud.get_user_by_student_id, db, user.student_id)
     if existing_user:
         raise HTTPException(
             status_code=400,
             detail="User with this student ID already exists"
         )
     
-    db_user = crud.create_user(db, user)
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(crud.create_user, db, user, hashed_password=hashed_password)
     return db_user
 
 @router.put("/users/{user_id}", response_model=UserResponse)
@@ -48,27 +67,31 @@ async def update_user_admin(
 ):
     """Update user information (admin only)."""
     # Check if user exists
-    existing_user = crud.get_user(db, user_id)
+    existing_user = await run_in_threadpool(crud.get_user, db, user_id)
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # If updating student_id, check for conflicts
     if user_update.student_id:
-        conflicting_user = crud.get_user_by_student_id(db, user_update.student_id)
+        conflicting_user = await run_in_threadpool(crud.get_user_by_student_id, db, user_update.student_id)
         if conflicting_user and conflicting_user.id != user_id:
             raise HTTPException(
                 status_code=400,
                 detail="Another user with this student ID already exists"
             )
     
-    updated_user = crud.update_user(db, user_id, user_update)
+    hashed_password = None
+    if user_update.password:
+        hashed_password = await get_password_hash_async(user_update.password)
+    
+    updated_user = await run_in_threadpool(crud.update_user, db, user_id, user_update, hashed_password=hashed_password)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     return updated_user
 
 @router.delete("/users/{user_id}")
-async def delete_user_admin(
+def delete_user_admin(
     user_id: int,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -89,7 +112,7 @@ async def delete_user_admin(
 
 # Schedule management endpoints
 @router.post("/schedule/{user_id}", response_model=EventResponse)
-async def create_event_for_user(
+def create_event_for_user(
     user_id: int,
     event: EventCreate,
     current_admin: User = Depends(get_current_admin_user),
@@ -138,7 +161,7 @@ async def create_event_for_user(
     return crud.get_event(db, db_event.id)
 
 @router.put("/schedule/{event_id}", response_model=EventResponse)
-async def update_any_event(
+def update_any_event(
     event_id: int,
     event_update: EventUpdate,
     current_admin: User = Depends(get_current_admin_user),
@@ -153,7 +176,7 @@ async def update_any_event(
     return crud.get_event(db, updated_event.id)
 
 @router.delete("/schedule/{event_id}")
-async def delete_any_event(
+def delete_any_event(
     event_id: int,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -164,3 +187,50 @@ async def delete_any_event(
         raise HTTPException(status_code=404, detail="Event not found")
     
     return {"message": "Event deleted successfully"}
+
+
+@router.post("/adjustments/batch", response_model=BatchAdjustmentJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_batch_adjustment(
+    request: BatchAdjustmentRequest,
+    background_tasks: BackgroundTasks,
+    current_admin: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Apply an adjustment calendar to all matching schedules in a background job (admin only)."""
+    for adjustment in request.adjustments:
+        _, start_date, end_date, _ = adjustment_dates(adjustment)
+        if end_date < start_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="End date cannot be earlier than start date"
+            )
+
+    schedules = select_batch_schedules(
+        db,
+        schedule_ids=request.schedule_ids,
+        statuses=request.statuses,
+        class_names=request.class_names,
+        grades=request.grades
+    )
+    job = AdjustmentJob(len(schedules), len(request.adjustments), request.dry_run)
+    adjustment_jobs.add(job)
+    background_tasks.add_task(run_batch_adjustment_job, job, schedules, request.adjustments)
+    return job.to_dict()
+
+@router.get("/adjustments/jobs", response_model=List[BatchAdjustmentJobResponse])
+async def list_batch_adjustment_jobs(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """List recent batch adjustment jobs, newest first (admin only)."""
+    return [job.to_dict() for job in adjustment_jobs.list()]
+
+@router.get("/adjustments/jobs/{job_id}", response_model=BatchAdjustmentJobResponse)
+async def get_batch_adjustment_job(
+    job_id: str,
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """Get the progress of a batch adjustment job (admin only)."""
+    job = adjustment_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
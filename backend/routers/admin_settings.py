@@ -11,8 +11,9 @@ from database import get_db
 from auth import get_current_admin_user
 from models import User
 from config import get_config, reload_config
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/admin", tags=["admin-settings"])
+router = APIRouter(prefix="/api/admin", tags=["admin-settings"], dependencies=[Depends(QueryBudget(5))])
 
 class AlistConfig(BaseModel):
     """Alist configuration model."""
@@ -42,7 +43,7 @@ class SystemConfig(BaseModel):
     storage: StorageConfig
 
 @router.get("/settings")
-async def get_system_settings(
+def get_system_settings(
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
@@ -60,7 +61,7 @@ async def get_system_settings(
         raise HTTPException(status_code=500, detail=f"获取配置失败: {str(e)}")
 
 @router.post("/settings")
-async def update_system_settings(
+def update_system_settings(
     settings: SystemConfig,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -2,18 +2,21 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import get_db, get_async_db
 from schemas import Token, UserResponse, LoginRequest, RegisterRequest
-from auth import authenticate_user, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash
+from auth import authenticate_user_async, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash_async
 from models import User
 import crud
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/auth", tags=["authentication"])
+router = APIRouter(prefix="/api/auth", tags=["authentication"], dependencies=[Depends(QueryBudget(5))])
 
 @router.post("/token", response_model=Token)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """User login endpoint."""
-    user = authenticate_user(db, login_data.student_id, login_data.password)
+    user = await authenticate_user_async(db, login_data.student_id, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,7 +33,8 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 async def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
     """User registration endpoint."""
     # Check if user already exists
-    existing_user = crud.get_user_by_student_id(db, register_data.student_id)
+    # 同步会话的数据库操作放到线程池中执行，不阻塞事件循环
+    existing_user = await run_in_threadpool(crud.get_user_by_student_id, db, register_data.student_id)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -38,7 +42,7 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
         )
     
     # Create new user
-    hashed_password = get_password_hash(register_data.password)
+    hashed_password = await get_password_hash_async(register_data.password)
     user_data = {
         "student_id": register_data.student_id,
         "hashed_password": hashed_password,
@@ -48,7 +52,7 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
         "role": "user"
     }
     
-    user = crud.create_user(db, user_data)
+    user = await run_in_threadpool(crud.create_user, db, user_data)
     return user
 
 @router.get("/users/me", response_model=UserResponse)
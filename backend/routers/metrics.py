@@ -0,0 +1,49 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from auth import password_pool_stats
+from ics_cache import ics_cache
+from metrics import METRICS_TOKEN, PROMETHEUS_MEDIA_TYPE, gauge_lines, request_metrics
+from services.import_session_store import import_session_store
+from services.principal_cache import principal_cache
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus 文本格式的请求、SQL 和缓存指标
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+    lines = request_metrics.render()
+
+    ics = ics_cache.stats()
+    lines += gauge_lines("ics_cache_entries", "Rendered calendars held in memory.", ics["entries"])
+    lines += gauge_lines("ics_cache_hits_total", "ICS cache hits.", ics["hits"], "counter")
+    lines += gauge_lines("ics_cache_misses_total", "ICS cache misses.", ics["misses"], "counter")
+
+    principals = principal_cache.stats()
+    lines += gauge_lines("principal_cache_entries", "Authenticated users held in the cache.", principals["entries"])
+    lines += gauge_lines("principal_cache_hits_total", "Principal cache hits.", principals["hits"], "counter")
+    lines += gauge_lines("principal_cache_misses_total", "Principal cache misses.", principals["misses"], "counter")
+    lines += gauge_lines("principal_cache_invalidations_total", "Principal cache invalidations.",
+                         principals["invalidations"], "counter")
+
+    sessions = await import_session_store.stats()
+    lines += gauge_lines("import_sessions", "Open JWXT import sessions.", sessions["size"])
+    lines += gauge_lines("import_sessions_max", "Import session capacity.", sessions["max_size"])
+    lines += gauge_lines("import_sessions_created_total", "Import sessions created.", sessions["created"], "counter")
+    lines += gauge_lines("import_sessions_expired_total", "Import sessions expired.", sessions["expired"], "counter")
+    lines += gauge_lines("import_sessions_evicted_total", "Import sessions evicted.", sessions["evicted"], "counter")
+
+    passwords = password_pool_stats()
+    lines += gauge_lines("password_hash_pending", "Password hashing jobs queued or running.", passwords["pending"])
+    lines += gauge_lines("password_hash_queue_limit", "Password hashing queue limit.", passwords["queue_limit"])
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_MEDIA_TYPE)
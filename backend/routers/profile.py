@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import os
 import uuid
 from datetime import datetime
 
-from database import get_db
-from auth import get_current_user, get_password_hash, verify_password
+from database import get_async_db
+from auth import get_current_user, get_password_hash_async, verify_password_async
 from models import User
 from schemas import UserPublic, UpdateUserRequest
 from services.uploader_service import upload_avatar
 from pydantic import BaseModel
+import crud_async
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/profile", tags=["profile"])
+router = APIRouter(prefix="/api/profile", tags=["profile"], dependencies=[Depends(QueryBudget(5))])
 
 class ChangePasswordRequest(BaseModel):
     current_password: str
@@ -29,7 +31,7 @@ class UpdateAvatarRequest(BaseModel):
 @router.get("/", response_model=UserPublic)
 async def get_profile(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取当前用户的个人信息"""
     return current_user
@@ -38,7 +40,7 @@ async def get_profile(
 async def update_profile(
     profile_data: UpdateProfileRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新个人信息"""
     update_data = profile_data.dict(exclude_unset=True)
@@ -47,8 +49,8 @@ async def update_profile(
         setattr(current_user, field, value)
     
     current_user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return current_user
 
@@ -56,21 +58,21 @@ async def update_profile(
 async def change_password(
     password_data: ChangePasswordRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """修改密码"""
     # 验证当前密码
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=400,
             detail="当前密码不正确"
         )
     
     # 更新密码
-    current_user.hashed_password = get_password_hash(password_data.new_password)
+    current_user.hashed_password = await get_password_hash_async(password_data.new_password)
     current_user.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {"message": "密码修改成功"}
 
@@ -78,15 +80,15 @@ async def change_password(
 async def update_avatar(
     avatar_data: UpdateAvatarRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新头像"""
     # 这里可以添加URL验证逻辑
     current_user.avatar_url = avatar_data.avatar_url
     current_user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return {"message": "头像更新成功", "avatar_url": current_user.avatar_url}
 
@@ -94,7 +96,7 @@ async def update_avatar(
 async def upload_avatar_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """上传头像文件"""
     try:
@@ -105,8 +107,8 @@ async def upload_avatar_file(
         current_user.avatar_url = avatar_url
         current_user.updated_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
         
         return {"message": "头像上传成功", "avatar_url": avatar_url}
         
@@ -118,16 +120,11 @@ async def upload_avatar_file(
 @router.get("/statistics")
 async def get_profile_statistics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户统计信息"""
-    from models import Schedule, Event
-    
-    # 统计课表数量
-    schedule_count = db.query(Schedule).filter(Schedule.owner_id == current_user.id).count()
-    
-    # 统计事件数量
-    event_count = db.query(Event).join(Schedule).filter(Schedule.owner_id == current_user.id).count()
+    # 统计课表数量和事件数量
+    schedule_count, event_count = await crud_async.count_user_schedules_and_events(db, current_user.id)
     
     return {
         "schedule_count": schedule_count,
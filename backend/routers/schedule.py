@@ -1,29 +1,52 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Header
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
 from schemas import EventCreate, EventUpdate, EventResponse
 from auth import get_current_user
-from models import User, Schedule
+from models import User, Schedule, Event
 import crud
-from ics import Calendar, Event as ICSEvent
-from datetime import datetime
+import crud_async
+from ics_export import stream_calendar
+from ics_cache import cached_calendar_response
+from datetime import date, datetime
+from utils import encode_event_cursor, decode_event_cursor
+from services.event_rows import event_list_response, select_event_rows
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/schedule", tags=["personal schedule"])
+router = APIRouter(prefix="/api/schedule", tags=["personal schedule"], dependencies=[Depends(QueryBudget(10))])
 
 @router.get("/", response_model=List[EventResponse])
 async def get_my_events(
     skip: int = 0,
     limit: int = 10000,  # 增加限制到10000，与多课表API保持一致
+    date_from: Optional[date] = Query(None, alias="from", description="Window start date (inclusive)"),
+    date_to: Optional[date] = Query(None, alias="to", description="Window end date (inclusive)"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all events for the current user."""
-    events = crud.get_user_events(db, current_user.id, skip=skip, limit=limit)
-    return events
+    """Get events for the current user, optionally within a date window. Pages with a keyset cursor."""
+    after = None
+    if cursor:
+        after = decode_event_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    
+    events = await crud_async.get_user_events(
+        db, current_user.id, skip=skip, limit=limit,
+        date_from=date_from, date_to=date_to, after=after
+    )
+    
+    # 满页时返回下一页游标
+    headers = None
+    if events and len(events) == limit:
+        headers = {"X-Next-Cursor": encode_event_cursor(events[-1].start_time, events[-1].id)}
+    return event_list_response(events, headers=headers)
 
 @router.post("/", response_model=List[EventResponse])
-async def create_my_event(
+def create_my_event(
     event: EventCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -64,17 +87,16 @@ async def create_my_event(
     # 使用新的递归事件创建函数
     created_events = crud.create_recurring_event(db, event, user_schedule.id)
     
-    # 重新加载每个事件以包含owner信息
-    result_events = []
-    for db_event in created_events:
-        reloaded_event = crud.get_event(db, db_event.id)
-        if reloaded_event:
-            result_events.append(reloaded_event)
-    
-    return result_events
+    # 一次查询取回所有事件及其课表信息
+    rows = db.execute(
+        select_event_rows(with_owner=False)
+        .where(Event.id.in_([db_event.id for db_event in created_events]))
+        .order_by(Event.id)
+    ).all()
+    return event_list_response(rows, with_owner=False)
 
 @router.put("/{event_id}", response_model=EventResponse)
-async def update_my_event(
+def update_my_event(
     event_id: int,
     event_update: EventUpdate,
     current_user: User = Depends(get_current_user),
@@ -96,7 +118,7 @@ async def update_my_event(
     return crud.get_event(db, updated_event.id)
 
 @router.delete("/{event_id}")
-async def delete_my_event(
+def delete_my_event(
     event_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -120,38 +142,31 @@ async def delete_my_event(
     return {"message": "Event deleted successfully"}
 
 @router.get("/export/ics")
-async def export_my_schedule_ics(
+def export_my_schedule_ics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Export current user's schedule as ICS file."""
-    events = crud.get_user_events(db, current_user.id)
-    
-    # Create ICS calendar
-    calendar = Calendar()
-    calendar.creator = f"Schedule App - {current_user.full_name}"
-    
-    for event in events:
-        ics_event = ICSEvent()
-        ics_event.name = event.title
-        ics_event.begin = event.start_time
-        ics_event.end = event.end_time
-        ics_event.description = event.description or ""
-        ics_event.location = event.location or ""
-        calendar.events.add(ics_event)
+    """Export current user's schedule as ICS file (streamed, weekly courses as RRULE, ETag by schedule versions)."""
+    schedules = (
+        db.query(Schedule.id, Schedule.version)
+        .filter(Schedule.owner_id == current_user.id)
+        .order_by(Schedule.id)
+        .all()
+    )
+    schedule_ids = [schedule_id for schedule_id, _ in schedules]
+    calendar_name = current_user.full_name
     
-    # Return ICS file
-    ics_content = str(calendar)
-    return Response(
-        content=ics_content,
-        media_type="text/calendar",
-        headers={
-            "Content-Disposition": f"attachment; filename={current_user.student_id}_schedule.ics"
-        }
+    return cached_calendar_response(
+        f"user-{current_user.id}",
+        [calendar_name] + [f"{schedule_id}:{version}" for schedule_id, version in schedules],
+        if_none_match,
+        f"{current_user.student_id}_schedule.ics",
+        lambda: stream_calendar(schedule_ids, calendar_name)
     )
 
 @router.get("/filtered", response_model=List[EventResponse])
-async def get_filtered_schedule(
+def get_filtered_schedule(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     user_ids: Optional[str] = Query(None, description="Comma-separated user IDs"),
@@ -184,21 +199,24 @@ async def get_filtered_schedule(
                 detail="You must specify team IDs to filter. Only admin users can access all schedules."
             )
         
-        # Verify user is a member of all requested teams
-        from models import Team
+        # Verify user is a member of all requested teams (one query for all teams)
+        memberships = {
+            team_id: (name, is_member)
+            for team_id, name, is_member in crud.get_team_memberships(db, team_id_list, current_user.id)
+        }
         for team_id in team_id_list:
-            team = db.query(Team).filter(Team.id == team_id).first()
-            if not team:
+            if team_id not in memberships:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Team with ID {team_id} not found"
                 )
             
             # Check if user is a member of this team
-            if current_user not in team.members:
+            team_name, is_member = memberships[team_id]
+            if not is_member:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"You are not a member of team '{team.name}'"
+                    detail=f"You are not a member of team '{team_name}'"
                 )
     
     try:
@@ -244,7 +262,7 @@ async def get_filtered_schedule(
             event_title_contains=event_title_contains
         )
         
-        return events
+        return event_list_response(events)
         
     except ValueError as e:
         raise HTTPException(
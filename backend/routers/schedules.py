@@ -1,36 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, UploadFile, File, Form
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Response, UploadFile, File, Form, Query, Header
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple, Union
 from datetime import date, datetime, timedelta
 import ics
 from io import StringIO
+import logging
 
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_user, get_current_admin_user
 from models import User, Schedule, Event, ScheduleAdjustment
 from schemas import (
     ScheduleCreate, ScheduleUpdate, ScheduleResponse, EventCreate, EventUpdate, EventResponse,
-    HolidayAdjustmentRequest, SwapAdjustmentRequest, AdjustmentOperationResponse, ScheduleAdjustmentResponse
+    CourseTemplateResponse, CourseOccurrenceResponse, HolidayAdjustmentRequest, SwapAdjustmentRequest, AdjustmentOperationResponse, ScheduleAdjustmentResponse
 )
-from utils import get_default_class_times, parse_weeks, parse_period_to_class_numbers
+from utils import get_default_class_times, parse_weeks, encode_event_cursor, decode_event_cursor
+from weekset import MAX_WEEK, WeekSet
+from ics_export import stream_calendar, expand_weekly_recurrence
+from recurrence import week_window
+from ics_cache import cached_calendar_response
+from services.event_ingest import ingest_events
+from services.event_rows import event_list_response
+from services.adjustments import apply_holiday, apply_swap, replay_adjustments, undo_adjustment
 import crud
+import crud_async
+from metrics import QueryBudget
 
-router = APIRouter(prefix="/api/schedules", tags=["schedules"])
+router = APIRouter(prefix="/api/schedules", tags=["schedules"], dependencies=[Depends(QueryBudget(10))])
+
+logger = logging.getLogger(__name__)
 
 
 @router.get("/", response_model=List[ScheduleResponse])
 async def get_user_schedules(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取当前用户的所有课表"""
-    schedules = db.query(Schedule).filter(Schedule.owner_id == current_user.id).all()
+    schedules = await crud_async.get_user_schedules(db, current_user.id)
     return schedules
 
 
 @router.post("/", response_model=ScheduleResponse, status_code=status.HTTP_201_CREATED)
-async def create_schedule(
+def create_schedule(
     schedule_data: ScheduleCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -58,13 +71,10 @@ async def create_schedule(
 async def get_schedule(
     schedule_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定课表"""
-    schedule = db.query(Schedule).filter(
-        Schedule.id == schedule_id,
-        Schedule.owner_id == current_user.id
-    ).first()
+    schedule = await crud_async.get_user_schedule(db, schedule_id, current_user.id)
     
     if not schedule:
         raise HTTPException(
@@ -76,7 +86,7 @@ async def get_schedule(
 
 
 @router.put("/{schedule_id}", response_model=ScheduleResponse)
-async def update_schedule(
+def update_schedule(
     schedule_id: int,
     schedule_data: ScheduleUpdate,
     current_user: User = Depends(get_current_user),
@@ -106,7 +116,7 @@ async def update_schedule(
 
 
 @router.delete("/{schedule_id}")
-async def delete_schedule(
+def delete_schedule(
     schedule_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -133,16 +143,32 @@ async def delete_schedule(
 async def get_schedule_events(
     schedule_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
-    limit: int = 10000
+    limit: int = 10000,
+    week: Optional[int] = Query(None, ge=1, le=MAX_WEEK, description="只返回第 N 周内的事件"),
+    date_from: Optional[date] = Query(None, alias="from", description="窗口开始日期（含）"),
+    date_to: Optional[date] = Query(None, alias="to", description="窗口结束日期（含）"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标")
 ):
-    """获取指定课表的所有事件"""
+    """
+    获取指定课表的事件
+    
+    - week: 只返回第 N 周（按课表开学日期计算的 7 天）内的事件
+    - from / to: 只返回日期窗口内的事件（周视图只需几十行）
+    - cursor: 按 (start_time, id) 的键集分页，满页时响应头 X-Next-Cursor 给出下一页游标
+    """
+    after = None
+    if cursor:
+        after = decode_event_cursor(cursor)
+        if after is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
     # 验证课表所有权
-    schedule = db.query(Schedule).filter(
-        Schedule.id == schedule_id,
-        Schedule.owner_id == current_user.id
-    ).first()
+    schedule = await crud_async.get_user_schedule(db, schedule_id, current_user.id)
     
     if not schedule:
         raise HTTPException(
@@ -150,23 +176,28 @@ async def get_schedule_events(
             detail="Schedule not found"
         )
     
-    events = (
-        db.query(Event)
-        .filter(
-            Event.schedule_id == schedule_id,
-            Event.is_active == True  # 只返回活跃的事件
-        )
-        .order_by(Event.start_time.asc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    if week is not None:
+        # 第 N 周换算成日期窗口（与 from/to 取交集），同样走 start_time 索引
+        week_from, week_to = week_window(schedule.start_date, week)
+        date_from = max(date_from, week_from) if date_from else week_from
+        date_to = min(date_to, week_to) if date_to else week_to
+
+    # 只返回活跃的事件
+    events = await crud_async.get_schedule_events(
+        db, schedule_id, skip=skip, limit=limit,
+        date_from=date_from, date_to=date_to, after=after
     )
     
-    return events
+    # 满页时返回下一页游标
+    headers = None
+    if events and len(events) == limit:
+        headers = {"X-Next-Cursor": encode_event_cursor(events[-1].start_time, events[-1].id)}
+    
+    return event_list_response(events, with_owner=False, headers=headers)
 
 
 @router.post("/{schedule_id}/events", response_model=List[EventResponse], status_code=status.HTTP_201_CREATED)
-async def create_schedule_event(
+def create_schedule_event(
     schedule_id: int,
     event_data: EventCreate,
     current_user: User = Depends(get_current_user),
@@ -192,7 +223,7 @@ async def create_schedule_event(
 
 
 @router.put("/{schedule_id}/events/{event_id}", response_model=EventResponse)
-async def update_schedule_event(
+def update_schedule_event(
     schedule_id: int,
     event_id: int,
     event_data: EventUpdate,
@@ -236,7 +267,7 @@ async def update_schedule_event(
 
 
 @router.delete("/{schedule_id}/events/{event_id}")
-async def delete_schedule_event(
+def delete_schedule_event(
     schedule_id: int,
     event_id: int,
     current_user: User = Depends(get_current_user),
@@ -273,13 +304,62 @@ async def delete_schedule_event(
     return {"message": "Event deleted successfully"}
 
 
+@router.get("/{schedule_id}/templates", response_model=List[CourseTemplateResponse])
+async def get_schedule_templates(
+    schedule_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取指定课表的所有课程模板"""
+    schedule = await crud_async.get_user_schedule(db, schedule_id, current_user.id)
+    
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Schedule not found"
+        )
+    
+    return await crud_async.get_schedule_templates(db, schedule_id)
+
+
+@router.get("/{schedule_id}/occurrences", response_model=List[CourseOccurrenceResponse])
+async def get_schedule_occurrences(
+    schedule_id: int,
+    start_date: date,
+    end_date: date,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """按日期窗口展开课程模板，只生成窗口内的具体上课事件（已应用调休）"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date cannot be earlier than start date"
+        )
+    
+    schedule = await crud_async.get_user_schedule(db, schedule_id, current_user.id)
+    
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Schedule not found"
+        )
+    
+    return await crud_async.get_schedule_occurrences(db, schedule, start_date, end_date)
+
+
 @router.get("/{schedule_id}/export.ics")
-async def export_schedule_to_ics(
+def export_schedule_to_ics(
     schedule_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """导出指定课表为ICS文件"""
+    """
+    导出指定课表为ICS文件（流式输出，每周重复的课程合并为一条 RRULE）
+    
+    响应带有基于课表版本号的 ETag，内容未变化时返回 304。
+    """
     # 验证课表所有权
     schedule = db.query(Schedule).filter(
         Schedule.id == schedule_id,
@@ -292,214 +372,97 @@ async def export_schedule_to_ics(
             detail="Schedule not found"
         )
     
-    # 获取所有事件（确保有序，防止结果顺序不稳定）
-    events = (
-        db.query(Event)
-        .filter(Event.schedule_id == schedule_id)
-        .order_by(Event.day_of_week, Event.period, Event.start_time)
-        .all()
+    filename = f"{schedule.name.replace(' ', '_')}.ics"
+    return cached_calendar_response(
+        f"schedule-{schedule.id}",
+        [schedule.version],
+        if_none_match,
+        filename,
+        lambda: stream_calendar([schedule.id], schedule.name)
     )
+
+
+def _parse_ics_events(ics_content: str, schedule_start: Optional[date]) -> Tuple[List[dict], List[str]]:
+    """
+    解析 ICS 文本并展开按周重复的事件，返回 (事件数据, 失败信息)（在线程池中执行）
+    """
+    calendar = ics.Calendar(ics_content)
     
-    print(f"\n=== ICS导出调试信息 ===")
-    print(f"当前用户ID: {current_user.id} ({current_user.full_name})")
-    print(f"请求导出的课表ID: {schedule_id}")
-    print(f"课表名称: {schedule.name}")
-    print(f"课表拥有者ID: {schedule.owner_id}")
-    print(f"课表开始日期: {schedule.start_date}")
-    print(f"课表状态: {schedule.status}")
-    print(f"查询条件: Event.schedule_id == {schedule_id}")
-    print(f"找到事件数量: {len(events)}")
-    
-    # 如果没有找到事件，进一步调试
-    if len(events) == 0:
-        print("\n⚠️  警告：没有找到任何事件！")
-        # 检查用户的所有课表
-        user_schedules = db.query(Schedule).filter(Schedule.owner_id == current_user.id).all()
-        print(f"用户拥有的课表数量: {len(user_schedules)}")
-        for s in user_schedules:
-            event_count = db.query(Event).filter(Event.schedule_id == s.id).count()
-            print(f"  课表ID {s.id} '{s.name}': {event_count} 个事件")
-    else:
-        # 显示前几个事件的基本信息
-        print(f"\n前3个事件概览:")
-        for i, event in enumerate(events[:3]):
-            print(f"  {i+1}. {event.title} - {event.start_time} (事件ID: {event.id})")
-    
-    # 创建日历对象
-    calendar = ics.Calendar()
-    calendar.creator = f"Schedule Management System - {schedule.name}"
+    # ics 库不展开 RRULE，按周重复的事件先展开为单次事件
+    try:
+        ics_events = [
+            occurrence
+            for ics_event in calendar.events
+            for occurrence in expand_weekly_recurrence(ics_event)
+        ]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ICS文件解析失败: {str(e)}"
+        )
     
-    # 遍历每个事件
-    successful_events = 0
-    failed_events = 0
+    events_data = []
+    errors = []
     
-    for i, event in enumerate(events):
+    for ics_event in ics_events:
         try:
-            print(f"\n>>> 处理第 {i+1} 个事件: {event.title}")
-            print(f"    事件ID: {event.id}")
-            print(f"    周数输入: {event.weeks_input}")
-            print(f"    周数显示: {event.weeks_display}")
-            print(f"    星期几: {event.day_of_week}")
-            print(f"    节次: {event.period}")
-            print(f"    地点: {event.location}")
-            print(f"    教师: {event.instructor}")
-            print(f"    原始开始时间: {event.start_time}")
-            print(f"    原始结束时间: {event.end_time}")
-            
-            # 解析周数
-            weeks = parse_weeks(event.weeks_input or event.weeks_display or "")
-            if not weeks:
-                # 如果没有周数信息，创建单次事件
-                weeks = [1]
-                print(f"    ⚠️  周数信息为空，使用默认周数: [1]")
-            
-            print(f"    解析后周数: {weeks}")
+            # 提取事件信息
+            title = ics_event.name or "未命名事件"
+            # 课表时间按本地时间存储，去掉解析时附加的时区
+            start_time = ics_event.begin.datetime.replace(tzinfo=None) if ics_event.begin else None
+            end_time = ics_event.end.datetime.replace(tzinfo=None) if ics_event.end else None
+            description = ics_event.description or ""
+            location = ics_event.location or ""
             
-            # 解析节次获取时间
-            period_numbers = parse_period_to_class_numbers(event.period or "")
-            print(f"    解析后节次: {period_numbers}")
+            if not start_time or not end_time:
+                errors.append(f"事件 '{title}' 缺少时间信息")
+                continue
             
-            # 获取开始和结束时间
-            if period_numbers and schedule.class_times:
-                first_period = str(period_numbers[0])
-                last_period = str(period_numbers[-1])
+            # 计算周数和星期几
+            if schedule_start:
+                # 计算与课表开始日期的差异
+                start_date = start_time.date()
                 
-                print(f"    查找时间 - 第一节: {first_period}, 最后一节: {last_period}")
-                print(f"    课表时间配置: {schedule.class_times}")
+                days_diff = (start_date - schedule_start).days
                 
-                if first_period in schedule.class_times and last_period in schedule.class_times:
-                    start_time_str = schedule.class_times[first_period].get("start", "08:00")
-                    end_time_str = schedule.class_times[last_period].get("end", "09:00")
-                    print(f"    使用课表时间: {start_time_str} - {end_time_str}")
-                else:
-                    # 使用事件原始时间
-                    start_time_str = event.start_time.strftime("%H:%M")
-                    end_time_str = event.end_time.strftime("%H:%M")
-                    print(f"    使用事件原始时间: {start_time_str} - {end_time_str}")
-            else:
-                # 使用事件原始时间
-                start_time_str = event.start_time.strftime("%H:%M")
-                end_time_str = event.end_time.strftime("%H:%M")
-                print(f"    使用事件原始时间(无节次信息): {start_time_str} - {end_time_str}")
-            
-            # 为每个周数创建ICS事件
-            for week_num in weeks:
-                # 防止 week_num 无效
-                if week_num < 1 or week_num > 60:
-                    print(f"    ⚠️  无效的周数 {week_num}，跳过")
-                    continue
+                # 计算周数（从第1周开始）
+                week_number = (days_diff // 7) + 1
+                
+                # 计算星期几（1=周一, 7=周日）
+                # weekday(): 0=周一, 6=周日，所以 +1 后：1=周一, 7=周日
+                day_of_week = start_date.weekday() + 1
                 
-                try:
-                    # 计算具体日期
-                    if event.day_of_week is not None:
-                        day_of_week = event.day_of_week
-                        if day_of_week == 0:
-                            # 如果存储为0，视为周日（7）
-                            day_of_week = 7
-                        if day_of_week < 1 or day_of_week > 7:
-                            raise ValueError(f"day_of_week 无效: {event.day_of_week}")
-                        # 基于星期几计算日期（周一=1 -> offset=0, 周日=7 -> offset=6）
-                        day_offset = day_of_week - 1
-                        days_from_start = (week_num - 1) * 7 + day_offset
-                        event_date = schedule.start_date + timedelta(days=days_from_start)
-                        print(f"    第 {week_num} 周 - 星期 {day_of_week} - 计算日期: {event_date}")
-                    else:
-                        # 使用原始事件日期
-                        event_date = event.start_time.date()
-                        print(f"    第 {week_num} 周 - 使用原始日期: {event_date} (day_of_week=None)")
-                        day_of_week = event.start_time.weekday() + 1  # Python: Monday=0
-                    
-                    # 生成 ICS 的星期几（周日=SU）
-                    weekday_map = {1: 'MO', 2: 'TU', 3: 'WE', 4: 'TH', 5: 'FR', 6: 'SA', 7: 'SU'}
-                    ics_weekday = weekday_map.get(day_of_week, 'MO')
-                    
-                    # 创建开始和结束时间
-                    start_hour, start_minute = map(int, start_time_str.split(':'))
-                    end_hour, end_minute = map(int, end_time_str.split(':'))
-                    
-                    start_datetime = datetime.combine(event_date, datetime.min.time().replace(
-                        hour=start_hour, minute=start_minute
-                    ))
-                    end_datetime = datetime.combine(event_date, datetime.min.time().replace(
-                        hour=end_hour, minute=end_minute
-                    ))
-                    
-                    print(f"    创建ICS事件: {start_datetime} 到 {end_datetime}")
-                    
-                    # 创建ICS事件
-                    ics_event = ics.Event()
-                    ics_event.name = event.title
-                    ics_event.begin = start_datetime
-                    ics_event.end = end_datetime
-                    
-                    # 设置位置和描述
-                    location_parts = []
-                    description_parts = []
-                    
-                    # 处理地点信息 - 即使是"未排地点"也要显示
-                    if event.location and event.location.strip():
-                        location_parts.append(event.location.strip())
-                        description_parts.append(f"地点: {event.location.strip()}")
-                    else:
-                        location_parts.append("未排地点")
-                        description_parts.append("地点: 未排地点")
-                    
-                    # 处理教师信息
-                    if event.instructor and event.instructor.strip():
-                        description_parts.append(f"教师: {event.instructor.strip()}")
-                    
-                    # 处理周数信息
-                    if event.weeks_display or event.weeks_input:
-                        weeks_info = (event.weeks_display or event.weeks_input).strip()
-                        if weeks_info:
-                            description_parts.append(f"周数: {weeks_info}")
-                    
-                    # 处理节次信息
-                    if event.period and event.period.strip():
-                        description_parts.append(f"节次: {event.period.strip()}")
-                    
-                    # 设置ICS事件的位置和描述
-                    ics_event.location = "|".join(location_parts)
-                    ics_event.description = " | ".join(description_parts)
-                    
-                    # 添加提醒（提前10分钟）
-                    ics_event.alarms = [ics.DisplayAlarm(trigger=timedelta(minutes=-10))]
-                    
-                    # 生成唯一ID - 使用更安全的格式
-                    import hashlib
-                    uid_source = f"{schedule_id}-{event.id}-{week_num}-{start_datetime.isoformat()}"
-                    uid_hash = hashlib.md5(uid_source.encode()).hexdigest()[:8]
-                    ics_event.uid = f"event-{schedule_id}-{event.id}-w{week_num}-{uid_hash}@chronosync"
-                    
-                    calendar.events.add(ics_event)
-                    successful_events += 1
-                    
-                except Exception as week_error:
-                    print(f"    ❌ 第 {week_num} 周处理失败: {str(week_error)}")
-                    failed_events += 1
+                # 如果事件时间早于课表开始时间，跳过
+                if week_number < 1:
+                    errors.append(f"事件 '{title}' 时间早于课表开始时间")
                     continue
+                
+                # 生成周数输入格式
+                weeks_input = str(week_number)
+                weeks_display = f"第{week_number}周"
+            else:
+                # 如果课表没有开始日期，使用事件的星期几
+                day_of_week = start_time.weekday() + 1  # 1=周一, 7=周日
+                weeks_input = "1"
+                weeks_display = "第1周"
             
-        except Exception as event_error:
-            print(f"    ❌ 事件 {event.id} '{event.title}' 处理失败: {str(event_error)}")
-            failed_events += 1
+            events_data.append({
+                "title": title,
+                "description": description,
+                "location": location,
+                "start_time": start_time,
+                "end_time": end_time,
+                "day_of_week": day_of_week,
+                "weeks_input": weeks_input,
+                "weeks_display": weeks_display
+            })
+            
+        except Exception as e:
+            error_msg = f"导入事件 '{ics_event.name if hasattr(ics_event, 'name') else 'unknown'}' 失败: {str(e)}"
+            errors.append(error_msg)
             continue
     
-    print(f"\n=== ICS导出完成 ===")
-    print(f"成功处理: {successful_events} 个事件")
-    print(f"处理失败: {failed_events} 个事件")
-    print(f"总共创建了 {len(calendar.events)} 个ICS事件")
-    
-    # 生成ICS内容
-    ics_content = str(calendar)
-    
-    # 设置响应头
-    filename = f"{schedule.name.replace(' ', '_')}.ics"
-    headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"',
-        'Content-Type': 'text/calendar; charset=utf-8'
-    }
-    
-    return Response(content=ics_content, headers=headers)
+    return events_data, errors
 
 
 @router.post("/import-ics")
@@ -510,11 +473,14 @@ async def import_schedule_from_ics(
     db: Session = Depends(get_db)
 ):
     """从ICS文件导入事件到指定课表"""
+    # 同步会话的数据库操作都放到线程池中执行，不阻塞事件循环
     # 验证课表所有权
-    schedule = db.query(Schedule).filter(
-        Schedule.id == schedule_id,
-        Schedule.owner_id == current_user.id
-    ).first()
+    schedule = await run_in_threadpool(
+        lambda: db.query(Schedule).filter(
+            Schedule.id == schedule_id,
+            Schedule.owner_id == current_user.id
+        ).first()
+    )
     
     if not schedule:
         raise HTTPException(
@@ -534,90 +500,16 @@ async def import_schedule_from_ics(
         content = await file.read()
         ics_content = content.decode('utf-8')
         
-        # 解析ICS文件
-        calendar = ics.Calendar(ics_content)
+        # 解析、展开重复事件和批量写入都是同步的 CPU/数据库操作，放到线程池中执行
+        def parse_and_store() -> Tuple[int, List[str]]:
+            events_data, errors = _parse_ics_events(ics_content, schedule.start_date)
+            inserted = ingest_events(db, schedule_id, events_data)["inserted"]
+            db.commit()
+            return inserted, errors
         
-        imported_count = 0
-        errors = []
+        imported_count, errors = await run_in_threadpool(parse_and_store)
         
-        print(f"\n=== ICS导入调试信息 ===")
-        print(f"用户ID: {current_user.id} ({current_user.full_name})")
-        print(f"目标课表ID: {schedule_id} ({schedule.name})")
-        print(f"课表开始日期: {schedule.start_date}")
-        print(f"ICS文件包含事件数: {len(calendar.events)}")
-        
-        for ics_event in calendar.events:
-            try:
-                # 提取事件信息
-                title = ics_event.name or "未命名事件"
-                start_time = ics_event.begin.datetime if ics_event.begin else None
-                end_time = ics_event.end.datetime if ics_event.end else None
-                description = ics_event.description or ""
-                location = ics_event.location or ""
-                
-                if not start_time or not end_time:
-                    errors.append(f"事件 '{title}' 缺少时间信息")
-                    continue
-                
-                # 计算周数和星期几
-                if schedule.start_date:
-                    # 计算与课表开始日期的差异
-                    start_date = start_time.date()
-                    schedule_start = schedule.start_date
-                    
-                    days_diff = (start_date - schedule_start).days
-                    
-                    # 计算周数（从第1周开始）
-                    week_number = (days_diff // 7) + 1
-                    
-                    # 计算星期几（1=周一, 7=周日）
-                    # weekday(): 0=周一, 6=周日，所以 +1 后：1=周一, 7=周日
-                    day_of_week = start_date.weekday() + 1
-                    
-                    # 如果事件时间早于课表开始时间，跳过
-                    if week_number < 1:
-                        errors.append(f"事件 '{title}' 时间早于课表开始时间")
-                        continue
-                    
-                    # 生成周数输入格式
-                    weeks_input = str(week_number)
-                    weeks_display = f"第{week_number}周"
-                else:
-                    # 如果课表没有开始日期，使用事件的星期几
-                    day_of_week = start_time.weekday() + 1  # 1=周一, 7=周日
-                    weeks_input = "1"
-                    weeks_display = "第1周"
-                
-                # 创建事件
-                new_event = Event(
-                    schedule_id=schedule_id,
-                    title=title,
-                    description=description,
-                    location=location,
-                    start_time=start_time,
-                    end_time=end_time,
-                    day_of_week=day_of_week,
-                    weeks_input=weeks_input,
-                    weeks_display=weeks_display
-                )
-                
-                db.add(new_event)
-                imported_count += 1
-                
-                print(f"  ✓ 导入事件: {title} (第{week_number}周 周{day_of_week})")
-                
-            except Exception as e:
-                error_msg = f"导入事件 '{ics_event.name if hasattr(ics_event, 'name') else 'unknown'}' 失败: {str(e)}"
-                errors.append(error_msg)
-                print(f"  ✗ {error_msg}")
-                continue
-        
-        # 提交所有更改
-        db.commit()
-        
-        print(f"\n=== ICS导入完成 ===")
-        print(f"成功导入: {imported_count} 个事件")
-        print(f"导入失败: {len(errors)} 个事件")
+        logger.info("ICS导入完成: 课表 %s, 成功 %d 个事件, 失败 %d 个", schedule_id, imported_count, len(errors))
         
         response_message = f"成功导入 {imported_count} 个事件"
         if errors:
@@ -630,23 +522,25 @@ async def import_schedule_from_ics(
             "errors": errors if errors else None
         }
         
+    except HTTPException:
+        raise
     except ics.parse.ParseError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"ICS文件解析失败: {str(e)}"
         )
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"导入失败: {str(e)}"
         )
 
 
-@router.post("/{schedule_id}/adjustments", response_model=AdjustmentOperationResponse, status_code=status.HTTP_201_CREATED)
-async def create_schedule_adjustment(
+@router.post("/{schedule_id}/adjustments", response_model=AdjustmentOperationResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(QueryBudget(20))])
+def create_schedule_adjustment(
     schedule_id: int,
-    adjustment_data: Union[HolidayAdjustmentRequest, SwapAdjustmentRequest],
+    adjustment_data: Union[HolidayAdjustmentRequest, SwapAdjustmentRequest] = Body(..., discriminator="adjustment_type"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -666,13 +560,10 @@ async def create_schedule_adjustment(
     try:
         if adjustment_data.adjustment_type == "HOLIDAY":
             return _handle_holiday_adjustment(db, schedule, adjustment_data)
-        elif adjustment_data.adjustment_type == "SWAP":
-            return _handle_swap_adjustment(db, schedule, adjustment_data)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid adjustment type. Must be 'HOLIDAY' or 'SWAP'"
-            )
+        return _handle_swap_adjustment(db, schedule, adjustment_data)
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -694,38 +585,9 @@ def _handle_holiday_adjustment(db: Session, schedule: Schedule, data: HolidayAdj
             detail="End date cannot be earlier than start date"
         )
     
-    total_affected = 0
-    adjustment_ids = []
-    
-    # 为日期范围内的每一天创建调整记录
-    current_date = start_date
-    while current_date <= end_date:
-        # 1. 记录调整操作
-        adjustment = ScheduleAdjustment(
-            schedule_id=schedule.id,
-            adjustment_type="HOLIDAY",
-            original_date=current_date,
-            target_date=None
-        )
-        db.add(adjustment)
-        db.flush()  # 获取 adjustment.id
-        adjustment_ids.append(adjustment.id)
-        
-        # 2. 找出指定日期的所有活跃非覆盖事件
-        target_events = db.query(Event).filter(
-            Event.schedule_id == schedule.id,
-            Event.is_active == True,
-            Event.is_override == False,
-            func.date(Event.start_time) == current_date
-        ).all()
-        
-        # 3. 逻辑删除这些事件
-        for event in target_events:
-            event.is_active = False
-            total_affected += 1
-        
-        # 移动到下一天
-        current_date = current_date + timedelta(days=1)
+    # 整个区间只记录一条调整操作，用一条 UPDATE 逻辑删除区间内的事件
+    result = apply_holiday(db, [schedule.id], start_date, end_date)
+    total_affected = result["affected_events"]
     
     db.commit()
     
@@ -745,67 +607,16 @@ def _handle_holiday_adjustment(db: Session, schedule: Schedule, data: HolidayAdj
     return AdjustmentOperationResponse(
         success=True,
         message=message,
-        adjustment_id=adjustment_ids[0] if adjustment_ids else None,
+        adjustment_id=result["adjustment_ids"][schedule.id],
         affected_events=total_affected
     )
 
 
 def _handle_swap_adjustment(db: Session, schedule: Schedule, data: SwapAdjustmentRequest) -> AdjustmentOperationResponse:
     """处理课程对调"""
-    # 1. 记录调整操作
-    adjustment = ScheduleAdjustment(
-        schedule_id=schedule.id,
-        adjustment_type="SWAP",
-        original_date=data.source_date,
-        target_date=data.target_date
-    )
-    db.add(adjustment)
-    db.flush()  # 获取 adjustment.id
-    
-    # 2. 找出原始日期的所有活跃事件（包括覆盖事件）
-    from_events = db.query(Event).filter(
-        Event.schedule_id == schedule.id,
-        Event.is_active == True,
-        func.date(Event.start_time) == data.source_date
-    ).all()
-    
-    # 3. 逻辑删除原始事件
-    affected_count = 0
-    for event in from_events:
-        event.is_active = False
-        affected_count += 1
-    
-    # 4. 为每个原始事件创建覆盖事件
-    created_count = 0
-    for original_event in from_events:
-        # 计算新的时间
-        original_start = original_event.start_time
-        original_end = original_event.end_time
-        
-        # 保持时间部分，只改变日期部分
-        new_start = datetime.combine(data.target_date, original_start.time())
-        new_end = datetime.combine(data.target_date, original_end.time())
-        
-        # 创建覆盖事件
-        override_event = Event(
-            schedule_id=schedule.id,
-            title=original_event.title,
-            description=original_event.description,
-            location=original_event.location,
-            start_time=new_start,
-            end_time=new_end,
-            instructor=original_event.instructor,
-            weeks_display=original_event.weeks_display,
-            day_of_week=data.target_date.weekday() + 1,  # Python weekday: Monday=0, 我们的系统: Monday=1
-            period=original_event.period,
-            weeks_input=original_event.weeks_input,
-            color=original_event.color,
-            is_override=True,
-            is_active=True,
-            adjustment_id=adjustment.id
-        )
-        db.add(override_event)
-        created_count += 1
+    # 原始日期的事件逻辑删除，并在目标日期批量创建覆盖事件
+    result = apply_swap(db, [schedule.id], data.source_date, data.target_date)
+    affected_count = result["affected_events"]
     
     db.commit()
     
@@ -818,7 +629,7 @@ def _handle_swap_adjustment(db: Session, schedule: Schedule, data: SwapAdjustmen
     return AdjustmentOperationResponse(
         success=True,
         message=message,
-        adjustment_id=adjustment.id,
+        adjustment_id=result["adjustment_ids"][schedule.id],
         affected_events=affected_count
     )
 
@@ -827,10 +638,73 @@ def _handle_swap_adjustment(db: Session, schedule: Schedule, data: SwapAdjustmen
 async def get_schedule_adjustments(
     schedule_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取课表的所有调休记录"""
     # 验证课表所有权
+    schedule = await crud_async.get_user_schedule(db, schedule_id, current_user.id)
+    
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Schedule not found"
+        )
+    
+    adjustments = await crud_async.get_schedule_adjustments(db, schedule_id)
+    
+    return adjustments
+
+
+@router.delete("/{schedule_id}/adjustments/{adjustment_id}", response_model=AdjustmentOperationResponse, dependencies=[Depends(QueryBudget(50))])
+def undo_schedule_adjustment(
+    schedule_id: int,
+    adjustment_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """撤销一条调休调整：恢复被隐藏的课程并删除覆盖事件"""
+    adjustment = db.query(ScheduleAdjustment).join(Schedule).filter(
+        ScheduleAdjustment.id == adjustment_id,
+        ScheduleAdjustment.schedule_id == schedule_id,
+        Schedule.owner_id == current_user.id
+    ).first()
+    
+    if not adjustment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Adjustment not found"
+        )
+    
+    try:
+        result = undo_adjustment(db, adjustment)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to undo adjustment: {str(e)}"
+        )
+    
+    if result["replayed"]:
+        message = "已撤销调整，并根据其余调整记录重新计算了课表。"
+    else:
+        message = f"已撤销调整，恢复 {result['restored_events']} 个课程，删除 {result['removed_events']} 个调课事件。"
+    
+    return AdjustmentOperationResponse(
+        success=True,
+        message=message,
+        adjustment_id=adjustment_id,
+        affected_events=result["restored_events"] + result["removed_events"]
+    )
+
+
+@router.post("/{schedule_id}/adjustments/replay", response_model=AdjustmentOperationResponse, dependencies=[Depends(QueryBudget(50))])
+def replay_schedule_adjustments(
+    schedule_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """从原始课程重新计算所有调休调整（调整记录较多或状态不一致时使用）"""
     schedule = db.query(Schedule).filter(
         Schedule.id == schedule_id,
         Schedule.owner_id == current_user.id
@@ -842,8 +716,18 @@ async def get_schedule_adjustments(
             detail="Schedule not found"
         )
     
-    adjustments = db.query(ScheduleAdjustment).filter(
-        ScheduleAdjustment.schedule_id == schedule_id
-    ).order_by(ScheduleAdjustment.created_at.desc()).all()
+    try:
+        result = replay_adjustments(db, schedule.id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to replay adjustments: {str(e)}"
+        )
     
-    return adjustments
+    return AdjustmentOperationResponse(
+        success=True,
+        message=f"已根据 {result['adjustments']} 条调整记录重新计算课表，共调整 {result['affected_events']} 个课程。",
+        affected_events=result["affected_events"]
+    )
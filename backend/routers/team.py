@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, timedelta
+from database import get_db, get_async_db
 from auth import get_current_user
 from models import User, Team
 import crud
+import crud_async
 from schemas import (
     TeamCreate, TeamUpdate, TeamResponse, TeamMemberAdd, 
-    TeamJoinRequest, TeamTransferRequest, UserPublic, EventResponse
+    TeamJoinRequest, TeamTransferRequest, UserPublic, EventResponse,
+    TeamTimetableResponse, TeamFreeSlotsResponse
 )
+from services.free_slots import build_period_grid, find_common_free_slots
+from services.occupancy import get_team_busy_masks
+from services.event_rows import event_list_response
+from metrics import QueryBudget
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(QueryBudget(15))])
+
+# 团队课表视图单次查询的最大天数
+TEAM_TIMETABLE_MAX_DAYS = 62
+# 空闲时间查询的最大天数（约一个学期）
+TEAM_FREE_SLOTS_MAX_DAYS = 184
 
 # Admin only endpoints
 @router.get("/admin/teams", response_model=List[TeamResponse])
 async def get_all_teams_admin(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all teams. Only accessible by system admin."""
@@ -25,7 +38,7 @@ async def get_all_teams_admin(
             detail="Not authorized to access this endpoint"
         )
     
-    teams = crud.get_all_teams(db)
+    teams = await crud_async.get_all_teams(db)
     return teams
 
 # Helper function to check permissions
@@ -41,9 +54,15 @@ def check_team_member_permission(db: Session, team_id: int, current_user: User):
         return True
     return crud.is_team_member(db, team_id, current_user.id)
 
+async def check_team_member_permission_async(db: AsyncSession, team_id: int, current_user: User):
+    """Async variant of check_team_member_permission for AsyncSession handlers"""
+    if current_user.role == "admin":
+        return True
+    return await crud_async.is_team_member(db, team_id, current_user.id)
+
 # General team operations
 @router.post("/teams", response_model=TeamResponse, status_code=status.HTTP_201_CREATED)
-async def create_team(
+def create_team(
     team: TeamCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -55,17 +74,17 @@ async def create_team(
 @router.get("/teams/{team_id}", response_model=TeamResponse)
 async def get_team(
     team_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get team details. Only accessible by team members or system admin."""
-    if not check_team_member_permission(db, team_id, current_user):
+    if not await check_team_member_permission_async(db, team_id, current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this team"
         )
     
-    team = crud.get_team(db, team_id)
+    team = await crud_async.get_team(db, team_id)
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,7 +95,7 @@ async def get_team(
 
 # Team management operations (require admin permission)
 @router.put("/teams/{team_id}", response_model=TeamResponse)
-async def update_team(
+def update_team(
     team_id: int,
     team_update: TeamUpdate,
     db: Session = Depends(get_db),
@@ -99,7 +118,7 @@ async def update_team(
     return team
 
 @router.delete("/teams/{team_id}")
-async def delete_team(
+def delete_team(
     team_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -121,7 +140,7 @@ async def delete_team(
     return {"message": "Team deleted successfully"}
 
 @router.post("/teams/{team_id}/members", status_code=status.HTTP_201_CREATED)
-async def add_team_member(
+def add_team_member(
     team_id: int,
     member_add: TeamMemberAdd,
     db: Session = Depends(get_db),
@@ -153,7 +172,7 @@ async def add_team_member(
     return {"message": "User added to team successfully"}
 
 @router.delete("/teams/{team_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_team_member(
+def remove_team_member(
     team_id: int,
     user_id: int,
     db: Session = Depends(get_db),
@@ -175,7 +194,7 @@ async def remove_team_member(
 
 # Team transfer endpoint
 @router.post("/teams/{team_id}/transfer")
-async def transfer_team(
+def transfer_team(
     team_id: int,
     transfer_request: TeamTransferRequest,
     db: Session = Depends(get_db),
@@ -216,7 +235,7 @@ async def transfer_team(
 # Debug endpoint removed - use only when needed for troubleshooting
 
 @router.delete("/teams/{team_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_team(
+def delete_team(
     team_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -238,15 +257,15 @@ async def delete_team(
 # User team operations
 @router.get("/me/teams", response_model=List[TeamResponse])
 async def get_my_teams(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all teams the current user belongs to."""
-    teams = crud.get_user_teams(db, current_user.id)
+    teams = await crud_async.get_user_teams(db, current_user.id)
     return teams
 
 @router.post("/me/teams/join", response_model=TeamResponse, status_code=status.HTTP_201_CREATED)
-async def join_team(
+def join_team(
     join_request: TeamJoinRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -262,7 +281,7 @@ async def join_team(
     return team
 
 @router.post("/me/teams/{team_id}/leave", status_code=status.HTTP_204_NO_CONTENT)
-async def leave_team(
+def leave_team(
     team_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -285,15 +304,115 @@ async def leave_team(
 @router.get("/teams/{team_id}/schedules", response_model=List[EventResponse])
 async def get_team_schedules(
     team_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get aggregated schedules from all team members' active schedules."""
-    if not check_team_member_permission(db, team_id, current_user):
+    if not await check_team_member_permission_async(db, team_id, current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this team's schedules"
         )
     
-    events = crud.get_team_schedules_events(db, team_id)
-    return events
\ No newline at end of file
+    events = await crud_async.get_team_schedules_events(db, team_id)
+    return event_list_response(events)
+
+@router.get("/teams/{team_id}/timetable", response_model=TeamTimetableResponse)
+async def get_team_timetable(
+    team_id: int,
+    date_from: Optional[date] = Query(None, alias="from", description="Window start date (inclusive), defaults to this Monday"),
+    date_to: Optional[date] = Query(None, alias="to", description="Window end date (inclusive), defaults to from + 6 days"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the team members' events within a date window.
+
+    Members are listed once in ``owners`` and each event refers to its
+    owner by ``owner_id``, which keeps week views of large teams small.
+    """
+    if not await check_team_member_permission_async(db, team_id, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this team's schedules"
+        )
+
+    if date_from is None:
+        today = date.today()
+        date_from = today - timedelta(days=today.weekday())
+    if date_to is None:
+        date_to = date_from + timedelta(days=6)
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= TEAM_TIMETABLE_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date window must not exceed {TEAM_TIMETABLE_MAX_DAYS} days"
+        )
+
+    owners, events = await crud_async.get_team_timetable(db, team_id, date_from, date_to)
+    return {
+        "team_id": team_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "owners": owners,
+        "events": events,
+    }
+
+@router.get("/teams/{team_id}/free-slots", response_model=TeamFreeSlotsResponse, dependencies=[Depends(QueryBudget(20))])
+async def get_team_free_slots(
+    team_id: int,
+    date_from: Optional[date] = Query(None, alias="from", description="Range start date (inclusive), defaults to today"),
+    date_to: Optional[date] = Query(None, alias="to", description="Range end date (inclusive), defaults to from + 6 days"),
+    weekdays: Optional[str] = Query(None, description="Comma-separated weekdays to consider, Monday=1, e.g. '1,2,3,4,5'"),
+    min_periods: int = Query(2, ge=1, description="Minimum number of consecutive periods"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Find periods during which every team member is free, longest first.
+
+    Periods follow the class times of the team creator's latest schedule
+    (or the default class times).
+    """
+    if not await check_team_member_permission_async(db, team_id, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this team's schedules"
+        )
+
+    if date_from is None:
+        date_from = date.today()
+    if date_to is None:
+        date_to = date_from + timedelta(days=6)
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= TEAM_FREE_SLOTS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must not exceed {TEAM_FREE_SLOTS_MAX_DAYS} days"
+        )
+
+    weekday_list = None
+    if weekdays:
+        try:
+            weekday_list = [int(day) for day in weekdays.split(",") if day.strip()]
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid weekdays")
+        if any(day < 1 or day > 7 for day in weekday_list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Weekdays must be between 1 and 7")
+
+    grid = build_period_grid(await crud_async.get_team_class_times(db, team_id))
+    masks = await get_team_busy_masks(db, team_id, grid, date_from, date_to)
+    slots = find_common_free_slots(
+        masks, grid, date_from, date_to,
+        weekdays=weekday_list, min_periods=min_periods, limit=limit
+    )
+    return {
+        "team_id": team_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "member_count": await crud_async.count_team_members(db, team_id),
+        "slots": slots,
+    }
\ No newline at end of file
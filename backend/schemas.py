@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from datetime import datetime, date, time
+from typing import Optional, List, Dict, Any, Literal, Union, Annotated
 
 # User schemas
 class UserBase(BaseModel):
@@ -114,6 +114,48 @@ class EventResponse(EventBase):
     class Config:
         from_attributes = True
 
+# Course template schemas
+class CourseTemplateBase(BaseModel):
+    title: str
+    description: Optional[str] = None
+    location: Optional[str] = None
+    instructor: Optional[str] = None
+    color: Optional[str] = None
+    day_of_week: int = Field(..., ge=1, le=7, description="Day of week, Monday=1")
+    start_period: Optional[int] = None
+    end_period: Optional[int] = None
+    start_time: Optional[time] = None     # 为空时按课表的节次时间计算
+    end_time: Optional[time] = None
+    weeks_display: Optional[str] = None   # 周数 (例: "1-16周")
+
+class CourseTemplateResponse(CourseTemplateBase):
+    id: int
+    schedule_id: int
+    week_mask: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CourseOccurrenceResponse(BaseModel):
+    """A concrete class meeting expanded from a course template"""
+    template_id: int
+    schedule_id: int
+    title: str
+    description: Optional[str] = None
+    location: Optional[str] = None
+    instructor: Optional[str] = None
+    color: Optional[str] = None
+    week: int
+    weeks_display: Optional[str] = None
+    day_of_week: int
+    period: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    is_override: bool = False
+    adjustment_id: Optional[int] = None
+
 # Auth schemas
 class Token(BaseModel):
     access_token: str
@@ -170,18 +212,25 @@ class ScheduleFilter(BaseModel):
 class ScheduleAdjustmentBase(BaseModel):
     adjustment_type: str = Field(..., description="Type of adjustment: 'HOLIDAY' or 'SWAP'")
     original_date: date = Field(..., description="Original date to be adjusted")
+    end_date: Optional[date] = Field(None, description="Last day of a HOLIDAY range (inclusive)")
     target_date: Optional[date] = Field(None, description="Target date for SWAP operations")
 
 class HolidayAdjustmentRequest(BaseModel):
-    adjustment_type: str = Field("HOLIDAY", description="Must be 'HOLIDAY'")
+    adjustment_type: Literal["HOLIDAY"] = Field("HOLIDAY", description="Must be 'HOLIDAY'")
     holiday_date: date = Field(..., description="Start date to set as holiday")
     end_date: Optional[date] = Field(None, description="End date for holiday range (optional, if not provided only holiday_date will be processed)")
 
 class SwapAdjustmentRequest(BaseModel):
-    adjustment_type: str = Field("SWAP", description="Must be 'SWAP'")
+    adjustment_type: Literal["SWAP"] = Field("SWAP", description="Must be 'SWAP'")
     source_date: date = Field(..., description="Date to move events from")
     target_date: date = Field(..., description="Date to move events to")
 
+# Tagged by adjustment_type, so a body is validated against exactly one model
+AdjustmentRequest = Annotated[
+    Union[HolidayAdjustmentRequest, SwapAdjustmentRequest],
+    Field(discriminator="adjustment_type")
+]
+
 class ScheduleAdjustmentResponse(ScheduleAdjustmentBase):
     id: int
     schedule_id: int
@@ -196,6 +245,32 @@ class AdjustmentOperationResponse(BaseModel):
     adjustment_id: Optional[int] = None
     affected_events: int = 0
 
+class BatchAdjustmentRequest(BaseModel):
+    """Campus-wide adjustment calendar applied to every matching schedule"""
+    adjustments: List[AdjustmentRequest] = Field(..., min_length=1)
+    schedule_ids: Optional[List[int]] = Field(None, description="Restrict to these schedules")
+    statuses: Optional[List[str]] = Field(["进行"], description="Schedule statuses to include; empty or null for all")
+    class_names: Optional[List[str]] = Field(None, description="Restrict to schedules owned by these classes")
+    grades: Optional[List[str]] = Field(None, description="Restrict to schedules owned by these grades")
+    dry_run: bool = Field(False, description="Only count the adjustments that would be created")
+
+class BatchAdjustmentJobResponse(BaseModel):
+    id: str
+    status: str
+    dry_run: bool
+    total_schedules: int
+    adjustments: int
+    total_steps: int
+    processed_steps: int
+    progress: float
+    adjustments_created: int
+    skipped: int
+    affected_events: int
+    errors: List[str]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 # Team schemas
 class TeamBase(BaseModel):
     name: str = Field(..., description="Team name")
@@ -229,6 +304,54 @@ class TeamResponse(TeamBase):
     class Config:
         from_attributes = True
 
+class TeamTimetableOwner(BaseModel):
+    """Team member listed once in a team timetable"""
+    id: int
+    student_id: str
+    full_name: str
+    class_name: str
+    avatar_url: Optional[str] = None
+
+class TeamTimetableEvent(BaseModel):
+    """Compact event in a team timetable; owner details are in the owners table"""
+    id: int
+    owner_id: int
+    schedule_id: int
+    title: str
+    location: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    day_of_week: Optional[int] = None
+    period: Optional[str] = None
+    color: Optional[str] = None
+    is_override: Optional[bool] = False
+
+class TeamTimetableResponse(BaseModel):
+    team_id: int
+    date_from: date
+    date_to: date
+    owners: List[TeamTimetableOwner]
+    events: List[TeamTimetableEvent]
+
+class TeamFreeSlot(BaseModel):
+    """A run of consecutive periods during which every team member is free"""
+    date: date
+    day_of_week: int
+    start_period: int
+    end_period: int
+    period: str
+    periods: int
+    start_time: datetime
+    end_time: datetime
+    duration_minutes: int
+
+class TeamFreeSlotsResponse(BaseModel):
+    team_id: int
+    date_from: date
+    date_to: date
+    member_count: int
+    slots: List[TeamFreeSlot]
+
 class TeamMemberResponse(BaseModel):
     """Response for team members list"""
     id: int
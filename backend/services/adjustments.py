@@ -0,0 +1,539 @@
+"""
+Schedule adjustments (HOLIDAY / SWAP) applied set-wise.
+
+The functions here take a list of schedule ids so that the per-schedule
+endpoint and the admin batch job share one implementation: adjustment
+records are inserted with one executemany, hidden events are switched
+off with one range UPDATE and SWAP override events are bulk inserted.
+Hidden events record the adjustment in suppressed_by_id and overrides in
+adjustment_id, so undoing an adjustment only touches its own rows unless
+another adjustment shares its dates; then the schedule is replayed.
+Nothing is committed; callers own the transaction.
+
+Batch jobs run in a background task, commit every ADJUSTMENT_BATCH_CHUNK
+schedules and report progress through an in-memory job registry.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from crud import event_window_conditions
+from database import SessionLocal
+from models import Event, Schedule, ScheduleAdjustment, User, bump_schedule_versions
+from services.event_ingest import build_event_row, insert_events
+
+# 批量调整时每个事务处理的课表数量
+ADJUSTMENT_BATCH_CHUNK = int(os.getenv("ADJUSTMENT_BATCH_CHUNK", "200"))
+# 保留的批量任务记录数量
+ADJUSTMENT_JOB_HISTORY = 50
+
+logger = logging.getLogger(__name__)
+
+# SWAP 覆盖事件从原事件复制的字段
+_COPIED_EVENT_FIELDS = (
+    "title", "description", "location", "instructor", "weeks_display",
+    "period", "weeks_input", "color",
+)
+
+
+def _insert_adjustments(db: Session, rows: List[Dict[str, Any]]) -> Dict[int, int]:
+    """插入调整记录，返回 {课表ID: 调整ID}"""
+    if not rows:
+        return {}
+    result = db.execute(
+        insert(ScheduleAdjustment).returning(
+            ScheduleAdjustment.schedule_id, ScheduleAdjustment.id, sort_by_parameter_order=True
+        ),
+        rows
+    )
+    return {schedule_id: adjustment_id for schedule_id, adjustment_id in result}
+
+
+def _suppressed_by(adjustment_ids: Dict[int, int]):
+    """按课表取对应调整ID的 SQL 表达式"""
+    if len(adjustment_ids) == 1:
+        return next(iter(adjustment_ids.values()))
+    return case(adjustment_ids, value=Event.schedule_id)
+
+
+def _hide_holiday_events(db: Session, adjustment_ids: Dict[int, int], start_date: date, end_date: date) -> int:
+    """用一条 UPDATE 逻辑删除区间内所有活跃的非覆盖事件，返回隐藏的事件数"""
+    # 按 start_time 范围走 (schedule_id, is_active, start_time) 索引
+    result = db.execute(
+        update(Event)
+        .where(
+            Event.schedule_id.in_(list(adjustment_ids)),
+            Event.is_active == True,
+            Event.is_override == False,
+            *event_window_conditions(start_date, end_date)
+        )
+        .values(is_active=False, suppressed_by_id=_suppressed_by(adjustment_ids), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def _move_swap_events(db: Session, adjustment_ids: Dict[int, int], source_date: date, target_date: date) -> int:
+    """逻辑删除 source_date 的活跃事件并在 target_date 创建覆盖事件，返回移动的事件数"""
+    # 原始日期的所有活跃事件（包括覆盖事件）
+    columns = [Event.id, Event.schedule_id, Event.start_time, Event.end_time] + [
+        getattr(Event, field) for field in _COPIED_EVENT_FIELDS
+    ]
+    source_events = db.execute(
+        select(*columns).where(
+            Event.schedule_id.in_(list(adjustment_ids)),
+            Event.is_active == True,
+            *event_window_conditions(source_date, source_date)
+        )
+    ).mappings().all()
+    if not source_events:
+        return 0
+
+    db.execute(
+        update(Event)
+        .where(Event.id.in_([row["id"] for row in source_events]))
+        .values(is_active=False, suppressed_by_id=_suppressed_by(adjustment_ids), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    # 保持时间部分，只改变日期部分
+    insert_events(db, [
+        build_event_row(row["schedule_id"], {
+            **{field: row[field] for field in _COPIED_EVENT_FIELDS},
+            "start_time": datetime.combine(target_date, row["start_time"].time()),
+            "end_time": datetime.combine(target_date, row["end_time"].time()),
+            "day_of_week": target_date.isoweekday(),
+            "is_override": True,
+            "is_active": True,
+            "adjustment_id": adjustment_ids[row["schedule_id"]],
+        })
+        for row in source_events
+    ])
+    return len(source_events)
+
+
+def apply_holiday(db: Session, schedule_ids: Sequence[int], start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    将 [start_date, end_date] 设置为假期：每个课表一条调整记录，
+    区间内所有活跃的非覆盖事件用一条 UPDATE 逻辑删除。
+
+    Returns:
+        Dict: {"adjustment_ids": {课表ID: 调整ID}, "affected_events": 隐藏的事件数}
+    """
+    schedule_ids = list(schedule_ids)
+    if not schedule_ids:
+        return {"adjustment_ids": {}, "affected_events": 0}
+
+    adjustment_ids = _insert_adjustments(db, [
+        {
+            "schedule_id": schedule_id,
+            "adjustment_type": "HOLIDAY",
+            "original_date": start_date,
+            "end_date": end_date if end_date != start_date else None,
+            "target_date": None,
+            "created_at": datetime.utcnow(),
+        }
+        for schedule_id in schedule_ids
+    ])
+    affected = _hide_holiday_events(db, adjustment_ids, start_date, end_date)
+    # 批量语句不会触发 flush 监听器
+    bump_schedule_versions(db, schedule_ids)
+    return {"adjustment_ids": adjustment_ids, "affected_events": affected}
+
+
+def apply_swap(db: Session, schedule_ids: Sequence[int], source_date: date, target_date: date) -> Dict[str, Any]:
+    """
+    将 source_date 的课程移动到 target_date：原事件逻辑删除，
+    在目标日期创建关联到调整记录的覆盖事件。
+
+    Returns:
+        Dict: {"adjustment_ids": {课表ID: 调整ID}, "affected_events": 移动的事件数}
+    """
+    schedule_ids = list(schedule_ids)
+    if not schedule_ids:
+        return {"adjustment_ids": {}, "affected_events": 0}
+
+    adjustment_ids = _insert_adjustments(db, [
+        {
+            "schedule_id": schedule_id,
+            "adjustment_type": "SWAP",
+            "original_date": source_date,
+            "target_date": target_date,
+            "created_at": datetime.utcnow(),
+        }
+        for schedule_id in schedule_ids
+    ])
+    affected = _move_swap_events(db, adjustment_ids, source_date, target_date)
+    bump_schedule_versions(db, schedule_ids)
+    return {"adjustment_ids": adjustment_ids, "affected_events": affected}
+
+
+def _adjustment_days(adjustment_type: str, original_date: date, end_date: Optional[date],
+                     target_date: Optional[date]) -> set:
+    """调整涉及的日期：放假区间内的每一天，或对调的原日期和目标日期"""
+    if adjustment_type == "HOLIDAY":
+        last = end_date or original_date
+        return {original_date + timedelta(days=offset) for offset in range((last - original_date).days + 1)}
+    return {day for day in (original_date, target_date) if day}
+
+
+def _simulate_adjustments(events: List[Dict[str, Any]], adjustments: Sequence[tuple]) -> tuple:
+    """
+    在内存中按顺序应用调整，规则与 _hide_holiday_events / _move_swap_events 相同：
+    放假隐藏区间内活跃的非覆盖事件，对调隐藏原日期的所有活跃事件并在目标日期生成覆盖事件。
+
+    Returns:
+        tuple: ({被隐藏的已有事件ID: 调整ID}, 新覆盖事件列表, 隐藏或移动的事件数)
+    """
+    by_day: Dict[date, List[Dict[str, Any]]] = {}
+    for event in events:
+        by_day.setdefault(event["start_time"].date(), []).append(event)
+
+    hidden: Dict[int, int] = {}
+    overrides: List[Dict[str, Any]] = []
+    affected = 0
+    for adjustment_id, adjustment_type, original_date, end_date, target_date in adjustments:
+        if adjustment_type == "HOLIDAY":
+            for day in sorted(_adjustment_days(adjustment_type, original_date, end_date, None)):
+                for event in by_day.get(day, ()):
+                    if event["suppressed_by_id"] is None and not event["is_override"]:
+                        event["suppressed_by_id"] = adjustment_id
+                        affected += 1
+        elif adjustment_type == "SWAP" and target_date:
+            moved = [event for event in by_day.get(original_date, ()) if event["suppressed_by_id"] is None]
+            for event in moved:
+                event["suppressed_by_id"] = adjustment_id
+                override = {
+                    **{field: event[field] for field in _COPIED_EVENT_FIELDS},
+                    "start_time": datetime.combine(target_date, event["start_time"].time()),
+                    "end_time": datetime.combine(target_date, event["end_time"].time()),
+                    "day_of_week": target_date.isoweekday(),
+                    "is_override": True,
+                    "adjustment_id": adjustment_id,
+                    "suppressed_by_id": None,
+                }
+                overrides.append(override)
+                by_day.setdefault(target_date, []).append(override)
+            affected += len(moved)
+
+    for event in events:
+        if event["suppressed_by_id"] is not None:
+            hidden[event["id"]] = event["suppressed_by_id"]
+    return hidden, overrides, affected
+
+
+def replay_adjustments(db: Session, schedule_id: int, exclude: Sequence[int] = ()) -> Dict[str, int]:
+    """
+    从基础课程重新计算调整后的状态：恢复所有被隐藏的事件、删除所有覆盖事件，
+    再按创建顺序重新应用调整记录（exclude 中的调整除外）。
+
+    调整在内存中推演，结果用一条 UPDATE 和一次批量 INSERT 写回，
+    语句数不随调整记录数增长。
+
+    Returns:
+        Dict: {"adjustments": 重新应用的调整数, "affected_events": 隐藏或移动的事件数}
+    """
+    db.execute(
+        update(Event)
+        .where(Event.schedule_id == schedule_id, Event.is_active == False, Event.is_override == False)
+        .values(is_active=True, suppressed_by_id=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(Event)
+        .where(Event.schedule_id == schedule_id, Event.is_override == True, Event.adjustment_id.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+
+    adjustments = db.execute(
+        select(
+            ScheduleAdjustment.id, ScheduleAdjustment.adjustment_type, ScheduleAdjustment.original_date,
+            ScheduleAdjustment.end_date, ScheduleAdjustment.target_date
+        )
+        .where(ScheduleAdjustment.schedule_id == schedule_id, ScheduleAdjustment.id.not_in(list(exclude)))
+        .order_by(ScheduleAdjustment.created_at, ScheduleAdjustment.id)
+    ).all()
+    affected = 0
+    if adjustments:
+        # 只需要调整涉及的日期范围内的活跃事件（覆盖事件在推演中生成）
+        days = set()
+        for _, adjustment_type, original_date, end_date, target_date in adjustments:
+            days |= _adjustment_days(adjustment_type, original_date, end_date, target_date)
+        columns = [Event.id, Event.start_time, Event.end_time, Event.is_override] + [
+            getattr(Event, field) for field in _COPIED_EVENT_FIELDS
+        ]
+        events = [
+            {**row, "suppressed_by_id": None}
+            for row in db.execute(
+                select(*columns).where(
+                    Event.schedule_id == schedule_id,
+                    Event.is_active == True,
+                    *event_window_conditions(min(days), max(days))
+                )
+            ).mappings()
+        ]
+
+        hidden, overrides, affected = _simulate_adjustments(events, adjustments)
+        if hidden:
+            db.execute(
+                update(Event)
+                .where(Event.id.in_(list(hidden)))
+                .values(
+                    is_active=False,
+                    suppressed_by_id=case(hidden, value=Event.id),
+                    updated_at=datetime.utcnow()
+                )
+                .execution_options(synchronize_session=False)
+            )
+        # 被后续对调再次移动的覆盖事件以隐藏状态写入
+        insert_events(db, [
+            build_event_row(schedule_id, {**override, "is_active": override["suppressed_by_id"] is None})
+            for override in overrides
+        ])
+
+    bump_schedule_versions(db, [schedule_id])
+    return {"adjustments": len(adjustments), "affected_events": affected}
+
+
+def _overlaps_other_adjustments(db: Session, adjustment: ScheduleAdjustment) -> bool:
+    """课表中是否有其他调整涉及与该调整相同的日期"""
+    days = _adjustment_days(
+        adjustment.adjustment_type, adjustment.original_date, adjustment.end_date, adjustment.target_date
+    )
+    if not days:
+        return False
+    others = db.execute(
+        select(
+            ScheduleAdjustment.adjustment_type, ScheduleAdjustment.original_date,
+            ScheduleAdjustment.end_date, ScheduleAdjustment.target_date
+        )
+        .where(
+            ScheduleAdjustment.schedule_id == adjustment.schedule_id,
+            ScheduleAdjustment.id != adjustment.id,
+            or_(
+                and_(
+                    ScheduleAdjustment.original_date <= max(days),
+                    func.coalesce(ScheduleAdjustment.end_date, ScheduleAdjustment.original_date) >= min(days)
+                ),
+                ScheduleAdjustment.target_date.between(min(days), max(days))
+            )
+        )
+    ).all()
+    return any(days & _adjustment_days(*other) for other in others)
+
+
+def undo_adjustment(db: Session, adjustment: ScheduleAdjustment) -> Dict[str, Any]:
+    """
+    撤销一条调整：恢复它隐藏的事件并删除它创建的覆盖事件，只涉及这些行。
+    如果其他调整涉及相同的日期（例如重叠的放假区间，恢复的事件仍应被隐藏），
+    或它的覆盖事件又被后续调整移动，改为排除该调整后重放整个课表。
+
+    Returns:
+        Dict: {"restored_events": 恢复的事件数, "removed_events": 删除的覆盖事件数, "replayed": 是否重放}
+    """
+    schedule_id = adjustment.schedule_id
+    replayed = _overlaps_other_adjustments(db, adjustment) or db.scalar(
+        select(Event.id).where(Event.adjustment_id == adjustment.id, Event.suppressed_by_id.is_not(None)).limit(1)
+    ) is not None
+    if replayed:
+        replay_adjustments(db, schedule_id, exclude=[adjustment.id])
+        restored = removed = 0
+    else:
+        restored = db.execute(
+            update(Event)
+            .where(Event.suppressed_by_id == adjustment.id)
+            .values(is_active=True, suppressed_by_id=None, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount or 0
+        removed = db.execute(
+            delete(Event)
+            .where(Event.adjustment_id == adjustment.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount or 0
+
+    db.execute(
+        delete(ScheduleAdjustment)
+        .where(ScheduleAdjustment.id == adjustment.id)
+        .execution_options(synchronize_session=False)
+    )
+    bump_schedule_versions(db, [schedule_id])
+    return {"restored_events": restored, "removed_events": removed, "replayed": replayed}
+
+
+def adjustment_dates(adjustment) -> tuple:
+    """返回调整请求的 (类型, 原始开始日期, 结束日期, 目标日期)"""
+    if adjustment.adjustment_type == "HOLIDAY":
+        return "HOLIDAY", adjustment.holiday_date, adjustment.end_date or adjustment.holiday_date, None
+    return "SWAP", adjustment.source_date, adjustment.source_date, adjustment.target_date
+
+
+def apply_adjustment(db: Session, schedule_ids: Sequence[int], adjustment) -> Dict[str, Any]:
+    """按请求类型应用 HOLIDAY / SWAP 调整"""
+    kind, start_date, end_date, target_date = adjustment_dates(adjustment)
+    if kind == "HOLIDAY":
+        return apply_holiday(db, schedule_ids, start_date, end_date)
+    return apply_swap(db, schedule_ids, start_date, target_date)
+
+
+class AdjustmentJob:
+    """Progress of one batch adjustment job."""
+
+    def __init__(self, total_schedules: int, adjustments: int, dry_run: bool):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"  # pending / running / completed / failed
+        self.dry_run = dry_run
+        self.total_schedules = total_schedules
+        self.adjustments = adjustments
+        self.total_steps = total_schedules * adjustments
+        self.processed_steps = 0
+        self.adjustments_created = 0
+        self.skipped = 0
+        self.affected_events = 0
+        self.errors: List[str] = []
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "dry_run": self.dry_run,
+            "total_schedules": self.total_schedules,
+            "adjustments": self.adjustments,
+            "total_steps": self.total_steps,
+            "processed_steps": self.processed_steps,
+            "progress": round(self.processed_steps / self.total_steps, 4) if self.total_steps else 1.0,
+            "adjustments_created": self.adjustments_created,
+            "skipped": self.skipped,
+            "affected_events": self.affected_events,
+            "errors": list(self.errors),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class AdjustmentJobRegistry:
+    """Recent batch jobs, oldest dropped first."""
+
+    def __init__(self, max_jobs: int = ADJUSTMENT_JOB_HISTORY):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, AdjustmentJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: AdjustmentJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[AdjustmentJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[AdjustmentJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+
+adjustment_jobs = AdjustmentJobRegistry()
+
+
+def select_batch_schedules(
+    db: Session,
+    schedule_ids: Optional[List[int]] = None,
+    statuses: Optional[List[str]] = None,
+    class_names: Optional[List[str]] = None,
+    grades: Optional[List[str]] = None
+) -> List[tuple]:
+    """返回满足条件的课表 (id, start_date, total_weeks)，按 id 排序"""
+    query = select(Schedule.id, Schedule.start_date, Schedule.total_weeks)
+    if class_names or grades:
+        query = query.join(User, Schedule.owner_id == User.id)
+        if class_names:
+            query = query.where(User.class_name.in_(class_names))
+        if grades:
+            query = query.where(User.grade.in_(grades))
+    if schedule_ids:
+        query = query.where(Schedule.id.in_(schedule_ids))
+    if statuses:
+        query = query.where(Schedule.status.in_(statuses))
+    return [tuple(row) for row in db.execute(query.order_by(Schedule.id))]
+
+
+def _covers(schedule: tuple, day: date) -> bool:
+    """课表学期（开学日起 total_weeks 周）是否包含该日期"""
+    _, start_date, total_weeks = schedule
+    return start_date <= day < start_date + timedelta(weeks=total_weeks or 20)
+
+
+def _existing_adjustment_schedule_ids(db: Session, schedule_ids: List[int], adjustment) -> set:
+    """已经存在相同调整记录的课表，重复执行任务时跳过"""
+    kind, start_date, end_date, target_date = adjustment_dates(adjustment)
+    query = select(ScheduleAdjustment.schedule_id).where(
+        ScheduleAdjustment.schedule_id.in_(schedule_ids),
+        ScheduleAdjustment.adjustment_type == kind,
+        ScheduleAdjustment.original_date == start_date,
+    )
+    if kind == "HOLIDAY":
+        query = query.where(
+            ScheduleAdjustment.end_date == end_date if end_date != start_date else ScheduleAdjustment.end_date.is_(None)
+        )
+    else:
+        query = query.where(ScheduleAdjustment.target_date == target_date)
+    return set(db.scalars(query))
+
+
+def run_batch_adjustment_job(job: AdjustmentJob, schedules: List[tuple], adjustments: list) -> None:
+    """
+    后台执行批量调整。按调整日历的顺序逐条处理，每条调整只作用于学期
+    包含该日期的课表，每 ADJUSTMENT_BATCH_CHUNK 个课表提交一次事务。
+    """
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for adjustment in adjustments:
+            _, start_date, _, _ = adjustment_dates(adjustment)
+            covered = [schedule[0] for schedule in schedules if _covers(schedule, start_date)]
+            job.skipped += len(schedules) - len(covered)
+            job.processed_steps += len(schedules) - len(covered)
+
+            for offset in range(0, len(covered), ADJUSTMENT_BATCH_CHUNK):
+                chunk = covered[offset:offset + ADJUSTMENT_BATCH_CHUNK]
+                try:
+                    existing = _existing_adjustment_schedule_ids(db, chunk, adjustment)
+                    pending = [schedule_id for schedule_id in chunk if schedule_id not in existing]
+                    job.skipped += len(existing)
+                    if job.dry_run:
+                        job.adjustments_created += len(pending)
+                    elif pending:
+                        result = apply_adjustment(db, pending, adjustment)
+                        db.commit()
+                        job.adjustments_created += len(result["adjustment_ids"])
+                        job.affected_events += result["affected_events"]
+                except Exception as e:
+                    db.rollback()
+                    job.errors.append(
+                        f"{adjustment.adjustment_type} {start_date}: schedules {chunk[0]}-{chunk[-1]}: {e}"
+                    )
+                job.processed_steps += len(chunk)
+        job.status = "completed" if not job.errors else "failed"
+    except Exception as e:
+        job.errors.append(str(e))
+        job.status = "failed"
+    finally:
+        db.close()
+        job.finished_at = datetime.utcnow()
+        logger.info(
+            "Batch adjustment job %s %s: %d adjustments, %d events, %d skipped, %d errors",
+            job.id, job.status, job.adjustments_created, job.affected_events, job.skipped, len(job.errors)
+        )
@@ -0,0 +1,106 @@
+"""
+Bulk event ingestion for timetable imports.
+
+Imports replace a schedule's courses with hundreds or thousands of rows.
+Instead of db.delete() / db.add() per row, existing rows are removed with
+one set-based DELETE and new rows are written with executemany INSERTs in
+chunks. ORM bulk statements skip mapper and flush events, so the week mask
+normally filled in by the Event listener is computed here and the schedule
+version is bumped explicitly.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from models import Event, bump_schedule_versions
+from weekset import WeekSet
+
+# 每条 INSERT 语句的行数
+INSERT_CHUNK_SIZE = 1000
+
+_EVENT_FIELDS = (
+    "title", "description", "location", "start_time", "end_time", "instructor",
+    "weeks_display", "weeks_input", "day_of_week", "period", "color",
+    "is_override", "is_active", "adjustment_id", "suppressed_by_id",
+)
+
+
+def build_event_row(schedule_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将导入得到的事件字典转换为 events 表的一行。
+
+    Args:
+        schedule_id: 目标课表ID
+        data: 事件字段，未知字段会被忽略
+
+    Returns:
+        Dict[str, Any]: 可直接用于 insert(Event) 的参数
+    """
+    row = {field: data[field] for field in _EVENT_FIELDS if field in data}
+    row["schedule_id"] = schedule_id
+    row.setdefault("title", "未命名事件")
+    # 批量插入不会触发 Event 的 before_insert 监听器，这里直接计算周数位图
+    row["week_mask"] = WeekSet.parse(row.get("weeks_input") or row.get("weeks_display") or "")
+    return row
+
+
+def insert_events(db: Session, rows: List[Dict[str, Any]], chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+    """按块批量插入事件行（executemany），返回插入数量"""
+    for offset in range(0, len(rows), chunk_size):
+        db.execute(insert(Event), rows[offset:offset + chunk_size])
+    return len(rows)
+
+
+def insert_events_returning_ids(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    批量插入事件行并返回新事件ID（INSERT ... RETURNING）。
+
+    返回的ID不保证与 rows 顺序对应：要求按参数顺序返回时 SQLite 会退化为逐行 INSERT。
+    """
+    if not rows:
+        return []
+    return list(db.scalars(insert(Event).returning(Event.id), rows))
+
+
+def delete_events(db: Session, schedule_id: int, *criteria) -> int:
+    """用一条 DELETE 删除课表下满足条件的事件，返回删除数量"""
+    result = db.execute(
+        delete(Event)
+        .where(Event.schedule_id == schedule_id, *criteria)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def ingest_events(
+    db: Session,
+    schedule_id: int,
+    events_data: Iterable[Dict[str, Any]],
+    replace_criteria: Optional[list] = None
+) -> Dict[str, int]:
+    """
+    将一批事件写入课表，可选地先删除满足条件的已有事件。
+
+    不提交事务，由调用方决定何时 commit。
+
+    Args:
+        db: 数据库会话
+        schedule_id: 目标课表ID
+        events_data: 事件字典序列
+        replace_criteria: 需要先删除的已有事件的过滤条件；为 None 时不删除
+
+    Returns:
+        Dict[str, int]: {"deleted": 删除数量, "inserted": 插入数量}
+    """
+    deleted = 0
+    if replace_criteria is not None:
+        deleted = delete_events(db, schedule_id, *replace_criteria)
+
+    rows = [build_event_row(schedule_id, data) for data in events_data]
+    inserted = insert_events(db, rows)
+
+    if deleted or inserted:
+        bump_schedule_versions(db, [schedule_id])
+    return {"deleted": deleted, "inserted": inserted}
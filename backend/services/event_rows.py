@@ -0,0 +1,87 @@
+"""
+Fast path for event list responses.
+
+Event lists (a semester view is thousands of rows) used to be built as ORM
+objects with the schedule and owner joined in, then validated attribute by
+attribute through EventResponse. Here the list endpoints select only the
+columns EventResponse needs as plain row tuples, build one dict per event
+(schedule and owner dicts are built once per id and shared) and encode the
+result with orjson. The JSON shape is exactly that of List[EventResponse].
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Select, select
+
+from models import Event, Schedule, User
+
+# EventResponse 的字段顺序
+_EVENT_FIELDS = (
+    "title", "description", "location", "start_time", "end_time", "instructor",
+    "weeks_display", "day_of_week", "period", "weeks_input", "color",
+    "id", "schedule_id", "created_at", "updated_at",
+    "is_override", "is_active", "adjustment_id",
+)
+# ScheduleResponse 的字段顺序
+_SCHEDULE_FIELDS = (
+    "name", "status", "start_date", "total_weeks", "class_times",
+    "id", "owner_id", "created_at", "updated_at",
+)
+# UserPublic 的字段顺序
+_OWNER_FIELDS = (
+    "student_id", "full_name", "class_name", "grade",
+    "id", "role", "avatar_url", "created_at", "updated_at",
+)
+
+EVENT_ROW_COLUMNS = (
+    [getattr(Event, field) for field in _EVENT_FIELDS]
+    + [getattr(Schedule, field).label(f"schedule_{field}") for field in _SCHEDULE_FIELDS]
+)
+OWNER_ROW_COLUMNS = [getattr(User, field).label(f"owner_{field}") for field in _OWNER_FIELDS]
+
+
+def select_event_rows(with_owner: bool = True) -> Select:
+    """事件行查询：事件列 + 所属课表列（+ 课表所有者列），调用方追加过滤和排序"""
+    if with_owner:
+        return (
+            select(*EVENT_ROW_COLUMNS, *OWNER_ROW_COLUMNS)
+            .join(Schedule, Event.schedule_id == Schedule.id)
+            .join(User, Schedule.owner_id == User.id)
+        )
+    return select(*EVENT_ROW_COLUMNS).join(Schedule, Event.schedule_id == Schedule.id)
+
+
+def serialize_event_rows(rows: Iterable[Any], with_owner: bool = True) -> List[Dict[str, Any]]:
+    """将事件行转换为 EventResponse 结构的字典列表"""
+    schedules: Dict[int, Dict[str, Any]] = {}
+    owners: Dict[int, Dict[str, Any]] = {}
+    event_count = len(_EVENT_FIELDS)
+    schedule_count = len(_SCHEDULE_FIELDS)
+
+    items = []
+    for row in rows:
+        item = dict(zip(_EVENT_FIELDS, row))
+
+        schedule_id = item["schedule_id"]
+        schedule = schedules.get(schedule_id)
+        if schedule is None:
+            schedule = schedules[schedule_id] = dict(
+                zip(_SCHEDULE_FIELDS, row[event_count:event_count + schedule_count])
+            )
+        item["schedule"] = schedule
+
+        owner: Optional[Dict[str, Any]] = None
+        if with_owner:
+            owner_id = schedule["owner_id"]
+            owner = owners.get(owner_id)
+            if owner is None:
+                owner = owners[owner_id] = dict(zip(_OWNER_FIELDS, row[event_count + schedule_count:]))
+        item["owner"] = owner
+        items.append(item)
+    return items
+
+
+def event_list_response(rows: Iterable[Any], with_owner: bool = True, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """用 orjson 序列化事件行，跳过 response_model 校验"""
+    return ORJSONResponse(serialize_event_rows(rows, with_owner), headers=headers)
@@ -0,0 +1,174 @@
+"""
+Common free-time finder for teams.
+
+Busy time is reduced to one union of intervals per day (interval merge)
+and laid over the period grid from a schedule's class_times as a bit
+mask: bit 2i marks period i busy, bit 2i+1 the gap between period i and
+the next one. Masks of several people combine with bitwise OR (see
+services/occupancy.py). A slot is a run of consecutive periods during
+which nobody is busy, gaps between the periods included, and slots are
+ranked longest first.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils import get_default_class_times
+
+# (节次, 开始分钟, 结束分钟)，分钟数从当天 0 点算起
+Period = Tuple[int, int, int]
+Interval = Tuple[int, int]
+
+# 每天的位图为 32 位，最多支持 16 节
+MAX_PERIODS = 16
+
+
+def _minutes(value: str) -> Optional[int]:
+    try:
+        hour, minute = map(int, value.split(":"))
+    except (AttributeError, ValueError):
+        return None
+    return hour * 60 + minute
+
+
+def build_period_grid(class_times: Optional[dict]) -> List[Period]:
+    """将 class_times 转换为按开始时间排序的节次列表，无效配置被忽略"""
+    grid = []
+    for number, slot in (class_times or get_default_class_times()).items():
+        try:
+            period = int(number)
+        except (TypeError, ValueError):
+            continue
+        start = _minutes((slot or {}).get("start"))
+        end = _minutes((slot or {}).get("end"))
+        if start is not None and end is not None and end > start:
+            grid.append((period, start, end))
+    grid.sort(key=lambda item: (item[1], item[0]))
+    return grid[:MAX_PERIODS]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """合并重叠或相接的区间，返回有序且互不重叠的区间列表"""
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def busy_intervals_by_day(
+    spans: Iterable[Tuple[datetime, datetime]],
+    date_from: date,
+    date_to: date
+) -> Dict[date, List[Interval]]:
+    """
+    将 (开始, 结束) 时间段按天切分为分钟区间并合并，
+    跨天的时间段会拆到每一天。
+    """
+    by_day: Dict[date, List[Interval]] = defaultdict(list)
+    for start, end in spans:
+        if end <= start:
+            continue
+        day = start.date()
+        while day <= end.date() and day <= date_to:
+            day_start = datetime.combine(day, time.min)
+            begin = max(start, day_start)
+            finish = min(end, day_start + timedelta(days=1))
+            if day >= date_from and finish > begin:
+                by_day[day].append((
+                    (begin - day_start) // timedelta(minutes=1),
+                    -(-(finish - day_start) // timedelta(minutes=1))
+                ))
+            day += timedelta(days=1)
+    return {day: merge_intervals(intervals) for day, intervals in by_day.items()}
+
+
+def day_mask(grid: Sequence[Period], busy: Sequence[Interval]) -> int:
+    """
+    计算一天的占用位图。busy 为合并后的区间；节次之间有间隔（如课间、
+    午休）且间隔被占用时，对应的间隔位也置 1。
+    """
+    ends = [end for _, end in busy]
+
+    def overlaps(start: int, end: int) -> bool:
+        # 第一个结束时间晚于 start 的区间若开始于 end 之前，则有重叠
+        index = bisect_right(ends, start)
+        return index < len(busy) and busy[index][0] < end
+
+    mask = 0
+    for index, (_, start, end) in enumerate(grid):
+        if overlaps(start, end):
+            mask |= 1 << (2 * index)
+        if index + 1 < len(grid):
+            gap_end = grid[index + 1][1]
+            if end < gap_end and overlaps(end, gap_end):
+                mask |= 1 << (2 * index + 1)
+    return mask
+
+
+def free_runs(grid: Sequence[Period], mask: int, min_periods: int = 1) -> List[Tuple[int, int]]:
+    """返回位图中连续空闲节次 (首个下标, 末个下标)，间隔被占用时连续段断开"""
+    runs = []
+    run_start = None
+    for index in range(len(grid)):
+        if run_start is not None and mask >> (2 * index - 1) & 1:
+            if index - run_start >= min_periods:
+                runs.append((run_start, index - 1))
+            run_start = None
+        if mask >> (2 * index) & 1:
+            if run_start is not None and index - run_start >= min_periods:
+                runs.append((run_start, index - 1))
+            run_start = None
+        elif run_start is None:
+            run_start = index
+    if run_start is not None and len(grid) - run_start >= min_periods:
+        runs.append((run_start, len(grid) - 1))
+    return runs
+
+
+def find_common_free_slots(
+    masks_by_day: Dict[date, int],
+    grid: Sequence[Period],
+    date_from: date,
+    date_to: date,
+    weekdays: Optional[Iterable[int]] = None,
+    min_periods: int = 1,
+    limit: int = 20
+) -> List[dict]:
+    """
+    在 [date_from, date_to] 中查找占用位图为空的时间段，
+    按节次数、时长从长到短排序，相同时按时间先后排序。
+    """
+    if not grid:
+        return []
+    allowed = set(weekdays) if weekdays else None
+    min_periods = max(1, min_periods)
+
+    slots = []
+    day = date_from
+    while day <= date_to:
+        if allowed is None or day.isoweekday() in allowed:
+            for first, last in free_runs(grid, masks_by_day.get(day, 0), min_periods):
+                start_period, start_minute, _ = grid[first]
+                end_period, _, end_minute = grid[last]
+                day_start = datetime.combine(day, time.min)
+                slots.append({
+                    "date": day,
+                    "day_of_week": day.isoweekday(),
+                    "start_period": start_period,
+                    "end_period": end_period,
+                    "period": f"{start_period}-{end_period}节" if end_period != start_period else f"{start_period}节",
+                    "periods": last - first + 1,
+                    "start_time": day_start + timedelta(minutes=start_minute),
+                    "end_time": day_start + timedelta(minutes=end_minute),
+                    "duration_minutes": end_minute - start_minute,
+                })
+        day += timedelta(days=1)
+
+    slots.sort(key=lambda slot: (-slot["periods"], -slot["duration_minutes"], slot["start_time"]))
+    return slots[:limit]
@@ -0,0 +1,243 @@
+"""
+Bounded store for ZFW import sessions (captcha step -> login step).
+
+Sessions expire after a TTL, the store is capped with LRU eviction, and a
+background task sweeps expired entries so abandoned captcha sessions do
+not accumulate. Values are JSON-serialisable dicts (cookies are stored as
+plain lists), so the optional database backend lets several uvicorn
+workers serve the same import session.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select
+
+# 会话有效期（秒），与原先的 30 分钟一致
+IMPORT_SESSION_TTL = int(os.getenv("IMPORT_SESSION_TTL", "1800"))
+# 最多同时保存的会话数，超出时淘汰最久未使用的会话
+IMPORT_SESSION_MAX = int(os.getenv("IMPORT_SESSION_MAX", "1000"))
+# 后台清理间隔（秒）
+IMPORT_SESSION_SWEEP_INTERVAL = int(os.getenv("IMPORT_SESSION_SWEEP_INTERVAL", "60"))
+# memory（单进程）或 database（多个 worker 共享）
+IMPORT_SESSION_BACKEND = os.getenv("IMPORT_SESSION_BACKEND", "memory")
+
+logger = logging.getLogger(__name__)
+
+
+class ImportSessionStore(ABC):
+    """Abstract TTL + LRU session store."""
+
+    def __init__(self, ttl: int = IMPORT_SESSION_TTL, max_size: int = IMPORT_SESSION_MAX):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.hits = 0
+        self.misses = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """返回未过期的会话数据并刷新其 LRU 位置，不存在或已过期时返回 None"""
+
+    @abstractmethod
+    async def put(self, session_id: str, data: Dict[str, Any]) -> None:
+        """保存会话数据，重新计算过期时间"""
+
+    @abstractmethod
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """删除并返回会话数据"""
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """清理过期会话，返回清理数量"""
+
+    @abstractmethod
+    async def size(self) -> int:
+        """当前会话数量"""
+
+    async def stats(self) -> Dict[str, Any]:
+        """会话占用情况"""
+        size = await self.size()
+        return {
+            "backend": self.backend_name,
+            "size": size,
+            "max_size": self.max_size,
+            "occupancy": round(size / self.max_size, 4) if self.max_size else 0,
+            "ttl_seconds": self.ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def _sweep_forever(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning("Import session sweep failed: %s", e)
+
+    def start_sweeper(self, interval: int = IMPORT_SESSION_SWEEP_INTERVAL) -> None:
+        """启动后台清理任务（需在事件循环中调用）"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever(interval))
+
+    async def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+
+class MemoryImportSessionStore(ImportSessionStore):
+    """In-process store backed by an OrderedDict (oldest use first)."""
+
+    backend_name = "memory"
+
+    def __init__(self, ttl: int = IMPORT_SESSION_TTL, max_size: int = IMPORT_SESSION_MAX):
+        super().__init__(ttl, max_size)
+        # session_id -> (expires_at, data)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[session_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry[1]
+
+    async def put(self, session_id: str, data: Dict[str, Any]) -> None:
+        if session_id not in self._entries:
+            self.created += 1
+        self._entries[session_id] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.pop(session_id, None)
+        return entry[1] if entry else None
+
+    async def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [session_id for session_id, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for session_id in expired:
+            del self._entries[session_id]
+        self.expired += len(expired)
+        return len(expired)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseImportSessionStore(ImportSessionStore):
+    """Store shared between workers through the import_sessions table."""
+
+    backend_name = "database"
+
+    def __init__(self, ttl: int = IMPORT_SESSION_TTL, max_size: int = IMPORT_SESSION_MAX):
+        super().__init__(ttl, max_size)
+        # 延迟导入，避免模块加载时依赖数据库配置
+        from database import AsyncSessionLocal
+        from models import ImportSession
+        self._session_factory = AsyncSessionLocal
+        self._model = ImportSession
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        model = self._model
+        async with self._session_factory() as db:
+            row = await db.get(model, session_id)
+            now = datetime.utcnow()
+            if row is None or row.expires_at <= now:
+                if row is not None:
+                    await db.delete(row)
+                    await db.commit()
+                    self.expired += 1
+                self.misses += 1
+                return None
+            # 记录最近使用时间，用于 LRU 淘汰
+            row.last_used_at = now
+            await db.commit()
+            self.hits += 1
+            return row.data
+
+    async def put(self, session_id: str, data: Dict[str, Any]) -> None:
+        model = self._model
+        now = datetime.utcnow()
+        async with self._session_factory() as db:
+            row = await db.get(model, session_id)
+            if row is None:
+                db.add(model(
+                    id=session_id, data=data, last_used_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl)
+                ))
+                self.created += 1
+            else:
+                row.data = data
+                row.last_used_at = now
+                row.expires_at = now + timedelta(seconds=self.ttl)
+            await db.flush()
+
+            overflow = (await db.scalar(select(func.count(model.id)))) - self.max_size
+            if overflow > 0:
+                oldest = select(model.id).order_by(model.last_used_at).limit(overflow)
+                result = await db.execute(delete(model).where(model.id.in_(oldest)))
+                self.evicted += result.rowcount or 0
+            await db.commit()
+
+    async def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        async with self._session_factory() as db:
+            row = await db.get(self._model, session_id)
+            if row is None:
+                return None
+            data = row.data
+            await db.delete(row)
+            await db.commit()
+            return data
+
+    async def sweep(self) -> int:
+        model = self._model
+        async with self._session_factory() as db:
+            result = await db.execute(delete(model).where(model.expires_at <= datetime.utcnow()))
+            await db.commit()
+        removed = result.rowcount or 0
+        self.expired += removed
+        return removed
+
+    async def size(self) -> int:
+        async with self._session_factory() as db:
+            return await db.scalar(select(func.count(self._model.id))) or 0
+
+
+def create_import_session_store(backend: str = IMPORT_SESSION_BACKEND) -> ImportSessionStore:
+    """按配置创建会话存储"""
+    if backend == "database":
+        return DatabaseImportSessionStore()
+    if backend != "memory":
+        logger.warning("Unknown IMPORT_SESSION_BACKEND '%s', using memory", backend)
+    return MemoryImportSessionStore()
+
+
+import_session_store = create_import_session_store()
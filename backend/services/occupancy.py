@@ -0,0 +1,183 @@
+"""
+Per-user weekly occupancy bitmaps.
+
+A WeeklyOccupancy row holds one user's busy periods for one calendar week
+on one period grid: seven 32-bit day masks (see services/free_slots.py
+for the bit layout) packed into 28 bytes. Read as a single 224-bit
+integer, a whole week of a team reduces to one bitwise OR per member.
+
+Rows are a cache. Event changes delete the rows of the affected weeks
+and bulk changes delete all rows of the schedule owner (see models.py);
+missing rows are rebuilt from events and course templates on the next
+query. Each row records the sum of the owner's schedule versions at
+build time, and freshly built rows are discarded if that stamp changed
+while they were being computed.
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud_async
+from models import WeeklyOccupancy, user_teams_table
+from services.free_slots import Period, busy_intervals_by_day, day_mask
+
+DAY_BITS = 32
+DAY_MASK = (1 << DAY_BITS) - 1
+WEEK_BYTES = 7 * DAY_BITS // 8
+
+
+def grid_key(grid: Sequence[Period]) -> str:
+    """节次网格的摘要，相同 class_times 的课表共用同一份位图"""
+    source = ";".join(f"{number}:{start}-{end}" for number, start, end in grid)
+    return hashlib.sha1(source.encode("ascii")).hexdigest()[:16]
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def week_starts(date_from: date, date_to: date) -> List[date]:
+    """覆盖 [date_from, date_to] 的所有周一"""
+    monday = week_start(date_from)
+    weeks = []
+    while monday <= date_to:
+        weeks.append(monday)
+        monday += timedelta(days=7)
+    return weeks
+
+
+def pack_week(masks: Sequence[int]) -> bytes:
+    """将周一到周日的 7 个日位图打包为 28 字节"""
+    value = 0
+    for index, mask in enumerate(masks):
+        value |= (mask & DAY_MASK) << (DAY_BITS * index)
+    return value.to_bytes(WEEK_BYTES, "little")
+
+
+def unpack_day(week: int, weekday: int) -> int:
+    """从整周位图中取出某天（周一=0）的位图"""
+    return (week >> (DAY_BITS * weekday)) & DAY_MASK
+
+
+def build_week_masks(
+    grid: Sequence[Period],
+    spans: Iterable[Tuple[datetime, datetime]],
+    weeks: Sequence[date]
+) -> Dict[date, bytes]:
+    """由一个用户的忙碌时间段计算各周的位图"""
+    if not weeks:
+        return {}
+    by_day = busy_intervals_by_day(spans, weeks[0], weeks[-1] + timedelta(days=6))
+    return {
+        monday: pack_week([
+            day_mask(grid, by_day.get(monday + timedelta(days=offset), ()))
+            for offset in range(7)
+        ])
+        for monday in weeks
+    }
+
+
+async def _build_missing(
+    db: AsyncSession,
+    grid: Sequence[Period],
+    key: str,
+    missing: Dict[int, List[date]]
+) -> Dict[Tuple[int, date], int]:
+    """重建缺失的 (用户, 周) 位图并写入数据库，返回 {(用户ID, 周一): 整周位图}"""
+    user_ids = list(missing)
+    first = min(min(weeks) for weeks in missing.values())
+    last = max(max(weeks) for weeks in missing.values()) + timedelta(days=6)
+
+    stamps = await crud_async.get_owner_version_stamps(db, user_ids)
+    spans_by_owner = await crud_async.get_busy_spans_by_owner(db, user_ids, first, last)
+
+    built = {}
+    rows = []
+    now = datetime.utcnow()
+    for user_id, weeks in missing.items():
+        for monday, masks in build_week_masks(grid, spans_by_owner.get(user_id, ()), sorted(weeks)).items():
+            built[(user_id, monday)] = int.from_bytes(masks, "little")
+            rows.append({
+                "user_id": user_id, "grid_key": key, "week_start": monday,
+                "masks": masks, "stamp": stamps.get(user_id, 0), "updated_at": now,
+            })
+
+    try:
+        await db.execute(insert(WeeklyOccupancy), rows)
+        # 计算期间课表发生变化时，丢弃这些用户刚写入的位图
+        current = await crud_async.get_owner_version_stamps(db, user_ids)
+        stale = [user_id for user_id in user_ids if current.get(user_id, 0) != stamps.get(user_id, 0)]
+        if stale:
+            await db.execute(delete(WeeklyOccupancy).where(
+                WeeklyOccupancy.user_id.in_(stale),
+                WeeklyOccupancy.grid_key == key,
+                WeeklyOccupancy.week_start.in_({monday for user_id in stale for monday in missing[user_id]})
+            ))
+        await db.commit()
+    except IntegrityError:
+        # 其他请求同时生成了相同的位图
+        await db.rollback()
+    return built
+
+
+async def get_occupancy(
+    db: AsyncSession,
+    user_ids: Sequence[int],
+    grid: Sequence[Period],
+    weeks: Sequence[date]
+) -> Dict[Tuple[int, date], int]:
+    """返回 {(用户ID, 周一): 整周位图}，缺失的位图按需生成"""
+    if not user_ids or not weeks:
+        return {}
+    key = grid_key(grid)
+    result = await db.execute(
+        select(WeeklyOccupancy.user_id, WeeklyOccupancy.week_start, WeeklyOccupancy.masks)
+        .where(
+            WeeklyOccupancy.grid_key == key,
+            WeeklyOccupancy.user_id.in_(user_ids),
+            WeeklyOccupancy.week_start.between(weeks[0], weeks[-1])
+        )
+    )
+    occupancy = {(user_id, monday): int.from_bytes(masks, "little") for user_id, monday, masks in result}
+
+    missing = defaultdict(list)
+    for user_id in user_ids:
+        for monday in weeks:
+            if (user_id, monday) not in occupancy:
+                missing[user_id].append(monday)
+    if missing:
+        occupancy.update(await _build_missing(db, grid, key, missing))
+    return occupancy
+
+
+async def get_team_busy_masks(
+    db: AsyncSession,
+    team_id: int,
+    grid: Sequence[Period],
+    date_from: date,
+    date_to: date
+) -> Dict[date, int]:
+    """团队成员位图按位或，返回 {日期: 日位图}（至少一人占用的位为 1）"""
+    user_ids = list(await db.scalars(
+        select(user_teams_table.c.user_id).where(user_teams_table.c.team_id == team_id)
+    ))
+    weeks = week_starts(date_from, date_to)
+    occupancy = await get_occupancy(db, user_ids, grid, weeks)
+
+    team_weeks = dict.fromkeys(weeks, 0)
+    for (_, monday), week in occupancy.items():
+        team_weeks[monday] |= week
+
+    masks = {}
+    for monday, week in team_weeks.items():
+        for offset in range(7):
+            day = monday + timedelta(days=offset)
+            if date_from <= day <= date_to:
+                masks[day] = unpack_day(week, offset)
+    return masks
@@ -0,0 +1,154 @@
+"""
+Short-TTL cache of authenticated users.
+
+Every API call resolves the JWT subject to a User row. The column values
+of recently seen users are kept in memory for a few seconds so that
+authenticated reads skip that lookup. Each student_id carries a version
+stamp that is bumped after any commit updating or deleting the user
+(profile, role, password, avatar...), and cache entries are keyed by
+(student_id, version), so a stale entry can never be served after a
+change made through this process. Other workers only see the change once
+their entry expires, which bounds staleness to PRINCIPAL_CACHE_TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import User
+
+# 缓存有效期（秒），0 表示关闭缓存
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+# 最多缓存的用户数
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+
+_USER_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class PrincipalCache:
+    """LRU of user column values keyed by (student_id, version)."""
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # student_id -> (version, expires_at, column values)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def version(self, student_id: str) -> int:
+        with self._lock:
+            return self._versions.get(student_id, 0)
+
+    def get(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """返回仍然有效的用户字段，版本变化或过期时返回 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if (
+                entry is not None
+                and entry[0] == self._versions.get(student_id, 0)
+                and entry[1] > time.monotonic()
+            ):
+                self._entries.move_to_end(student_id)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[student_id]
+            self.misses += 1
+            return None
+
+    def put(self, student_id: str, version: int, values: Dict[str, Any]) -> None:
+        """
+        缓存用户字段。version 必须是查询数据库之前读取的版本号，
+        这样查询期间提交的修改会使这条缓存立即失效。
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version != self._versions.get(student_id, 0):
+                return
+            self._entries[student_id] = (version, time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(student_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, student_id: str) -> None:
+        with self._lock:
+            self._versions[student_id] = self._versions.get(student_id, 0) + 1
+            self._entries.pop(student_id, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for student_id in self._entries:
+                self._versions[student_id] = self._versions.get(student_id, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def snapshot_user(user: User) -> Dict[str, Any]:
+    """提取用户的列值，用于缓存"""
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+async def attach_cached_user(db: AsyncSession, values: Dict[str, Any]) -> User:
+    """
+    将缓存的用户字段还原为当前会话中的 User 对象，不查询数据库。
+    对象与正常加载的对象一样，可以修改并提交（异步会话不支持延迟加载关联关系）。
+    """
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+# 用户被修改/删除时记录 student_id，提交后使缓存失效；回滚则忽略
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _record_user_change(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    changed = session.info.setdefault("changed_principals", set())
+    changed.add(target.student_id)
+    # 学号被修改时，旧学号签发的令牌也要失效
+    changed.update(value for value in inspect(target).attrs.student_id.history.deleted or () if value)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_principals(session):
+    for student_id in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(student_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_principals(session):
+    session.info.pop("changed_principals", None)
@@ -3,7 +3,12 @@ File upload service with support for multiple storage backends.
 Supports local storage and Alist storage providers.
 """
 
+import asyncio
+import importlib.util
+import json
+import logging
 import os
+import time
 import uuid
 import aiofiles
 import httpx
@@ -15,6 +20,11 @@ from urllib.parse import quote
 
 from config import get_config
 
+logger = logging.getLogger(__name__)
+
+# HTTP/2 for storage backends; h2 comes with httpx[http2] in requirements.txt, fall back to HTTP/1.1 without it
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
 class UploaderBase(ABC):
     """Abstract base class for file uploaders."""
     
@@ -67,8 +77,9 @@ class LocalUploader(UploaderBase):
 class AlistUploader(UploaderBase):
     """Alist storage uploader with support for both token and username/password auth."""
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.config = get_config()
+        self.client = client or get_http_client()
         self.version = self.config.get('storage.alist.version', 3)
         self.url = self.config.get('storage.alist.url', '')
         self.upload_path = self.config.get('storage.alist.upload_path', 'assets')
@@ -93,6 +104,8 @@ class AlistUploader(UploaderBase):
         # Cache for dynamic token (when using username/password auth)
         self._cached_token = None
         self._token_expires_at = None
+        # Concurrent uploads wait for a single login instead of each logging in
+        self._token_lock = asyncio.Lock()
     
     async def _get_auth_token(self, force_refresh: bool = False) -> str:
         """Get authentication token, either from config or by login."""
@@ -102,9 +115,9 @@ class AlistUploader(UploaderBase):
         """Login with username/password and get token."""
         login_url = f"{self.url.rstrip('/')}/api/auth/login"
         
-        print(f"🔍 Logging in to Alist at: {login_url}")
-        print(f"🔍 Username: {self.username}")
-        print(f"🔍 Version: {self.version}")
+        logger.debug("Logging in to Alist at: %s", login_url)
+        logger.debug("Username: %s", self.username)
+        logger.debug("Version: %s", self.version)
         
         # Different payload for different versions
         if self.version == 2:
@@ -120,44 +133,43 @@ class AlistUploader(UploaderBase):
             }
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                print(f"🔍 Sending login request")
-                response = await client.post(login_url, json=login_data)
-                
-                print(f"🔍 Login response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    error_detail = f"Alist login failed: HTTP {response.status_code}\nResponse: {response.text}"
-                    print(f"❌ {error_detail}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail=error_detail
-                    )
-                
-                result = response.json()
-                print(f"🔍 Login successful, extracting token...")
-                if result.get('code') != 200:
-                    error_msg = result.get('message', 'Login failed')
-                    print(f"❌ Login API error: {error_msg}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Alist login error: {error_msg}\nFull response: {result}"
-                    )
-                
-                # Extract token from response
-                token_data = result.get('data', {})
-                token = token_data.get('token')
-                
-                if not token:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to get token from login response"
-                    )
-                
-                # Don't cache token when forcing refresh - let caller decide
-                print(f"✅ Fresh token obtained")
-                return token
-                
+            logger.debug("Sending login request")
+            response = await self.client.post(login_url, json=login_data, timeout=10.0)
+            
+            logger.debug("Login response status: %s", response.status_code)
+            
+            if response.status_code != 200:
+                error_detail = f"Alist login failed: HTTP {response.status_code}\nResponse: {response.text}"
+                logger.warning("%s", error_detail)
+                raise HTTPException(
+                    status_code=500,
+                    detail=error_detail
+                )
+            
+            result = response.json()
+            logger.debug("Login successful, extracting token")
+            if result.get('code') != 200:
+                error_msg = result.get('message', 'Login failed')
+                logger.warning("Login API error: %s", error_msg)
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Alist login error: {error_msg}\nFull response: {result}"
+                )
+            
+            # Extract token from response
+            token_data = result.get('data', {})
+            token = token_data.get('token')
+            
+            if not token:
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to get token from login response"
+                )
+            
+            # Don't cache token when forcing refresh - let caller decide
+            logger.debug("Fresh token obtained")
+            return token
+            
         except httpx.HTTPError as e:
             raise HTTPException(status_code=500, detail=f"Login network error: {str(e)}")
     
@@ -167,33 +179,28 @@ class AlistUploader(UploaderBase):
         if self.token:
             return self.token
         
-        # Check if we need to force refresh
-        if force_refresh:
-            print("🔍 Force refresh requested, getting fresh token")
+        stale_token = self._cached_token
+        async with self._token_lock:
+            # Another upload refreshed the token while we were waiting for the lock
+            if self._cached_token != stale_token:
+                return self._cached_token
+            
+            # Check if we have a cached token that's still valid
+            if not force_refresh and self._cached_token and self._token_expires_at:
+                current_time = time.time()
+                # Add 5 minute buffer to avoid edge cases
+                if current_time < (self._token_expires_at - 5 * 60):
+                    logger.debug("Using cached token (expires in %s minutes)", int((self._token_expires_at - current_time) / 60))
+                    return self._cached_token
+                logger.debug("Cached token expired or about to expire, getting fresh token")
+            elif force_refresh:
+                logger.debug("Force refresh requested, getting fresh token")
+            
+            # Get fresh token and cache it
             token = await self._login_and_get_token()
-            # Cache the fresh token
-            import time
             self._cached_token = token
             self._token_expires_at = time.time() + 30 * 60  # 30 minutes
             return token
-        
-        # Check if we have a cached token that's still valid
-        if self._cached_token and self._token_expires_at:
-            import time
-            current_time = time.time()
-            # Add 5 minute buffer to avoid edge cases
-            if current_time < (self._token_expires_at - 5 * 60):
-                print(f"🔍 Using cached token (expires in {int((self._token_expires_at - current_time) / 60)} minutes)")
-                return self._cached_token
-            else:
-                print("🔍 Cached token expired or about to expire, getting fresh token")
-        
-        # Get fresh token and cache it
-        token = await self._login_and_get_token()
-        import time
-        self._cached_token = token
-        self._token_expires_at = time.time() + 30 * 60  # 30 minutes
-        return token
     
     def _apply_filename_template(self, filename: str) -> str:
         """Apply filename template if configured."""
@@ -238,27 +245,28 @@ class AlistUploader(UploaderBase):
         for attempt in range(MAX_RETRIES + 1):
             try:
                 if attempt == 0:
-                    print(f"🔍 Starting Alist upload for file: {filename}")
+                    logger.debug("Starting Alist upload for file: %s", filename)
                 else:
-                    print(f"🔍 Upload retry #{attempt} for file: {filename}")
+                    logger.debug("Upload retry #%s for file: %s", attempt, filename)
 
-                print(f"🔍 Alist config - URL: {self.url}, Version: {self.version}")
-                print(f"🔍 Upload path: {self.upload_path}")
+                logger.debug("Alist config - URL: %s, Version: %s", self.url, self.version)
+                logger.debug("Upload path: %s", self.upload_path)
 
                 # Force token refresh on retries
                 force_refresh = attempt > 0
                 if force_refresh:
-                    print("🔄 Forcing token refresh for retry...")
+                    logger.debug("Forcing token refresh for retry")
 
                 auth_token = await self._get_cached_or_fresh_token(force_refresh=force_refresh)
-                print(f"🔍 Auth token obtained: {auth_token[:20]}..." if auth_token else "❌ No auth token")
+                if not auth_token:
+                    logger.warning("No Alist auth token")
 
                 upload_url = f"{self.url.rstrip('/')}/api/fs/put"
                 full_path = f"/{self.upload_path.strip('/')}/{filename}"
                 
-                print(f"🔍 Upload URL: {upload_url}")
-                print(f"🔍 Full path: {full_path}")
-                print(f"🔍 File content size: {len(content)} bytes")
+                logger.debug("Upload URL: %s", upload_url)
+                logger.debug("Full path: %s", full_path)
+                logger.debug("File content size: %s bytes", len(content))
 
                 # Some AList deployments expect raw token (no 'Bearer') and raw File-Path
                 headers = {
@@ -270,131 +278,128 @@ class AlistUploader(UploaderBase):
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
                 }
                 
-                print(f"🔍 Sending headers: {headers}")
 
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    print("🔍 Making PUT request (stream upload)...")
-                    response = await client.put(upload_url, headers=headers, content=content)
+                logger.debug("Making PUT request (stream upload)")
+                response = await self.client.put(upload_url, headers=headers, content=content, timeout=60.0)
 
-                print(f"🔍 Response status: {response.status_code}")
-                print(f"🔍 Response headers: {dict(response.headers)}")
-                print(f"🔍 Response content: {response.text[:500]}...")
+                logger.debug("Response status: %s", response.status_code)
+                logger.debug("Response headers: %s", dict(response.headers))
+                logger.debug("Response content: %s", response.text[:500])
 
                 try:
                     result = response.json()
-                    print(f"🔍 JSON response: {result}")
+                    logger.debug("JSON response: %s", result)
                 except ValueError:
                     # Handle non-JSON responses (like HTML pages)
                     if 200 <= response.status_code < 300:
-                         print(f"✅ Upload appears successful based on status code {response.status_code}, but response was not JSON.")
+                         logger.debug("Upload appears successful based on status code %s, but response was not JSON.", response.status_code)
                          access_url = self._get_access_url(filename)
-                         print(f"✅ Access URL: {access_url}")
+                         logger.info("Access URL: %s", access_url)
                          return access_url
                     else:
-                        print(f"❌ Upload failed with non-JSON response. Raw response: {response.text}")
+                        logger.warning("Upload failed with non-JSON response. Raw response: %s", response.text)
                         raise HTTPException(status_code=500, detail=f"Alist returned a non-JSON response (HTTP {response.status_code})")
 
                 # Check for auth failure (HTTP 401 or HTTP 200 with code 401)
                 is_auth_error = (response.status_code == 401 or (result.get('code') == 401))
 
                 if is_auth_error:
-                    print(f"🔄 Auth error detected: {result.get('message', 'Unauthorized')}")
+                    logger.debug("Auth error detected: %s", result.get('message', 'Unauthorized'))
                     if attempt < MAX_RETRIES:
                         continue  # Retry will be triggered by the loop
                     else:
                         raise Exception("Authentication failed after multiple retries.")
 
                 if result.get('code') == 200:
-                    print(f"✅ Upload successful after {attempt + 1} attempt(s).")
+                    logger.info("Upload of %s successful after %s attempt(s)", filename, attempt + 1)
 
                     # After upload, try to refresh directory and fetch a direct/actual URL
                     try:
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            json_headers = {
-                                "Authorization": auth_token,
-                                "Content-Type": "application/json",
-                                "Accept": "application/json"
+                        json_headers = {
+                            "Authorization": auth_token,
+                            "Content-Type": "application/json",
+                            "Accept": "application/json"
+                        }
+
+                        # 1) Refresh the directory so new file becomes visible immediately
+                        try:
+                            list_url = f"{self.url.rstrip('/')}/api/fs/list"
+                            list_payload_refresh = {
+                                "path": f"/{self.upload_path.strip('/')}",
+                                "refresh": True
                             }
+                            logger.debug("Refreshing directory via %s with payload %s", list_url, list_payload_refresh)
+                            list_resp = await self.client.post(list_url, headers=json_headers, json=list_payload_refresh, timeout=30.0)
+                            logger.debug("Refresh HTTP %s -> %s", list_resp.status_code, list_resp.text[:200])
+                        except Exception as e:
+                            logger.warning("Directory refresh failed: %s", e)
 
-                            # 1) Refresh the directory so new file becomes visible immediately
-                            try:
-                                list_url = f"{self.url.rstrip('/')}/api/fs/list"
-                                list_payload_refresh = {
-                                    "path": f"/{self.upload_path.strip('/')}",
-                                    "refresh": True
-                                }
-                                print(f"🔄 Refreshing directory via {list_url} with payload {list_payload_refresh}")
-                                list_resp = await client.post(list_url, headers=json_headers, json=list_payload_refresh)
-                                print(f"🔄 Refresh HTTP {list_resp.status_code} -> {list_resp.text[:200]}")
-                            except Exception as e:
-                                print(f"⚠️ Directory refresh failed: {e}")
+                        # 2) Try fetching file meta for the intended path
+                        try:
+                            get_url = f"{self.url.rstrip('/')}/api/fs/get"
+                            get_payload = {"path": full_path}
+                            logger.debug("Fetching file meta via %s with payload %s", get_url, get_payload)
+                            get_resp = await self.client.post(get_url, headers=json_headers, json=get_payload, timeout=30.0)
+                            logger.debug("/api/fs/get HTTP %s -> %s", get_resp.status_code, get_resp.text[:300])
+                            if get_resp.status_code == 200:
+                                meta = get_resp.json()
+                                if meta.get("code") == 200:
+                                    data = meta.get("data") or {}
+                                    # Use the server's actual stored name if present
+                                    actual_name = data.get("name") or filename
+                                    base_url = (self.access_domain or self.url).rstrip('/')
+                                    access_url_actual = f"{base_url}/d/{self.upload_path.strip('/')}/{actual_name}"
+                                    logger.debug("Returning domain URL: %s", access_url_actual)
+                                    return access_url_actual
+                        except Exception as e:
+                            logger.warning("Fetching raw URL failed: %s", e)
 
-                            # 2) Try fetching file meta for the intended path
-                            try:
-                                get_url = f"{self.url.rstrip('/')}/api/fs/get"
-                                get_payload = {"path": full_path}
-                                print(f"🔍 Fetching file meta via {get_url} with payload {get_payload}")
-                                get_resp = await client.post(get_url, headers=json_headers, json=get_payload)
-                                print(f"🔍 /api/fs/get HTTP {get_resp.status_code} -> {get_resp.text[:300]}")
-                                if get_resp.status_code == 200:
-                                    meta = get_resp.json()
-                                    if meta.get("code") == 200:
-                                        data = meta.get("data") or {}
-                                        # Use the server's actual stored name if present
-                                        actual_name = data.get("name") or filename
+                        # 3) If the server saved with original filename, find the actual stored name by listing
+                        try:
+                            list_payload = {
+                                "path": f"/{self.upload_path.strip('/')}",
+                                "refresh": False
+                            }
+                            list_resp2 = await self.client.post(list_url, headers=json_headers, json=list_payload, timeout=30.0)
+                            if list_resp2.status_code == 200:
+                                body = list_resp2.json()
+                                entries = ((body or {}).get("data") or {}).get("content") or []
+                                # Match by size and extension, choose the newest
+                                desired_ext = (os.path.splitext(filename)[1] or "").lower()
+                                candidates = [
+                                    e for e in entries
+                                    if not e.get("is_dir")
+                                    and int(e.get("size") or 0) == len(content)
+                                    and str(e.get("name") or "").lower().endswith(desired_ext)
+                                ]
+                                # Sort by modified fields if present
+                                def _modified_key(item):
+                                    return str(item.get("modified") or item.get("modified_time") or item.get("mtime") or "")
+                                candidates.sort(key=_modified_key, reverse=True)
+                                if candidates:
+                                    actual_name = candidates[0].get("name")
+                                    if actual_name:
+                                        # Build a working access URL with actual stored name (bypass template)
                                         base_url = (self.access_domain or self.url).rstrip('/')
                                         access_url_actual = f"{base_url}/d/{self.upload_path.strip('/')}/{actual_name}"
-                                        print(f"✅ Returning domain URL: {access_url_actual}")
+                                        logger.debug("Found stored file name '%s', returning: %s", actual_name, access_url_actual)
                                         return access_url_actual
-                            except Exception as e:
-                                print(f"⚠️ Fetching raw URL failed: {e}")
-
-                            # 3) If the server saved with original filename, find the actual stored name by listing
-                            try:
-                                list_payload = {
-                                    "path": f"/{self.upload_path.strip('/')}",
-                                    "refresh": False
-                                }
-                                list_resp2 = await client.post(list_url, headers=json_headers, json=list_payload)
-                                if list_resp2.status_code == 200:
-                                    body = list_resp2.json()
-                                    entries = ((body or {}).get("data") or {}).get("content") or []
-                                    # Match by size and extension, choose the newest
-                                    desired_ext = (os.path.splitext(filename)[1] or "").lower()
-                                    candidates = [
-                                        e for e in entries
-                                        if not e.get("is_dir")
-                                        and int(e.get("size") or 0) == len(content)
-                                        and str(e.get("name") or "").lower().endswith(desired_ext)
-                                    ]
-                                    # Sort by modified fields if present
-                                    def _modified_key(item):
-                                        return str(item.get("modified") or item.get("modified_time") or item.get("mtime") or "")
-                                    candidates.sort(key=_modified_key, reverse=True)
-                                    if candidates:
-                                        actual_name = candidates[0].get("name")
-                                        if actual_name:
-                                            # Build a working access URL with actual stored name (bypass template)
-                                            base_url = (self.access_domain or self.url).rstrip('/')
-                                            access_url_actual = f"{base_url}/d/{self.upload_path.strip('/')}/{actual_name}"
-                                            print(f"✅ Found stored file name '{actual_name}', returning: {access_url_actual}")
-                                            return access_url_actual
-                            except Exception as e:
-                                print(f"⚠️ Listing to detect actual file name failed: {e}")
+                        except Exception as e:
+                            logger.warning("Listing to detect actual file name failed: %s", e)
                     except Exception as e:
-                        print(f"⚠️ Post-upload URL resolution failed: {e}")
+                        logger.warning("Post-upload URL resolution failed: %s", e)
 
                     # Fallback to configured access URL using intended filename
                     access_url = self._get_access_url(filename)
-                    print(f"✅ Access URL: {access_url}")
+                    logger.info("Access URL: %s", access_url)
                     return access_url
                 else:
                     error_message = result.get('message', 'Unknown Alist error')
-                    print(f"❌ Alist API error (code {result.get('code')}): {error_message}")
+                    logger.warning("Alist API error (code %s): %s", result.get('code'), error_message)
                     raise Exception(f"Alist API error: {error_message}")
 
             except Exception as e:
-                print(f"❌ Unexpected error on attempt {attempt + 1}: {e}")
+                logger.warning("Unexpected error on attempt %s: %s", attempt + 1, e)
                 if attempt >= MAX_RETRIES:
                     import traceback
                     traceback.print_exc()
@@ -417,32 +422,44 @@ class AlistUploader(UploaderBase):
             "refresh": True
         }
         
-        print(f"🔄 Refreshing directory: {refresh_data['path']}")
+        logger.debug("Refreshing directory: %s", refresh_data['path'])
         
         try:
             response = await client.post(refresh_url, headers=headers, json=refresh_data)
             if response.status_code == 200:
                 result = response.json()
                 if result.get('code') == 200:
-                    print("✅ Directory refreshed successfully")
+                    logger.debug("Directory refreshed successfully")
                 else:
-                    print(f"⚠️ Directory refresh returned code {result.get('code')}: {result.get('message')}")
+                    logger.warning("Directory refresh returned code %s: %s", result.get('code'), result.get('message'))
             else:
-                print(f"⚠️ Directory refresh failed with HTTP {response.status_code}")
+                logger.warning("Directory refresh failed with HTTP %s", response.status_code)
         except Exception as e:
-            print(f"⚠️ Directory refresh exception: {e}")
+            logger.warning("Directory refresh exception: %s", e)
             # Don't fail the upload for refresh issues
 
-def get_uploader() -> UploaderBase:
+# App-scoped state, created in the lifespan hook (init_uploader) and closed on shutdown
+_http_client: Optional[httpx.AsyncClient] = None
+_uploader: Optional[UploaderBase] = None
+_uploader_settings: Optional[str] = None
+
+def get_http_client() -> httpx.AsyncClient:
     """
-    Factory function to get the configured uploader instance.
+    Get the shared keep-alive client used to talk to storage backends.
     
     Returns:
-        UploaderBase: The configured uploader instance
+        httpx.AsyncClient: Pooled client (HTTP/2 when h2 is installed)
     """
-    config = get_config()
-    provider = config.storage_provider
-    
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        )
+    return _http_client
+
+def _create_uploader(provider: str) -> UploaderBase:
     if provider == "local":
         return LocalUploader()
     elif provider == "alist":
@@ -450,6 +467,42 @@ def get_uploader() -> UploaderBase:
     else:
         raise ValueError(f"Unknown storage provider: {provider}")
 
+def get_uploader() -> UploaderBase:
+    """
+    Get the app-scoped uploader for the configured storage provider.
+    
+    The instance (and the Alist token it caches) is shared by all requests.
+    It is rebuilt when the storage settings change, e.g. after an admin
+    updates them.
+    
+    Returns:
+        UploaderBase: The configured uploader instance
+    """
+    global _uploader, _uploader_settings
+    config = get_config()
+    settings = json.dumps(config.get('storage', {}), sort_keys=True, default=str)
+    
+    if _uploader is None or settings != _uploader_settings:
+        _uploader = _create_uploader(config.storage_provider)
+        _uploader_settings = settings
+    return _uploader
+
+def init_uploader() -> None:
+    """Create the uploader at startup; a broken storage config only fails uploads."""
+    try:
+        get_uploader()
+    except ValueError as e:
+        logger.warning("Uploader not configured: %s", e)
+
+async def close_uploader() -> None:
+    """Close the shared HTTP client and drop the uploader (on app shutdown)."""
+    global _http_client, _uploader, _uploader_settings
+    _uploader = None
+    _uploader_settings = None
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 async def upload_avatar(file: UploadFile, user_id: int) -> str:
     """
     Upload user avatar with standardized filename.
@@ -0,0 +1,227 @@
+"""
+Shared fixtures: a throwaway SQLite database built with create_all() and
+run_migrations(), a small seeded campus, an async engine for calling
+crud_async directly, a test client for the API and the fake JWXT server.
+
+DATABASE_URL is pointed at a temporary file before any application
+module is imported, so the tests never touch schedule_app.db. Query
+budgets run in strict mode: a request over its route's budget raises
+QueryBudgetExceeded in the test that sent it.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="chronosync_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["QUERY_BUDGET_MODE"] = "strict"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# importer reads JWXT_BASE_URL at import time; the fake_jwxt fixture serves it
+FAKE_JWXT_PORT = _free_port()
+os.environ["JWXT_BASE_URL"] = f"http://127.0.0.1:{FAKE_JWXT_PORT}/jwglxt"
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+import metrics  # noqa: E402
+from auth import get_password_hash  # noqa: E402
+from database import ASYNC_DATABASE_URL, Base, SessionLocal, engine as db_engine  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from models import Schedule, Team, User, user_teams_table  # noqa: E402
+from services.event_ingest import ingest_events  # noqa: E402
+from utils import get_default_class_times  # noqa: E402
+
+TEST_PASSWORD = "password123"
+SEMESTER_START = date(2025, 9, 8)
+CAMPUS_USERS = 6
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """The application engine on a freshly created and migrated database."""
+    Base.metadata.create_all(bind=db_engine)
+    run_migrations(db_engine)
+    metrics.instrument_engine(db_engine)
+    return db_engine
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def async_engine(engine):
+    """
+    Async engine on the test database for calling crud_async directly.
+
+    Separate from the application's engine and without pooling, so each
+    asyncio.run() opens its own connections and nothing is shared with
+    the event loop of the test client.
+    """
+    test_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    metrics.instrument_engine(test_engine.sync_engine)
+    yield test_engine
+    asyncio.run(test_engine.dispose())
+
+
+@pytest.fixture
+def query_budget(engine):
+    """
+    metrics.query_budget() for code called outside a request:
+
+        with query_budget(5) as stats:
+            crud.create_recurring_event(db, event, schedule_id)
+
+    The block raises QueryBudgetExceeded on the first statement over the
+    limit; stats.queries holds the count afterwards.
+    """
+    return metrics.query_budget
+
+
+@pytest.fixture(scope="session")
+def fake_jwxt():
+    """The fake JWXT server from bench.fake_jwxt on JWXT_BASE_URL; yields its credentials."""
+    from bench import fake_jwxt as fake
+
+    server = fake.serve_in_thread(port=FAKE_JWXT_PORT)
+    yield {"password": fake.FAKE_PASSWORD, "captcha": fake.FAKE_CAPTCHA}
+    server.should_exit = True
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    """A TestClient on the application; the lifespan runs once for the whole session."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def login(client):
+    """Return a login(student_id) helper giving Authorization headers for that user."""
+    tokens = {}
+
+    def _login(student_id: str) -> dict:
+        if student_id not in tokens:
+            response = client.post("/api/auth/token", json={"student_id": student_id, "password": TEST_PASSWORD})
+            assert response.status_code == 200, response.text
+            tokens[student_id] = response.json()["access_token"]
+        return {"Authorization": f"Bearer {tokens[student_id]}"}
+
+    return _login
+
+
+def _week_courses(week_count: int = 16) -> list:
+    """A weekly timetable of four courses, expanded to one event per meeting."""
+    courses = [
+        ("高等数学", 1, (8, 20), (9, 55), "1-16周"),
+        ("大学英语", 2, (10, 10), (11, 45), "1-16周"),
+        ("数据结构", 3, (14, 0), (15, 35), "1-8周"),
+        ("操作系统", 5, (19, 0), (20, 30), "2-16周(双)"),
+    ]
+    events = []
+    for title, day_of_week, (start_h, start_m), (end_h, end_m), weeks in courses:
+        for week in range(1, week_count + 1):
+            day = SEMESTER_START + timedelta(weeks=week - 1, days=day_of_week - 1)
+            events.append({
+                "title": title,
+                "description": "教师:张老师",
+                "location": "文渊楼A101",
+                "start_time": datetime.combine(day, datetime.min.time()).replace(hour=start_h, minute=start_m),
+                "end_time": datetime.combine(day, datetime.min.time()).replace(hour=end_h, minute=end_m),
+                "day_of_week": day_of_week,
+                "weeks_input": weeks,
+                "weeks_display": weeks,
+            })
+    return events
+
+
+@pytest.fixture(scope="session")
+def campus(engine):
+    """
+    Seeded users (one admin), one semester schedule per student and a team
+    of all students.
+
+    Returns a dict with student_ids, user_ids, schedule_ids, team_id and the
+    admin's student_id. Tests that write should clean up after themselves or
+    use their own rows.
+    """
+    db = SessionLocal()
+    try:
+        hashed_password = get_password_hash(TEST_PASSWORD)
+        admin = User(student_id="testadmin", hashed_password=hashed_password, full_name="测试管理员",
+                     class_name="教务处", grade="2000", role="admin")
+        students = [
+            User(student_id=f"2023110{index:05d}", hashed_password=hashed_password, full_name=f"学生{index}",
+                 class_name="计工本2301", grade="2023")
+            for index in range(CAMPUS_USERS)
+        ]
+        db.add(admin)
+        db.add_all(students)
+        db.flush()
+
+        schedules = [
+            Schedule(name="2025-2026学年第一学期", owner_id=student.id, start_date=SEMESTER_START,
+                     total_weeks=20, class_times=get_default_class_times())
+            for student in students
+        ]
+        db.add_all(schedules)
+        db.flush()
+        for schedule in schedules:
+            ingest_events(db, schedule.id, _week_courses())
+
+        team = Team(name="测试小组", team_code=Team.generate_team_code(), creator_id=students[0].id)
+        db.add(team)
+        db.flush()
+        db.execute(insert(user_teams_table), [{"user_id": student.id, "team_id": team.id} for student in students])
+        db.commit()
+
+        return {
+            "student_ids": [student.student_id for student in students],
+            "user_ids": [student.id for student in students],
+            "schedule_ids": [schedule.id for schedule in schedules],
+            "team_id": team.id,
+            "admin": admin.student_id,
+        }
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def pair_team(client, login, campus):
+    """A team of two seeded students created by the last one; deleted afterwards."""
+    creator = login(campus["student_ids"][5])
+    team = client.post("/api/teams", json={"name": "空闲时间测试"}, headers=creator).json()
+    response = client.post("/api/me/teams/join", json={"team_code": team["team_code"]},
+                           headers=login(campus["student_ids"][0]))
+    assert response.status_code == 201
+    yield team["id"]
+    assert client.delete(f"/api/teams/{team['id']}", headers=creator).status_code in (200, 204)
@@ -0,0 +1,141 @@
+"""HOLIDAY / SWAP adjustment endpoints: request validation, undo and replay."""
+
+from datetime import timedelta
+
+import pytest
+
+from conftest import SEMESTER_START
+
+
+@pytest.mark.parametrize("body", [
+    {"adjustment_type": "SWAP", "holiday_date": "2025-10-01"},
+    {"adjustment_type": "HOLIDAY", "source_date": "2025-10-01", "target_date": "2025-10-02"},
+    {"adjustment_type": "MOVE", "holiday_date": "2025-10-01"},
+    {"holiday_date": "2025-10-01"},
+])
+def test_malformed_adjustment_is_422(client, login, campus, body):
+    response = client.post(f"/api/schedules/{campus['schedule_ids'][2]}/adjustments", json=body,
+                           headers=login(campus["student_ids"][2]))
+    assert response.status_code == 422
+
+
+def test_holiday_range_ending_before_start_is_400(client, login, campus):
+    response = client.post(f"/api/schedules/{campus['schedule_ids'][2]}/adjustments",
+                           json={"adjustment_type": "HOLIDAY", "holiday_date": "2025-10-07", "end_date": "2025-10-01"},
+                           headers=login(campus["student_ids"][2]))
+    assert response.status_code == 400
+
+
+def test_holiday_then_undo(client, login, campus):
+    headers = login(campus["student_ids"][2])
+    url = f"/api/schedules/{campus['schedule_ids'][2]}/adjustments"
+    response = client.post(url, json={"adjustment_type": "HOLIDAY", "holiday_date": "2025-09-29"}, headers=headers)
+    assert response.status_code == 201
+    body = response.json()
+    assert body["affected_events"] == 1
+
+    response = client.delete(f"{url}/{body['adjustment_id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["affected_events"] == 1
+    assert event_days(client, headers, campus["schedule_ids"][2], "2025-09-29", "2025-09-29") == [
+        ("2025-09-29", "高等数学")
+    ]
+
+
+def event_days(client, headers, schedule_id, date_from, date_to):
+    """(date, title) of the active events of a schedule within [date_from, date_to]."""
+    response = client.get(f"/api/schedules/{schedule_id}/events", params={"from": date_from, "to": date_to},
+                          headers=headers)
+    assert response.status_code == 200
+    return sorted((event["start_time"][:10], event["title"]) for event in response.json())
+
+
+def add_adjustment(client, headers, url, body):
+    response = client.post(url, json=body, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_undo_overlapping_holiday_keeps_remaining_holiday(client, login, campus):
+    headers = login(campus["student_ids"][3])
+    schedule_id = campus["schedule_ids"][3]
+    url = f"/api/schedules/{schedule_id}/adjustments"
+    week = add_adjustment(client, headers, url,
+                          {"adjustment_type": "HOLIDAY", "holiday_date": "2025-10-01", "end_date": "2025-10-07"})
+    assert week["affected_events"] == 4
+    inner = add_adjustment(client, headers, url, {"adjustment_type": "HOLIDAY", "holiday_date": "2025-10-03"})
+
+    response = client.delete(f"{url}/{week['adjustment_id']}", headers=headers)
+    assert response.status_code == 200
+    # 10-03 is still a holiday, so its course stays hidden
+    assert event_days(client, headers, schedule_id, "2025-10-01", "2025-10-07") == [
+        ("2025-10-01", "数据结构"), ("2025-10-06", "高等数学"), ("2025-10-07", "大学英语")
+    ]
+
+    assert client.delete(f"{url}/{inner['adjustment_id']}", headers=headers).status_code == 200
+    assert ("2025-10-03", "操作系统") in event_days(client, headers, schedule_id, "2025-10-03", "2025-10-03")
+
+
+def test_undo_swap_whose_override_was_moved_again(client, login, campus):
+    headers = login(campus["student_ids"][3])
+    schedule_id = campus["schedule_ids"][3]
+    url = f"/api/schedules/{schedule_id}/adjustments"
+    first = add_adjustment(client, headers, url,
+                           {"adjustment_type": "SWAP", "source_date": "2025-10-20", "target_date": "2025-10-25"})
+    second = add_adjustment(client, headers, url,
+                            {"adjustment_type": "SWAP", "source_date": "2025-10-25", "target_date": "2025-10-26"})
+    assert second["affected_events"] == 1
+    assert event_days(client, headers, schedule_id, "2025-10-20", "2025-10-26") == [
+        ("2025-10-21", "大学英语"), ("2025-10-22", "数据结构"), ("2025-10-24", "操作系统"), ("2025-10-26", "高等数学")
+    ]
+
+    # the second swap now finds nothing on 10-25 to move
+    response = client.delete(f"{url}/{first['adjustment_id']}", headers=headers)
+    assert response.status_code == 200
+    assert event_days(client, headers, schedule_id, "2025-10-20", "2025-10-26") == [
+        ("2025-10-20", "高等数学"), ("2025-10-21", "大学英语"), ("2025-10-22", "数据结构"), ("2025-10-24", "操作系统")
+    ]
+    assert client.delete(f"{url}/{second['adjustment_id']}", headers=headers).status_code == 200
+
+
+def test_replay_many_adjustments_within_query_budget(client, login, campus):
+    headers = login(campus["student_ids"][4])
+    schedule_id = campus["schedule_ids"][4]
+    url = f"/api/schedules/{schedule_id}/adjustments"
+    last_day = str(SEMESTER_START + timedelta(weeks=20))
+    created = [
+        add_adjustment(client, headers, url, {
+            "adjustment_type": "SWAP",
+            "source_date": str(SEMESTER_START + timedelta(weeks=week)),
+            "target_date": str(SEMESTER_START + timedelta(weeks=week, days=5)),
+        })
+        for week in range(16)
+    ] + [
+        add_adjustment(client, headers, url, {
+            "adjustment_type": "HOLIDAY",
+            "holiday_date": str(SEMESTER_START + timedelta(weeks=week, days=1)),
+        })
+        for week in range(4)
+    ]
+    before = event_days(client, headers, schedule_id, str(SEMESTER_START), last_day)
+    assert ("2025-09-13", "高等数学") in before and ("2025-09-08", "高等数学") not in before
+
+    # strict budgets in the test suite: replay must not issue statements per adjustment
+    response = client.post(f"{url}/replay", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["affected_events"] == sum(adjustment["affected_events"] for adjustment in created)
+    assert event_days(client, headers, schedule_id, str(SEMESTER_START), last_day) == before
+
+    for adjustment in reversed(created):
+        assert client.delete(f"{url}/{adjustment['adjustment_id']}", headers=headers).status_code == 200
+    assert len(event_days(client, headers, schedule_id, str(SEMESTER_START), last_day)) == 64
+
+
+@pytest.mark.parametrize("adjustment", [
+    {"adjustment_type": "SWAP", "holiday_date": "2025-10-01"},
+    {"adjustment_type": "MOVE", "holiday_date": "2025-10-01"},
+])
+def test_malformed_batch_adjustment_is_422(client, login, campus, adjustment):
+    response = client.post("/api/admin/adjustments/batch", json={"adjustments": [adjustment], "dry_run": True},
+                           headers=login(campus["admin"]))
+    assert response.status_code == 422
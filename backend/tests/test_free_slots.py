@@ -0,0 +1,86 @@
+"""Common free-time finder: period masks, free runs and GET /api/teams/{id}/free-slots."""
+
+from datetime import date, datetime
+
+import pytest
+
+from services.free_slots import build_period_grid, busy_intervals_by_day, day_mask, free_runs, merge_intervals
+from utils import get_default_class_times
+
+GRID = build_period_grid(get_default_class_times())
+WEEK_FROM, WEEK_TO = "2025-09-15", "2025-09-21"
+# free runs of the seeded timetable in week 2, longest first (see conftest._week_courses)
+WEEK_SLOTS = [
+    ("2025-09-18", 1, 10), ("2025-09-20", 1, 10), ("2025-09-21", 1, 10),
+    ("2025-09-15", 3, 10), ("2025-09-19", 1, 8), ("2025-09-16", 5, 10),
+    ("2025-09-17", 7, 10), ("2025-09-17", 1, 4), ("2025-09-16", 1, 2),
+]
+
+
+def minutes(clock: str) -> int:
+    hour, minute = map(int, clock.split(":"))
+    return hour * 60 + minute
+
+
+def busy_mask(*spans) -> int:
+    return day_mask(GRID, merge_intervals((minutes(start), minutes(end)) for start, end in spans))
+
+
+def test_period_grid_follows_class_times():
+    assert len(GRID) == 10
+    assert GRID[0] == (1, minutes("08:20"), minutes("09:05"))
+    assert GRID[-1] == (10, minutes("19:45"), minutes("20:30"))
+
+
+def test_merge_intervals_joins_touching_spans():
+    assert merge_intervals([(600, 660), (500, 550), (550, 560), (655, 700)]) == [(500, 560), (600, 700)]
+
+
+def test_busy_intervals_split_at_midnight():
+    by_day = busy_intervals_by_day(
+        [(datetime(2025, 9, 15, 22, 0), datetime(2025, 9, 16, 1, 30))], date(2025, 9, 15), date(2025, 9, 16)
+    )
+    assert by_day == {date(2025, 9, 15): [(22 * 60, 24 * 60)], date(2025, 9, 16): [(0, 90)]}
+
+
+def test_day_mask_marks_periods_and_gaps():
+    # periods 1-2 and the gap between them
+    assert busy_mask(("08:20", "09:55")) == 0b111
+    # the lunch break between periods 4 and 5 only
+    assert busy_mask(("12:00", "13:00")) == 1 << 7
+    # periods 9 and 10 follow each other without a gap
+    assert busy_mask(("19:00", "20:30")) == (1 << 16) | (1 << 18)
+
+
+@pytest.mark.parametrize("spans, min_periods, runs", [
+    ((), 1, [(0, 9)]),
+    ((("08:20", "09:55"),), 1, [(2, 9)]),
+    ((("10:10", "11:45"),), 1, [(0, 1), (4, 9)]),
+    ((("10:10", "11:45"),), 3, [(4, 9)]),
+    # a busy lunch break splits the day although no period is taken
+    ((("12:00", "13:00"),), 1, [(0, 3), (4, 9)]),
+    ((("12:00", "13:00"), ("19:00", "19:45")), 4, [(0, 3), (4, 7)]),
+    ((("12:00", "13:00"), ("19:00", "19:45")), 5, []),
+])
+def test_free_runs(spans, min_periods, runs):
+    assert free_runs(GRID, busy_mask(*spans), min_periods) == runs
+
+
+def free_slots(client, headers, team_id, **params):
+    response = client.get(f"/api/teams/{team_id}/free-slots",
+                          params={"from": WEEK_FROM, "to": WEEK_TO, "limit": 200, **params}, headers=headers)
+    assert response.status_code == 200
+    return [(slot["date"], slot["start_period"], slot["end_period"]) for slot in response.json()["slots"]]
+
+
+def test_team_free_slots(client, login, campus, pair_team):
+    headers = login(campus["student_ids"][5])
+    response = client.get(f"/api/teams/{pair_team}/free-slots", params={"from": WEEK_FROM, "to": WEEK_TO},
+                          headers=headers)
+    assert response.json()["member_count"] == 2
+    assert free_slots(client, headers, pair_team) == WEEK_SLOTS
+    assert free_slots(client, headers, pair_team, min_periods=3) == WEEK_SLOTS[:-1]
+    assert free_slots(client, headers, pair_team, min_periods=7) == WEEK_SLOTS[:5]
+    assert free_slots(client, headers, pair_team, weekdays="2,3", min_periods=1) == [
+        ("2025-09-16", 5, 10), ("2025-09-17", 7, 10), ("2025-09-17", 1, 4), ("2025-09-16", 1, 2),
+    ]
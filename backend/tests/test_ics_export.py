@@ -0,0 +1,50 @@
+"""ETag / If-None-Match handling of the schedule ICS export."""
+
+
+def test_export_etag_round_trip(client, login, campus):
+    headers = {**login(campus["student_ids"][1]), "Origin": "http://localhost:4321"}
+    url = f"/api/schedules/{campus['schedule_ids'][1]}/export.ics"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert "BEGIN:VCALENDAR" in response.text
+    etag = response.headers["ETag"]
+    # the ETag is only readable by the cross-origin frontend when CORS exposes it
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+    assert "etag" in exposed
+
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+UNBOUNDED_RRULE = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//test//test//EN",
+    "BEGIN:VEVENT",
+    "UID:unbounded@test",
+    "DTSTAMP:20250901T000000Z",
+    "DTSTART:20250908T082000",
+    "DTEND:20250908T095500",
+    "RRULE:FREQ=WEEKLY;COUNT={count}",
+    "SUMMARY:高等数学",
+    "END:VEVENT",
+    "END:VCALENDAR",
+    "",
+])
+
+
+def import_ics(client, headers, schedule_id, calendar):
+    return client.post("/api/schedules/import-ics", headers=headers, data={"schedule_id": str(schedule_id)},
+                       files={"file": ("schedule.ics", calendar.encode(), "text/calendar")})
+
+
+def test_import_rejects_recurrence_beyond_max_weeks(client, login, campus):
+    headers = login(campus["student_ids"][1])
+    response = import_ics(client, headers, campus["schedule_ids"][1], UNBOUNDED_RRULE.format(count=10_000_000))
+    assert response.status_code == 400
+    # nothing was stored
+    response = client.get(f"/api/schedules/{campus['schedule_ids'][1]}/events", params={"limit": 1000},
+                          headers=headers)
+    assert len(response.json()) == 64
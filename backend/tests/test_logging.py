@@ -0,0 +1,52 @@
+"""JSON log records written through the logging queue."""
+
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from logging_config import JsonFormatter, _DroppingQueueHandler
+
+
+def log_through_queue(formatter: logging.Formatter, emit) -> str:
+    output = io.StringIO()
+    stream_handler = logging.StreamHandler(output)
+    stream_handler.setFormatter(formatter)
+    queue_handler = _DroppingQueueHandler(queue.Queue())
+    listener = QueueListener(queue_handler.queue, stream_handler)
+
+    logger = logging.getLogger("tests.logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        emit(logger)
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+    return output.getvalue()
+
+
+def raise_and_log(logger: logging.Logger) -> None:
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("导入失败: 课表 %s", 7, extra={"schedule_id": 7})
+
+
+def test_exception_is_its_own_json_field():
+    payload = json.loads(log_through_queue(JsonFormatter(), raise_and_log))
+    assert payload["message"] == "导入失败: 课表 7"
+    assert payload["level"] == "ERROR"
+    assert payload["schedule_id"] == 7
+    assert payload["exc_info"].startswith("Traceback")
+    assert "ZeroDivisionError" in payload["exc_info"]
+
+
+def test_text_format_keeps_the_traceback():
+    lines = log_through_queue(logging.Formatter("%(levelname)s %(message)s"), raise_and_log).splitlines()
+    assert lines[0] == "ERROR 导入失败: 课表 7"
+    assert lines[1] == "Traceback (most recent call last):"
+    assert lines[-1].startswith("ZeroDivisionError")
@@ -0,0 +1,50 @@
+"""Per-user weekly occupancy bitmaps and their invalidation on event changes."""
+
+from datetime import date, datetime
+
+from models import WeeklyOccupancy
+from services.occupancy import build_week_masks, pack_week, unpack_day, week_starts
+from test_free_slots import GRID, WEEK_SLOTS, free_slots
+
+
+def test_week_masks_round_trip():
+    monday = date(2025, 9, 15)
+    assert week_starts(date(2025, 9, 17), date(2025, 9, 23)) == [monday, date(2025, 9, 22)]
+    packed = build_week_masks(GRID, [
+        (datetime(2025, 9, 15, 8, 20), datetime(2025, 9, 15, 9, 55)),
+        (datetime(2025, 9, 19, 19, 0), datetime(2025, 9, 19, 20, 30)),
+    ], [monday])[monday]
+    assert len(packed) == 28
+    week = int.from_bytes(packed, "little")
+    assert [unpack_day(week, weekday) for weekday in range(7)] == [
+        0b111, 0, 0, 0, (1 << 16) | (1 << 18), 0, 0
+    ]
+    assert pack_week([0b111, 0, 0, 0, (1 << 16) | (1 << 18), 0, 0]) == packed
+
+
+def test_event_changes_reach_the_next_free_slots_response(client, login, campus, pair_team, db):
+    headers = login(campus["student_ids"][5])
+    schedule_id = campus["schedule_ids"][5]
+    user_id = campus["user_ids"][5]
+    assert free_slots(client, headers, pair_team)[0] == ("2025-09-18", 1, 10)
+    assert db.query(WeeklyOccupancy).filter(WeeklyOccupancy.user_id == user_id).count() > 0
+
+    # one member is busy on Thursday afternoon
+    created = client.post(f"/api/schedules/{schedule_id}/events", headers=headers, json={
+        "title": "小组讨论", "start_time": "2025-09-18T14:00:00", "end_time": "2025-09-18T15:35:00",
+        "day_of_week": 4, "weeks_input": "2",
+    })
+    assert created.status_code == 201
+    event_id = created.json()[0]["id"]
+    thursday = [slot for slot in free_slots(client, headers, pair_team) if slot[0] == "2025-09-18"]
+    assert thursday == [("2025-09-18", 7, 10), ("2025-09-18", 1, 4)]
+
+    response = client.put(f"/api/schedules/{schedule_id}/events/{event_id}", headers=headers, json={
+        "start_time": "2025-09-18T19:00:00", "end_time": "2025-09-18T20:30:00",
+    })
+    assert response.status_code == 200
+    thursday = [slot for slot in free_slots(client, headers, pair_team) if slot[0] == "2025-09-18"]
+    assert thursday == [("2025-09-18", 1, 8)]
+
+    assert client.delete(f"/api/schedules/{schedule_id}/events/{event_id}", headers=headers).status_code == 200
+    assert free_slots(client, headers, pair_team) == WEEK_SLOTS
@@ -0,0 +1,276 @@
+"""
+Every route under QUERY_BUDGET_MODE=strict (set in conftest).
+
+Each test drives one router through its routes with a small data set; a
+route whose SQL statement count exceeds its QueryBudget raises
+QueryBudgetExceeded out of the test client. The last test checks that
+every route of the application was called, so a new route without a
+budget check here fails the suite.
+
+The N+1 regression tests at the end pin the statement counts of the
+three paths fixed together with the budgets.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.routing import APIRoute
+
+from sqlalchemy import text
+
+import crud
+import metrics
+from conftest import SEMESTER_START, TEST_PASSWORD
+from schemas import EventCreate
+
+# Routes that leave the test sandbox: the settings update rewrites
+# config.toml, the avatar upload writes into the storage backend and the
+# Alist test connects to an external server.
+NOT_CALLED = {
+    ("POST", "/api/admin/settings"),
+    ("POST", "/api/profile/upload-avatar"),
+    ("POST", "/api/admin/settings/test-alist"),
+}
+
+CLASS_TIMES = {"1": {"start": "08:20", "end": "09:05"}, "2": {"start": "09:10", "end": "09:55"}}
+
+
+class Api:
+    """Test client wrapper that records the route template of every call."""
+
+    def __init__(self, client):
+        self.client = client
+        self.called = set()
+
+    def __call__(self, method: str, route: str, expected: int = 200, headers=None, **kwargs):
+        self.called.add((method, route.split("?")[0]))
+        path_params = kwargs.pop("path", {})
+        response = self.client.request(method, route.format(**path_params), headers=headers, **kwargs)
+        assert response.status_code == expected, f"{method} {route}: {response.status_code} {response.text[:300]}"
+        return response
+
+
+@pytest.fixture(scope="module")
+def api(client):
+    return Api(client)
+
+
+def _register(api, student_id: str) -> dict:
+    api("POST", "/api/auth/register", 201, json={
+        "student_id": student_id, "password": TEST_PASSWORD,
+        "full_name": f"预算{student_id[-2:]}", "class_name": "计工本2302", "grade": "2023"
+    })
+    token = api("POST", "/api/auth/token", json={"student_id": student_id, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+@pytest.fixture(scope="module")
+def student(api):
+    return _register(api, "202312000001")
+
+
+@pytest.fixture(scope="module")
+def classmate(api):
+    return _register(api, "202312000002")
+
+
+@pytest.fixture(scope="module")
+def admin(login, campus):
+    return login(campus["admin"])
+
+
+def _event(day: date, weeks: str = "1-16", title: str = "高等数学") -> dict:
+    return {
+        "title": title, "location": "文渊楼A101", "instructor": "张老师", "day_of_week": day.isoweekday(),
+        "start_time": f"{day}T08:20:00", "end_time": f"{day}T09:55:00", "period": "1-2节", "weeks_input": weeks,
+    }
+
+
+def test_budgets_are_strict(db, query_budget):
+    assert metrics.QUERY_BUDGET_MODE == "strict"
+    with pytest.raises(metrics.QueryBudgetExceeded):
+        with query_budget(1):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 1"))
+
+
+def test_public_routes(api, engine):
+    api("GET", "/")
+    api("GET", "/health")
+    api("GET", "/metrics")
+
+
+def test_auth_routes(api, student):
+    assert api("GET", "/api/auth/users/me", headers=student).json()["student_id"] == "202312000001"
+
+
+def test_schedules_routes(api, student):
+    schedule = api("POST", "/api/schedules/", 201, headers=student, json={
+        "name": "预算课表", "start_date": str(SEMESTER_START), "total_weeks": 20, "class_times": CLASS_TIMES
+    }).json()
+    ids = {"schedule_id": schedule["id"]}
+    api("GET", "/api/schedules/", headers=student)
+    api("GET", "/api/schedules/{schedule_id}", headers=student, path=ids)
+    api("PUT", "/api/schedules/{schedule_id}", headers=student, path=ids, json={"name": "预算课表2"})
+
+    events = api("POST", "/api/schedules/{schedule_id}/events", 201, headers=student, path=ids,
+                 json=_event(SEMESTER_START)).json()
+    assert len(events) == 16
+    api("GET", "/api/schedules/{schedule_id}/events", headers=student, path=ids)
+    event_ids = {**ids, "event_id": events[-1]["id"]}
+    api("PUT", "/api/schedules/{schedule_id}/events/{event_id}", headers=student, path=event_ids,
+        json={"location": "文渊楼B202"})
+    api("DELETE", "/api/schedules/{schedule_id}/events/{event_id}", headers=student, path=event_ids)
+
+    api("GET", "/api/schedules/{schedule_id}/templates", headers=student, path=ids)
+    api("GET", "/api/schedules/{schedule_id}/occurrences", headers=student, path=ids,
+        params={"start_date": str(SEMESTER_START), "end_date": str(SEMESTER_START + timedelta(weeks=16))})
+
+    calendar = api("GET", "/api/schedules/{schedule_id}/export.ics", headers=student, path=ids).content
+    imported = api("POST", "/api/schedules/import-ics", headers=student, data={"schedule_id": str(schedule["id"])},
+                   files={"file": ("schedule.ics", calendar, "text/calendar")}).json()
+    assert imported["count"] > 0
+
+    holiday = SEMESTER_START + timedelta(weeks=4)
+    adjustment = api("POST", "/api/schedules/{schedule_id}/adjustments", 201, headers=student, path=ids, json={
+        "adjustment_type": "HOLIDAY", "holiday_date": str(holiday), "end_date": str(holiday + timedelta(days=6))
+    }).json()
+    api("POST", "/api/schedules/{schedule_id}/adjustments", 201, headers=student, path=ids, json={
+        "adjustment_type": "SWAP", "source_date": str(SEMESTER_START + timedelta(weeks=5)),
+        "target_date": str(SEMESTER_START + timedelta(weeks=5, days=5))
+    })
+    api("GET", "/api/schedules/{schedule_id}/adjustments", headers=student, path=ids)
+    api("POST", "/api/schedules/{schedule_id}/adjustments/replay", headers=student, path=ids)
+    api("DELETE", "/api/schedules/{schedule_id}/adjustments/{adjustment_id}", headers=student,
+        path={**ids, "adjustment_id": adjustment["adjustment_id"]})
+
+    api("DELETE", "/api/schedules/{schedule_id}", headers=student, path=ids)
+
+
+def test_personal_schedule_routes(api, student):
+    events = api("POST", "/api/schedule/", headers=student, json=_event(SEMESTER_START + timedelta(days=2))).json()
+    assert len(events) == 16
+    first_day = events[0]["start_time"][:10]
+    assert len(api("GET", "/api/schedule/", headers=student, params={"from": first_day, "to": first_day}).json()) == 1
+    event_id = {"event_id": events[-1]["id"]}
+    api("PUT", "/api/schedule/{event_id}", headers=student, path=event_id, json={"title": "高等数学（习题）"})
+    api("DELETE", "/api/schedule/{event_id}", headers=student, path=event_id)
+    api("GET", "/api/schedule/export/ics", headers=student)
+
+
+def test_team_routes(api, student, classmate, admin):
+    team = api("POST", "/api/teams", 201, headers=student, json={"name": "预算小组"}).json()
+    ids = {"team_id": team["id"]}
+    api("GET", "/api/teams/{team_id}", headers=student, path=ids)
+    api("PUT", "/api/teams/{team_id}", headers=student, path=ids, json={"name": "预算小组2"})
+    api("POST", "/api/me/teams/join", 201, headers=classmate, json={"team_code": team["team_code"]})
+    api("GET", "/api/me/teams", headers=classmate)
+    api("POST", "/api/me/teams/{team_id}/leave", 204, headers=classmate, path=ids)
+    api("POST", "/api/teams/{team_id}/members", 201, headers=student, path=ids, json={"student_id": "202312000002"})
+
+    week = {"from": str(SEMESTER_START), "to": str(SEMESTER_START + timedelta(days=6))}
+    api("GET", "/api/teams/{team_id}/schedules", headers=student, path=ids)
+    api("GET", "/api/teams/{team_id}/timetable", headers=student, path=ids, params=week)
+    api("GET", "/api/teams/{team_id}/free-slots", headers=student, path=ids, params=week)
+    api("GET", "/api/schedule/filtered", headers=student, params={
+        "start_date": week["from"], "end_date": week["to"], "team_ids": str(team["id"])
+    })
+    api("GET", "/api/admin/teams", headers=admin)
+
+    classmate_id = api("GET", "/api/auth/users/me", headers=classmate).json()["id"]
+    api("POST", "/api/teams/{team_id}/transfer", headers=student, path=ids, json={"new_creator_id": classmate_id})
+    student_id = api("GET", "/api/auth/users/me", headers=student).json()["id"]
+    api("DELETE", "/api/teams/{team_id}/members/{user_id}", 204, headers=classmate,
+        path={**ids, "user_id": student_id})
+    api("DELETE", "/api/teams/{team_id}", headers=classmate, path=ids)
+
+
+def test_profile_routes(api, classmate):
+    api("GET", "/api/profile/", headers=classmate)
+    api("PUT", "/api/profile/", headers=classmate, json={"full_name": "预算同学"})
+    api("POST", "/api/profile/avatar", headers=classmate, json={"avatar_url": "https://example.com/a.png"})
+    api("POST", "/api/profile/change-password", headers=classmate,
+        json={"current_password": TEST_PASSWORD, "new_password": TEST_PASSWORD})
+    api("GET", "/api/profile/statistics", headers=classmate)
+
+
+def test_admin_routes(api, admin, campus):
+    api("GET", "/api/admin/users", headers=admin)
+    user = api("POST", "/api/admin/users", headers=admin, json={
+        "student_id": "202312000003", "password": TEST_PASSWORD, "full_name": "预算三",
+        "class_name": "计工本2302", "grade": "2023"
+    }).json()
+    user_id = {"user_id": user["id"]}
+    api("PUT", "/api/admin/users/{user_id}", headers=admin, path=user_id, json={"class_name": "计工本2303"})
+    api("GET", "/api/admin/principal-cache/stats", headers=admin)
+
+    event = api("POST", "/api/admin/schedule/{user_id}", headers=admin, path=user_id,
+                json=_event(SEMESTER_START, weeks="")).json()
+    event_id = {"event_id": event["id"]}
+    api("PUT", "/api/admin/schedule/{event_id}", headers=admin, path=event_id, json={"title": "补课"})
+    api("DELETE", "/api/admin/schedule/{event_id}", headers=admin, path=event_id)
+    api("DELETE", "/api/admin/users/{user_id}", headers=admin, path=user_id)
+
+    holiday = SEMESTER_START + timedelta(weeks=6)
+    job = api("POST", "/api/admin/adjustments/batch", 202, headers=admin, json={
+        "adjustments": [{"adjustment_type": "HOLIDAY", "holiday_date": str(holiday)}],
+        "schedule_ids": campus["schedule_ids"], "dry_run": True
+    }).json()
+    api("GET", "/api/admin/adjustments/jobs", headers=admin)
+    assert api("GET", "/api/admin/adjustments/jobs/{job_id}", headers=admin,
+               path={"job_id": job["id"]}).json()["status"] == "completed"
+    api("GET", "/api/admin/settings", headers=admin)
+
+
+def test_import_routes(api, student, admin, fake_jwxt):
+    session = api("GET", "/api/import/zfw/session").json()
+    session = api("GET", "/api/import/zfw/refresh/{session_id}", path={"session_id": session["session_id"]}).json()
+    api("GET", "/api/import/zfw/sessions/stats", headers=admin)
+    result = api("POST", "/api/import/zfw", headers=student, json={
+        "session_id": session["session_id"], "username": "202312000001", "password": fake_jwxt["password"],
+        "captcha": fake_jwxt["captcha"], "schedule_name": "导入课表", "start_date": str(SEMESTER_START)
+    }).json()
+    assert result["success"] and result["imported_count"] > 0
+    api("GET", "/api/import/schedules", headers=student)
+
+
+def test_every_route_is_called(api, client):
+    routes = {
+        (method, route.path)
+        for route in client.app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    assert routes - NOT_CALLED - api.called == set()
+
+
+# N+1 regressions: the statement count must not grow with the number of rows
+
+def test_create_recurring_event_is_not_n_plus_one(db, campus, query_budget):
+    counts = {}
+    for weeks, expected in (("1-2", 2), ("1-16", 16)):
+        event = EventCreate(**_event(SEMESTER_START, weeks=weeks))
+        with query_budget(6) as stats:
+            created = crud.create_recurring_event(db, event, campus["schedule_ids"][3])
+        assert len(created) == expected
+        counts[weeks] = stats.queries
+    assert counts["1-2"] == counts["1-16"]
+
+
+def test_create_my_event_many_weeks_fits_budget(api, classmate):
+    # the route budget (10) would be exceeded by one reload per week
+    events = api("POST", "/api/schedule/", headers=classmate, json=_event(SEMESTER_START, weeks="1-20")).json()
+    assert len(events) == 20
+
+
+def test_filtered_team_membership_is_one_query(api, login, campus):
+    headers = login(campus["student_ids"][4])
+    team_ids = [
+        api("POST", "/api/teams", 201, headers=headers, json={"name": f"成员检查{index}"}).json()["id"]
+        for index in range(12)
+    ]
+    # one membership check per team would exceed the route budget (10)
+    response = api("GET", "/api/schedule/filtered", headers=headers, params={
+        "start_date": str(SEMESTER_START), "end_date": str(SEMESTER_START + timedelta(days=6)),
+        "team_ids": ",".join(str(team_id) for team_id in team_ids + [campus["team_id"]])
+    })
+    assert response.json()
@@ -0,0 +1,108 @@
+"""
+EXPLAIN QUERY PLAN regression tests for the event hot paths.
+
+Each test runs the real query function against the migrated test
+database, captures the SQL it sends and asserts that SQLite reaches the
+events table through an index: no plan row may be a full "SCAN events".
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud_async
+from conftest import SEMESTER_START
+from services.adjustments import apply_holiday
+
+WEEK_FROM = SEMESTER_START + timedelta(weeks=3)
+WEEK_TO = WEEK_FROM + timedelta(days=6)
+
+
+@contextmanager
+def captured_statements(target_engine):
+    """Record (statement, parameters) of everything executed on target_engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(target_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def query_plan(engine, statement, parameters) -> list:
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def assert_no_events_scan(engine, statements) -> None:
+    event_statements = [(statement, parameters) for statement, parameters in statements if " events" in statement]
+    assert event_statements, "no statement touched the events table"
+    for statement, parameters in event_statements:
+        plan = query_plan(engine, statement, parameters)
+        scans = [detail for detail in plan if detail.startswith("SCAN events")]
+        assert not scans, f"full scan of events:\n{statement}\n{plan}"
+
+
+def run_async_query(async_engine, query):
+    """Run query(session) on a fresh AsyncSession and return the captured statements."""
+    async def _main():
+        async with AsyncSession(async_engine) as session:
+            return await query(session)
+
+    with captured_statements(async_engine.sync_engine) as statements:
+        asyncio.run(_main())
+    return statements
+
+
+def test_user_events_window_uses_index(engine, campus, async_engine):
+    statements = run_async_query(async_engine, lambda session: crud_async.get_user_events(
+        session, campus["user_ids"][0], limit=500, date_from=WEEK_FROM, date_to=WEEK_TO
+    ))
+    assert_no_events_scan(engine, statements)
+
+
+def test_user_events_unbounded_uses_index(engine, campus, async_engine):
+    statements = run_async_query(async_engine, lambda session: crud_async.get_user_events(
+        session, campus["user_ids"][0], limit=500
+    ))
+    assert_no_events_scan(engine, statements)
+
+
+def test_schedule_events_uses_index(engine, campus, async_engine):
+    statements = run_async_query(async_engine, lambda session: crud_async.get_schedule_events(
+        session, campus["schedule_ids"][0], limit=500, date_from=WEEK_FROM, date_to=WEEK_TO
+    ))
+    assert_no_events_scan(engine, statements)
+
+
+def test_team_schedules_events_uses_index(engine, campus, async_engine):
+    statements = run_async_query(async_engine, lambda session: crud_async.get_team_schedules_events(
+        session, campus["team_id"]
+    ))
+    assert_no_events_scan(engine, statements)
+
+
+def test_team_busy_spans_uses_index(engine, campus, async_engine):
+    statements = run_async_query(async_engine, lambda session: crud_async.get_busy_spans_by_owner(
+        session, campus["user_ids"], WEEK_FROM, WEEK_TO
+    ))
+    assert_no_events_scan(engine, statements)
+
+
+def test_holiday_update_uses_index(engine, campus, db):
+    holiday = SEMESTER_START + timedelta(weeks=4)
+    with captured_statements(engine) as statements:
+        result = apply_holiday(db, campus["schedule_ids"], holiday, holiday + timedelta(days=6))
+    db.rollback()
+
+    assert result["affected_events"] > 0
+    updates = [(statement, parameters) for statement, parameters in statements if statement.startswith("UPDATE events")]
+    assert updates, "apply_holiday issued no UPDATE on events"
+    assert_no_events_scan(engine, updates)
@@ -0,0 +1,50 @@
+"""GET /api/schedules/{id}/events parameter validation and filtering."""
+
+import pytest
+
+from weekset import MAX_WEEK
+
+
+@pytest.mark.parametrize("week", [-1, 0, MAX_WEEK + 1, 100])
+def test_out_of_range_week_is_422(client, login, campus, week):
+    response = client.get(f"/api/schedules/{campus['schedule_ids'][0]}/events", params={"week": week},
+                          headers=login(campus["student_ids"][0]))
+    assert response.status_code == 422
+
+
+def test_week_filter(client, login, campus):
+    response = client.get(f"/api/schedules/{campus['schedule_ids'][0]}/events", params={"week": 2},
+                          headers=login(campus["student_ids"][0]))
+    assert response.status_code == 200
+    events = response.json()
+    # week 2 of a semester starting 2025-09-08 is 09-15..09-21, one meeting per course
+    assert sorted(event["start_time"][:10] for event in events) == [
+        "2025-09-15", "2025-09-16", "2025-09-17", "2025-09-19"
+    ]
+    assert {event["title"] for event in events} == {"高等数学", "大学英语", "数据结构", "操作系统"}
+
+
+def test_week_filter_intersects_date_window(client, login, campus):
+    response = client.get(f"/api/schedules/{campus['schedule_ids'][0]}/events",
+                          params={"week": 2, "from": "2025-09-17"},
+                          headers=login(campus["student_ids"][0]))
+    assert response.status_code == 200
+    assert sorted(event["start_time"][:10] for event in response.json()) == ["2025-09-17", "2025-09-19"]
+
+
+def test_date_window(client, login, campus):
+    response = client.get(f"/api/schedules/{campus['schedule_ids'][0]}/events",
+                          params={"from": "2025-09-15", "to": "2025-09-21"},
+                          headers=login(campus["student_ids"][0]))
+    assert response.status_code == 200
+    assert {event["start_time"][:10] for event in response.json()} <= {f"2025-09-{day}" for day in range(15, 22)}
+    assert len(response.json()) == 4
+
+
+def test_cursor_header_is_exposed_to_cross_origin_scripts(client, login, campus):
+    headers = {**login(campus["student_ids"][0]), "Origin": "http://localhost:4321"}
+    response = client.get("/api/schedule/", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+    assert "x-next-cursor" in exposed
@@ -0,0 +1,62 @@
+"""Alist uploader against a mock transport: token caching across concurrent uploads."""
+
+import asyncio
+import io
+import json
+
+import httpx
+from fastapi import UploadFile
+
+from config import Config
+from services import uploader_service
+
+ALIST_CONFIG = {
+    "storage": {
+        "alist": {
+            "url": "http://alist.test",
+            "version": 3,
+            "username": "uploader",
+            "password": "secret",
+            "upload_path": "avatars",
+        }
+    }
+}
+
+
+def alist_config() -> Config:
+    config = Config.__new__(Config)
+    config.config_path = ""
+    config._config = ALIST_CONFIG
+    return config
+
+
+def test_concurrent_uploads_share_one_login(monkeypatch):
+    monkeypatch.setattr(uploader_service, "get_config", alist_config)
+    calls = {"login": 0, "put": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/auth/login":
+            calls["login"] += 1
+            # a slow login: the other uploads queue up for the same token meanwhile
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"code": 200, "data": {"token": "token-1"}})
+        if request.url.path == "/api/fs/put":
+            calls["put"].append(request.headers["Authorization"])
+            return httpx.Response(200, json={"code": 200})
+        if request.url.path == "/api/fs/get":
+            path = json.loads(request.content)["path"]
+            return httpx.Response(200, json={"code": 200, "data": {"name": path.rsplit("/", 1)[-1]}})
+        return httpx.Response(200, json={"code": 200, "data": {"content": []}})
+
+    async def upload_all():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            uploader = uploader_service.AlistUploader(client=client)
+            return await asyncio.gather(*(
+                uploader.upload(UploadFile(file=io.BytesIO(b"avatar"), filename="a.png"), filename=f"user-{index}.png")
+                for index in range(8)
+            ))
+
+    urls = asyncio.run(upload_all())
+    assert calls["login"] == 1
+    assert calls["put"] == ["token-1"] * 8
+    assert urls == [f"http://alist.test/d/avatars/user-{index}.png" for index in range(8)]
@@ -0,0 +1,21 @@
+import pytest
+
+from models import Event
+from weekset import MAX_WEEK, WeekSet, has_week
+
+
+def test_has_week_rejects_out_of_range_weeks():
+    for week in (-1, 0, MAX_WEEK + 1, 100):
+        with pytest.raises(ValueError):
+            has_week(Event.week_mask, week)
+
+
+def test_has_week_accepts_bounds():
+    has_week(Event.week_mask, 1)
+    has_week(Event.week_mask, MAX_WEEK)
+
+
+def test_parse_and_display_round_trip():
+    weeks = WeekSet.parse("1-8,10,12-16")
+    assert 10 in weeks and 9 not in weeks
+    assert weeks.to_display() == "1-8,10,12-16"
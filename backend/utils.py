@@ -3,7 +3,18 @@ Utility functions for the schedule management system
 """
 
 import re
-from typing import List
+import base64
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+
+# 周数字符串清理用的正则，预先编译
+_FULLWIDTH_PAREN_RE = re.compile(r'（.*?）')
+_PAREN_RE = re.compile(r'\(.*?\)')
+_WEEK_WORDS_RE = re.compile(r'[周第等上下单双（）()]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_NON_WEEK_CHARS_RE = re.compile(r'[^0-9,\-]')
 
 
 def parse_weeks(week_string: str) -> List[int]:
@@ -25,6 +36,36 @@ def parse_weeks(week_string: str) -> List[int]:
     if not week_string or not week_string.strip():
         return []
     
+    # 解析结果有缓存，返回副本避免调用方修改缓存
+    return list(_parse_weeks_cached(week_string))
+
+
+def parse_week_mask(week_string: str) -> int:
+    """
+    解析周数字符串为位图（第 n 周对应 1 << n），结果有缓存
+    
+    Args:
+        week_string: 与 parse_weeks 相同格式的周数字符串
+    
+    Returns:
+        int: 周数位图
+    """
+    if not week_string or not week_string.strip():
+        return 0
+    
+    return _parse_week_mask_cached(week_string)
+
+
+@lru_cache(maxsize=4096)
+def _parse_week_mask_cached(week_string: str) -> int:
+    mask = 0
+    for week in _parse_weeks_cached(week_string):
+        mask |= 1 << week
+    return mask
+
+
+@lru_cache(maxsize=4096)
+def _parse_weeks_cached(week_string: str) -> Tuple[int, ...]:
     # 清理字符串：移除中文字符和替换各种破折号
     cleaned = week_string.strip()
 
@@ -37,23 +78,23 @@ def parse_weeks(week_string: str) -> List[int]:
                .replace('~', '-'))
 
     # 去除中文括号及其中内容（例如“(单)”“（双）”）
-    cleaned = re.sub(r'（.*?）', '', cleaned)
-    cleaned = re.sub(r'\(.*?\)', '', cleaned)
+    cleaned = _FULLWIDTH_PAREN_RE.sub('', cleaned)
+    cleaned = _PAREN_RE.sub('', cleaned)
 
     # 移除常见中文词汇（如“第”“周”“等”）
-    cleaned = re.sub(r'[周第等上下单双（）()]', '', cleaned)
+    cleaned = _WEEK_WORDS_RE.sub('', cleaned)
 
     # 移除空白字符
-    cleaned = re.sub(r'\s+', '', cleaned)
+    cleaned = _WHITESPACE_RE.sub('', cleaned)
 
     # 仅保留数字、逗号和连字符，其他全部去除
-    cleaned = re.sub(r'[^0-9,\-]', '', cleaned)
+    cleaned = _NON_WEEK_CHARS_RE.sub('', cleaned)
 
     # 移除首尾逗号
     cleaned = cleaned.strip(',')
     
     if not cleaned:
-        return []
+        return ()
     
     weeks = []
     
@@ -89,7 +130,7 @@ def parse_weeks(week_string: str) -> List[int]:
                 continue
     
     # 去重并排序
-    return sorted(list(set(weeks)))
+    return tuple(sorted(set(weeks)))
 
 
 def get_default_class_times() -> dict:
@@ -142,3 +183,37 @@ def parse_period_to_class_numbers(period_str: str) -> List[int]:
             return [int(period_str.strip())]
         except ValueError:
             return []
+
+
+def encode_event_cursor(start_time: datetime, event_id: int) -> str:
+    """
+    将事件的排序键 (start_time, id) 编码为不透明的分页游标
+    
+    Args:
+        start_time: 最后一个事件的开始时间
+        event_id: 最后一个事件的ID
+    
+    Returns:
+        str: URL 安全的游标字符串
+    """
+    raw = f"{start_time.isoformat()}|{event_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_event_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """
+    解析分页游标，无效游标返回 None
+    
+    Args:
+        cursor: encode_event_cursor 生成的游标
+    
+    Returns:
+        Optional[Tuple[datetime, int]]: (start_time, id)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        start_str, id_str = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start_str), int(id_str)
+    except (ValueError, UnicodeError):
+        return None
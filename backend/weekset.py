@@ -0,0 +1,122 @@
+"""
+Week-set bitmask value type.
+
+A WeekSet is an int where bit n is set when the course meets in week n,
+so union / intersection are single integer operations and the value can
+be stored in an INTEGER column and filtered with SQL bitwise operators.
+"""
+
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+from utils import parse_week_mask
+
+# SQLite INTEGER is a signed 64-bit value
+MAX_WEEK = 62
+
+
+class WeekSet(int):
+    """Immutable set of week numbers backed by an integer bitmask."""
+
+    def __new__(cls, mask: int = 0):
+        return super().__new__(cls, mask)
+
+    @classmethod
+    def from_weeks(cls, weeks: Iterable[int]) -> "WeekSet":
+        """从周数列表构建，超出范围的周数被忽略"""
+        mask = 0
+        for week in weeks:
+            if 1 <= week <= MAX_WEEK:
+                mask |= 1 << week
+        return cls(mask)
+
+    @classmethod
+    def parse(cls, week_string: str) -> "WeekSet":
+        """解析旧格式的周数字符串（如 "1,4-6"、"1-16周"），结果有缓存"""
+        return cls(parse_week_mask(week_string or ""))
+
+    def __contains__(self, week: int) -> bool:
+        return 1 <= week <= MAX_WEEK and bool(int(self) >> week & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        mask = int(self)
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
+    def __len__(self) -> int:
+        return bin(self).count("1")
+
+    def __or__(self, other: int) -> "WeekSet":
+        return WeekSet(int(self) | int(other))
+
+    def __and__(self, other: int) -> "WeekSet":
+        return WeekSet(int(self) & int(other))
+
+    def __xor__(self, other: int) -> "WeekSet":
+        return WeekSet(int(self) ^ int(other))
+
+    def __sub__(self, other: int) -> "WeekSet":
+        return WeekSet(int(self) & ~int(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+
+    def union(self, other: int) -> "WeekSet":
+        return self | other
+
+    def intersection(self, other: int) -> "WeekSet":
+        return self & other
+
+    def difference(self, other: int) -> "WeekSet":
+        return self - other
+
+    def weeks(self) -> List[int]:
+        """返回升序的周数列表"""
+        return list(self)
+
+    def to_display(self) -> str:
+        """压缩为区间字符串，如 "1-8,10,12-16" """
+        parts = []
+        run_start = previous = None
+        for week in self:
+            if previous is not None and week == previous + 1:
+                previous = week
+                continue
+            if run_start is not None:
+                parts.append(str(run_start) if run_start == previous else f"{run_start}-{previous}")
+            run_start = previous = week
+        if run_start is not None:
+            parts.append(str(run_start) if run_start == previous else f"{run_start}-{previous}")
+        return ",".join(parts)
+
+    def __repr__(self) -> str:
+        return f"WeekSet('{self.to_display()}')"
+
+
+class WeekSetType(TypeDecorator):
+    """Store a WeekSet in an INTEGER column."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else WeekSet(value)
+
+
+def has_week(column, week: int):
+    """SQL 条件：位图中包含第 week 周；week 超出 1..MAX_WEEK 时抛出 ValueError"""
+    if not 1 <= week <= MAX_WEEK:
+        raise ValueError(f"week must be between 1 and {MAX_WEEK}, got {week}")
+    return column.op("&")(1 << week) != 0
+
+
+def overlaps_weeks(column, weeks: WeekSet):
+    """SQL 条件：位图与给定周集合有交集"""
+    return column.op("&")(int(weeks)) != 0
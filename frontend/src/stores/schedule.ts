@@ -1,7 +1,8 @@
 import { defineStore } from 'pinia'
 import { ref, computed, watch } from 'vue'
 import { apiClient } from '../utils/api'
-import type { ScheduleResponse, ScheduleCreate, ScheduleUpdate, Event, CreateEventRequest, UpdateEventRequest, CalendarViewMode, FilterState } from '../types'
+import { formatLocalDate, getCalendarDays, getWeekEnd, getWeekStart } from '../utils/date'
+import type { ScheduleResponse, ScheduleCreate, ScheduleUpdate, Event, CreateEventRequest, UpdateEventRequest, CalendarViewMode, FilterState, DateWindow } from '../types'
 
 export const useScheduleStore = defineStore('schedule', () => {
   // State
@@ -14,6 +15,10 @@ export const useScheduleStore = defineStore('schedule', () => {
   const currentMyEvents = ref<Event[]>([])
   const eventsLoading = ref(false)
   const eventsError = ref<string | null>(null)
+  // currentMyEvents 覆盖的日期窗口，视图移出该窗口时重新加载
+  const loadedWindow = ref<DateWindow | null>(null)
+  // 最近一次事件请求的序号，较早请求的响应到达时直接丢弃
+  let myEventsRequestId = 0
   
   // Team view filtered events
   const filteredEvents = ref<Event[]>([])
@@ -153,7 +158,10 @@ export const useScheduleStore = defineStore('schedule', () => {
         fetchMyEvents()
       } else {
         localStorage.removeItem('activeScheduleId')
+        myEventsRequestId++
         currentMyEvents.value = []
+        eventsLoading.value = false
+        loadedWindow.value = null
       }
     }
   }
@@ -175,23 +183,43 @@ export const useScheduleStore = defineStore('schedule', () => {
     filteredEvents.value = []
     filteredEventsLoading.value = false
     filteredEventsError.value = null
+    myEventsRequestId++
+    loadedWindow.value = null
     localStorage.removeItem('activeScheduleId')
   }
   
+  // 当前视图显示的日期范围：周视图为周一到周日，月视图为整个月历网格
+  function viewWindow(): DateWindow {
+    const date = viewMode.value.date
+    if (viewMode.value.type === 'month') {
+      const days = getCalendarDays(date)
+      return { from: formatLocalDate(days[0]), to: formatLocalDate(days[days.length - 1]) }
+    }
+    return { from: formatLocalDate(getWeekStart(date)), to: formatLocalDate(getWeekEnd(date)) }
+  }
+
   // Event management functions
   async function fetchMyEvents() {
+    const requestId = ++myEventsRequestId
     eventsLoading.value = true
     eventsError.value = null
 
     try {
-      // 使用个人课表API而不是多课表API
-      const events = await apiClient.getMyEvents()
+      // 使用个人课表API而不是多课表API，只取当前视图的日期窗口
+      const range = viewWindow()
+      const events = await apiClient.getMyEvents(range)
+      // 快速翻页时多个请求可能乱序返回，只采用最后一次请求的结果
+      if (requestId !== myEventsRequestId) return
       currentMyEvents.value = events
+      loadedWindow.value = range
     } catch (err: any) {
+      if (requestId !== myEventsRequestId) return
       eventsError.value = err.response?.data?.detail || '获取事件失败'
       console.error('Failed to fetch events:', err)
     } finally {
-      eventsLoading.value = false
+      if (requestId === myEventsRequestId) {
+        eventsLoading.value = false
+      }
     }
   }
 
@@ -269,6 +297,16 @@ export const useScheduleStore = defineStore('schedule', () => {
   function setViewMode(mode: CalendarViewMode) {
     viewMode.value = mode
   }
+
+  // 切换周/月或翻页后，视图超出已加载的窗口时重新获取事件
+  watch(viewMode, () => {
+    if (!activeScheduleId.value) return
+    const range = viewWindow()
+    const loaded = loadedWindow.value
+    if (!loaded || range.from < loaded.from || range.to > loaded.to) {
+      fetchMyEvents()
+    }
+  })
   
   // Team view methods
   async function fetchFilteredEvents() {
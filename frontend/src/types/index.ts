@@ -151,6 +151,12 @@ export interface UpdateEventRequest {
   weeks_input?: string;
 }
 
+// 事件列表接口的日期窗口（YYYY-MM-DD，首尾均包含）
+export interface DateWindow {
+  from: string;
+  to: string;
+}
+
 export interface ScheduleFilter {
   start_date: string;
   end_date: string;
@@ -203,6 +209,7 @@ export interface ScheduleAdjustment {
   schedule_id: number;
   adjustment_type: 'HOLIDAY' | 'SWAP';
   original_date: string;
+  end_date?: string;
   target_date?: string;
   created_at: string;
 }
@@ -9,6 +9,7 @@ import type {
   CreateEventRequest,
   UpdateEventRequest,
   ScheduleFilter,
+  DateWindow,
   ScheduleResponse,
   ScheduleCreate,
   ScheduleUpdate,
@@ -110,8 +111,8 @@ class ApiClient {
   }
 
   // Personal schedule endpoints
-  async getMyEvents(): Promise<Event[]> {
-    const response = await axios.get('/api/schedule/');
+  async getMyEvents(window?: DateWindow): Promise<Event[]> {
+    const response = await axios.get('/api/schedule/', { params: window });
     return response.data;
   }
 
@@ -262,8 +263,8 @@ class ApiClient {
     await axios.delete(`/api/schedules/${scheduleId}`);
   }
 
-  async getScheduleEvents(scheduleId: number): Promise<Event[]> {
-    const response = await axios.get(`/api/schedules/${scheduleId}/events`);
+  async getScheduleEvents(scheduleId: number, window?: DateWindow): Promise<Event[]> {
+    const response = await axios.get(`/api/schedules/${scheduleId}/events`, { params: window });
     return response.data;
   }
 
@@ -22,6 +22,19 @@ export function formatDateChinese(date: Date | string): string {
   return `${year}年${month}月${day}日`;
 }
 
+// 按本地时区返回 YYYY-MM-DD，用于接口的 from/to 日期参数
+export function formatLocalDate(date: Date | string): string {
+  const d = new Date(date);
+  if (isNaN(d.getTime())) {
+    return '';
+  }
+  const year = d.getFullYear();
+  const month = String(d.getMonth() + 1).padStart(2, '0');
+  const day = String(d.getDate()).padStart(2, '0');
+
+  return `${year}-${month}-${day}`;
+}
+
 // 返回纯数字格式 YYYYMMDD，用于文件名等场景
 export function formatDatePlain(date: Date | string): string {
   const d = new Date(date);